@@ -0,0 +1,253 @@
+"""
+Local mirror of the Garmin Connect activity list
+Activities are stored in SQLite, indexed by startTimeLocal, and synced
+incrementally: each sync pages down from the newest activity until it has
+reached activities already mirrored and re-read a trailing window of recent
+days, which picks up late uploads (watch syncs, Peloton backfills) that carry
+an older start time. Every so often a full resync re-reads the whole history
+and prunes activities that were deleted on Garmin. Date-range queries then
+run locally with no paging and no cap on how far back they go.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+DEFAULT_MIRROR_PATH = Path.home() / '.peloton_garmin_sync' / 'cache' / 'garmin_activities.db'
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_RECHECK_DAYS = 30                 # days re-read on every sync for late uploads
+DEFAULT_FULL_SYNC_INTERVAL = 7 * 86400    # seconds between full resyncs
+
+
+class ActivityMirror:
+    """SQLite copy of each Garmin account's activity list"""
+    
+    def __init__(self, db_path=None, page_size=DEFAULT_PAGE_SIZE, recheck_days=DEFAULT_RECHECK_DAYS,
+                 full_sync_interval=DEFAULT_FULL_SYNC_INTERVAL):
+        """
+        Args:
+            db_path: SQLite database file (default: ~/.peloton_garmin_sync/cache/garmin_activities.db)
+            page_size: Activities requested per page while syncing
+            recheck_days: Days of recent history every incremental sync reads again
+            full_sync_interval: Seconds after which a sync re-reads the whole history
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_MIRROR_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.page_size = page_size
+        self.recheck_days = recheck_days
+        self.full_sync_interval = full_sync_interval
+        
+        # One sync at a time per mirror; queries share the same lock
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS activities (
+                    account TEXT NOT NULL,
+                    activity_id INTEGER NOT NULL,
+                    start_time_local TEXT NOT NULL,
+                    activity_json TEXT NOT NULL,
+                    PRIMARY KEY (account, activity_id)
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_activities_start_time '
+                'ON activities (account, start_time_local)'
+            )
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS mirror_state (
+                    account TEXT PRIMARY KEY,
+                    backfill_complete INTEGER NOT NULL DEFAULT 0,
+                    synced_at REAL,
+                    full_synced_at REAL
+                )
+            ''')
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(mirror_state)')}
+            if 'full_synced_at' not in columns:
+                self._conn.execute('ALTER TABLE mirror_state ADD COLUMN full_synced_at REAL')
+    
+    def sync(self, account, fetch_page, max_age=None, full=False):
+        """
+        Bring the mirror up to date with Garmin
+        
+        Args:
+            account: Garmin account the activities belong to
+            fetch_page: Callable(start, limit) returning activities newest first
+                        (e.g. Garmin.get_activities); errors propagate to the caller
+            max_age: Skip the sync if the last one finished less than this many seconds ago
+            full: Re-read the whole history, refreshing activities edited on Garmin and
+                  pruning deleted ones (also done automatically every full_sync_interval)
+        
+        Returns:
+            int: Activities added to the mirror
+        """
+        with self._sync_lock:
+            backfill_complete, synced_at, full_synced_at = self._get_state(account)
+            now = time.time()
+            if not full and max_age is not None and synced_at is not None and now - synced_at < max_age:
+                return 0
+            
+            # Until the first sync has reached the oldest activity, keep paging to the end
+            walk_everything = (full or not backfill_complete or full_synced_at is None
+                               or now - full_synced_at >= self.full_sync_interval)
+            recheck_from = (datetime.now() - timedelta(days=self.recheck_days)).strftime("%Y-%m-%d")
+            added = 0
+            start = 0
+            seen = set()
+            oldest_seen = None
+            reached_known = False
+            reached_end = False
+            
+            while True:
+                page = fetch_page(start, self.page_size) or []
+                ids, new_count, page_oldest = self._store(account, page)
+                seen.update(ids)
+                added += new_count
+                if page_oldest and (oldest_seen is None or page_oldest < oldest_seen):
+                    oldest_seen = page_oldest
+                
+                if len(page) < self.page_size:
+                    reached_end = True
+                    break
+                if new_count < len(ids):
+                    reached_known = True
+                if (not walk_everything and reached_known
+                        and page_oldest and page_oldest < recheck_from):
+                    # Past the recheck window and into mirrored activities - everything older is too
+                    break
+                start += self.page_size
+            
+            # Whatever the walk covered is now exactly what Garmin has
+            self._prune(account, seen, None if reached_end else oldest_seen)
+            
+            self._set_state(account, backfill_complete=backfill_complete or reached_end, synced_at=now,
+                            full_synced_at=now if walk_everything and reached_end else full_synced_at)
+            return added
+    
+    def between(self, account, start_date, end_date):
+        """
+        Mirrored activities that started on start_date through end_date
+        
+        Args:
+            account: Garmin account
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format (inclusive)
+        
+        Returns:
+            list: Activity dicts, newest first
+        """
+        day_after_end = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT activity_json FROM activities '
+                'WHERE account = ? AND start_time_local >= ? AND start_time_local < ? '
+                'ORDER BY start_time_local DESC',
+                (account, start_date, day_after_end)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def count(self, account):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM activities WHERE account = ?', (account,)
+            ).fetchone()[0]
+    
+    def is_synced(self, account):
+        """True once a sync has reached the account's oldest activity"""
+        return bool(self._get_state(account)[0])
+    
+    def clear(self, account=None):
+        """Forget the mirrored activities of one account, or of every account"""
+        with self._lock, self._conn:
+            if account is None:
+                self._conn.execute('DELETE FROM activities')
+                self._conn.execute('DELETE FROM mirror_state')
+            else:
+                self._conn.execute('DELETE FROM activities WHERE account = ?', (account,))
+                self._conn.execute('DELETE FROM mirror_state WHERE account = ?', (account,))
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _store(self, account, activities):
+        """
+        Upsert a page of activities
+        
+        Returns:
+            tuple: (ids stored, how many were new, oldest startTimeLocal on the page)
+        """
+        rows = []
+        for activity in activities:
+            activity_id = activity.get('activityId')
+            if activity_id is None:
+                continue
+            rows.append((account, activity_id, activity.get('startTimeLocal') or '',
+                         json.dumps(activity, separators=(',', ':'))))
+        if not rows:
+            return [], 0, None
+        
+        with self._lock, self._conn:
+            placeholders = ','.join('?' * len(rows))
+            known = self._conn.execute(
+                f'SELECT COUNT(*) FROM activities WHERE account = ? AND activity_id IN ({placeholders})',
+                [account] + [row[1] for row in rows]
+            ).fetchone()[0]
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO activities (account, activity_id, start_time_local, activity_json) '
+                'VALUES (?, ?, ?, ?)',
+                rows
+            )
+        start_times = [row[2] for row in rows if row[2]]
+        return [row[1] for row in rows], len(rows) - known, min(start_times, default=None)
+    
+    def _prune(self, account, seen, newer_than=None):
+        """
+        Delete mirrored activities a sync walked past without seeing
+        
+        Args:
+            account: Garmin account
+            seen: Activity ids the walk returned
+            newer_than: Only consider activities that started after this startTimeLocal
+                        (the walk did not reach older ones); None for the whole history
+        
+        Returns:
+            int: Activities removed
+        """
+        with self._lock, self._conn:
+            if newer_than is None:
+                rows = self._conn.execute(
+                    'SELECT activity_id FROM activities WHERE account = ?', (account,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    'SELECT activity_id FROM activities WHERE account = ? AND start_time_local > ?',
+                    (account, newer_than)
+                ).fetchall()
+            gone = [(account, row[0]) for row in rows if row[0] not in seen]
+            self._conn.executemany(
+                'DELETE FROM activities WHERE account = ? AND activity_id = ?', gone
+            )
+        return len(gone)
+    
+    def _get_state(self, account):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT backfill_complete, synced_at, full_synced_at FROM mirror_state WHERE account = ?',
+                (account,)
+            ).fetchone()
+        return tuple(row) if row else (0, None, None)
+    
+    def _set_state(self, account, backfill_complete, synced_at, full_synced_at):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO mirror_state (account, backfill_complete, synced_at, full_synced_at) '
+                'VALUES (?, ?, ?, ?)',
+                (account, int(bool(backfill_complete)), synced_at, full_synced_at)
+            )
@@ -0,0 +1,136 @@
+"""
+Background jobs for the desktop app
+Network work (logins, fetching workouts, syncing, exporting) runs on a worker
+thread so the Tk main loop keeps repainting. Worker threads never touch
+widgets themselves - they post callbacks to a queue that the main thread
+drains with root.after().
+"""
+
+import queue
+import threading
+import traceback
+
+
+class BackgroundTasks:
+    """Runs one job at a time off the Tk main thread"""
+    
+    def __init__(self, root, poll_interval=50, on_state=None):
+        """
+        Args:
+            root: Tk root (anything with an after() method)
+            poll_interval: Milliseconds between queue drains on the main thread
+            on_state: Optional callable receiving True when a job starts and
+                      False when it finishes (called on the main thread)
+        """
+        self.root = root
+        self.poll_interval = poll_interval
+        self.on_state = on_state
+        self.cancel_event = threading.Event()
+        
+        self._events = queue.Queue()
+        self._thread = None
+        self._name = None
+    
+    @property
+    def busy(self):
+        """True while a job is running"""
+        return self._thread is not None
+    
+    @property
+    def name(self):
+        """Name of the running job, or None"""
+        return self._name
+    
+    def post(self, callback, *args, **kwargs):
+        """Run callback on the main thread (safe to call from any thread)"""
+        self._events.put((callback, args, kwargs))
+    
+    def call(self, callback, *args, **kwargs):
+        """
+        Run callback on the main thread and wait for it - for dialogs a job
+        needs an answer from, such as an MFA prompt. Worker threads only.
+        
+        Returns:
+            The callback's return value
+        """
+        done = threading.Event()
+        outcome = {}
+        
+        def run():
+            try:
+                outcome['value'] = callback(*args, **kwargs)
+            except Exception as e:
+                outcome['error'] = e
+            finally:
+                done.set()
+        
+        self.post(run)
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('value')
+    
+    def start(self, name, job, on_done=None, on_error=None):
+        """
+        Run job(cancel_event) on a worker thread
+        
+        Args:
+            name: Short job name for status messages
+            job: Callable taking the cancel threading.Event
+            on_done: Called on the main thread with the job's return value
+            on_error: Called on the main thread with the exception if the job raised
+        
+        Returns:
+            bool: False if another job is still running
+        """
+        if self.busy:
+            return False
+        
+        self.cancel_event.clear()
+        self._name = name
+        
+        def run():
+            try:
+                result = job(self.cancel_event)
+            except Exception as e:
+                traceback.print_exc()
+                self.post(self._finished, on_error, e)
+            else:
+                self.post(self._finished, on_done, result)
+        
+        self._thread = threading.Thread(target=run, name=f"task-{name.lower()}", daemon=True)
+        self._thread.start()
+        if self.on_state:
+            self.on_state(True)
+        return True
+    
+    def cancel(self):
+        """Ask the running job to stop at its next checkpoint"""
+        if self.busy:
+            self.cancel_event.set()
+    
+    def _finished(self, callback, value):
+        self._thread = None
+        self._name = None
+        if self.on_state:
+            self.on_state(False)
+        if callback:
+            callback(value)
+    
+    def poll(self):
+        """Drain posted callbacks on the main thread; reschedules itself"""
+        # Schedule first - a callback may open a modal dialog that runs a
+        # nested event loop, and posted work must keep flowing meanwhile
+        self.root.after(self.poll_interval, self.poll)
+        
+        while True:
+            try:
+                callback, args, kwargs = self._events.get_nowait()
+            except queue.Empty:
+                return
+            
+            try:
+                callback(*args, **kwargs)
+            except Exception:
+                # A broken callback must not stop the queue being drained
+                traceback.print_exc()
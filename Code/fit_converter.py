@@ -0,0 +1,409 @@
+"""
+Native FIT file encoder for Peloton workouts
+Writes binary FIT activity files directly with struct, no fit-tool needed.
+The whole file is packed into one preallocated bytearray: header, file_id,
+timer events, one record per sample, lap, session and activity messages,
+followed by the CRC.
+"""
+
+import struct
+from datetime import datetime, timezone
+
+from peloton_models import PerformanceGraph, is_missing
+from sampling import sample_offsets, select_samples
+
+
+# FIT timestamps count seconds from 1989-12-31 00:00:00 UTC
+FIT_EPOCH_OFFSET = 631065600
+
+PROTOCOL_VERSION = 0x20  # 2.0
+PROFILE_VERSION = 2132
+
+# Global message numbers
+MESG_FILE_ID = 0
+MESG_SESSION = 18
+MESG_LAP = 19
+MESG_RECORD = 20
+MESG_EVENT = 21
+MESG_ACTIVITY = 34
+
+# Base types
+ENUM = 0x00
+UINT8 = 0x02
+UINT16 = 0x84
+UINT32 = 0x86
+UINT32Z = 0x8C
+
+INVALID_UINT8 = 0xFF
+INVALID_UINT16 = 0xFFFF
+INVALID_UINT32 = 0xFFFFFFFF
+
+MANUFACTURER_DEVELOPMENT = 255
+
+# Peloton fitness_discipline -> (FIT sport, FIT sub_sport)
+SPORTS = {
+    'cycling': (2, 6),          # cycling / indoor_cycling
+    'bike_bootcamp': (2, 6),
+    'running': (1, 1),          # running / treadmill
+    'walking': (11, 27),        # walking / indoor_walking
+    'caesar': (15, 14),         # rowing / indoor_rowing
+    'rowing': (15, 14),
+    'strength': (10, 20),       # training / strength_training
+    'yoga': (10, 43),           # training / yoga
+    'stretching': (10, 19),     # training / flexibility_training
+    'cardio': (10, 26),         # training / cardio_training
+    'meditation': (10, 0),
+}
+DEFAULT_SPORT = (0, 0)  # generic
+
+MPH_TO_MPS = 0.44704
+
+
+def _crc_table():
+    """256-entry table for the FIT CRC (CRC-16, reflected polynomial 0xA001)"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+CRC_TABLE = _crc_table()
+
+
+def fit_crc(data, crc=0):
+    """
+    Compute the FIT CRC of a bytes-like object
+    
+    Args:
+        data: Bytes to checksum
+        crc: Running CRC to continue from
+    
+    Returns:
+        int: 16-bit CRC
+    """
+    table = CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+class _Message:
+    """A FIT message type: its definition message plus a packer for its data messages"""
+    
+    def __init__(self, local_type, global_number, fields):
+        """
+        Args:
+            local_type: Local message type (0-15) used in record headers
+            global_number: Global FIT message number
+            fields: List of (field number, base type) in the order values are packed
+        """
+        self.local_type = local_type
+        
+        formats = {ENUM: 'B', UINT8: 'B', UINT16: 'H', UINT32: 'I', UINT32Z: 'I'}
+        self.data = struct.Struct('<B' + ''.join(formats[base] for _, base in fields))
+        
+        definition = bytearray(struct.pack('<BBBHB', 0x40 | local_type, 0, 0, global_number, len(fields)))
+        for number, base in fields:
+            definition += struct.pack('<BBB', number, struct.calcsize('<' + formats[base]), base)
+        self.definition = bytes(definition)
+    
+    def pack_into(self, buffer, offset, *values):
+        """Write one data message at offset, returning the offset after it"""
+        self.data.pack_into(buffer, offset, self.local_type, *values)
+        return offset + self.data.size
+
+
+FILE_ID = _Message(0, MESG_FILE_ID, [
+    (0, ENUM),       # type
+    (1, UINT16),     # manufacturer
+    (2, UINT16),     # product
+    (3, UINT32Z),    # serial_number
+    (4, UINT32),     # time_created
+])
+
+EVENT = _Message(1, MESG_EVENT, [
+    (253, UINT32),   # timestamp
+    (0, ENUM),       # event
+    (1, ENUM),       # event_type
+])
+
+RECORD = _Message(2, MESG_RECORD, [
+    (253, UINT32),   # timestamp
+    (3, UINT8),      # heart_rate (bpm)
+    (4, UINT8),      # cadence (rpm)
+    (5, UINT32),     # distance (1/100 m)
+    (6, UINT16),     # speed (1/1000 m/s)
+    (7, UINT16),     # power (W)
+])
+
+LAP = _Message(3, MESG_LAP, [
+    (253, UINT32),   # timestamp
+    (0, ENUM),       # event
+    (1, ENUM),       # event_type
+    (2, UINT32),     # start_time
+    (7, UINT32),     # total_elapsed_time (ms)
+    (8, UINT32),     # total_timer_time (ms)
+    (9, UINT32),     # total_distance (1/100 m)
+    (11, UINT16),    # total_calories
+    (15, UINT8),     # avg_heart_rate
+    (16, UINT8),     # max_heart_rate
+    (17, UINT8),     # avg_cadence
+    (19, UINT16),    # avg_power
+    (20, UINT16),    # max_power
+    (25, ENUM),      # sport
+    (39, ENUM),      # sub_sport
+    (254, UINT16),   # message_index
+])
+
+SESSION = _Message(4, MESG_SESSION, [
+    (253, UINT32),   # timestamp
+    (0, ENUM),       # event
+    (1, ENUM),       # event_type
+    (2, UINT32),     # start_time
+    (5, ENUM),       # sport
+    (6, ENUM),       # sub_sport
+    (7, UINT32),     # total_elapsed_time (ms)
+    (8, UINT32),     # total_timer_time (ms)
+    (9, UINT32),     # total_distance (1/100 m)
+    (11, UINT16),    # total_calories
+    (16, UINT8),     # avg_heart_rate
+    (17, UINT8),     # max_heart_rate
+    (18, UINT8),     # avg_cadence
+    (20, UINT16),    # avg_power
+    (21, UINT16),    # max_power
+    (25, UINT16),    # first_lap_index
+    (26, UINT16),    # num_laps
+    (254, UINT16),   # message_index
+])
+
+ACTIVITY = _Message(5, MESG_ACTIVITY, [
+    (253, UINT32),   # timestamp
+    (0, UINT32),     # total_timer_time (ms)
+    (1, UINT16),     # num_sessions
+    (2, ENUM),       # type (manual)
+    (3, ENUM),       # event (activity)
+    (4, ENUM),       # event_type (stop)
+    (5, UINT32),     # local_timestamp
+])
+
+MESSAGES = (FILE_ID, EVENT, RECORD, LAP, SESSION, ACTIVITY)
+
+HEADER = struct.Struct('<BBHI4sH')
+
+# event / event_type values
+EVENT_TIMER = 0
+EVENT_LAP = 9
+EVENT_SESSION = 8
+EVENT_ACTIVITY = 26
+EVENT_TYPE_START = 0
+EVENT_TYPE_STOP = 1
+EVENT_TYPE_STOP_ALL = 4
+
+
+def _uint(value, invalid, scale=1):
+    """Round a value for a FIT unsigned field, or the invalid marker if missing/out of range"""
+    if value is None:
+        return invalid
+    try:
+        value = int(round(float(value) * scale))
+    except (TypeError, ValueError):
+        return invalid
+    return value if 0 <= value < invalid else invalid
+
+
+def _summary_values(perf_data):
+    """
+    Totals and averages for the lap/session messages
+    
+    Returns:
+        dict: distance (m), calories, avg_hr, max_hr, avg_cadence, avg_power, max_power
+    """
+    values = {}
+    
+    distance = perf_data.distance_meters()
+    if distance is not None:
+        values['distance'] = distance
+    if 'calories' in perf_data.summaries:
+        values['calories'] = perf_data.summary('calories') or 0
+    
+    averages = {'heart_rate': ('avg_hr', 'max_hr'),
+                'cadence': ('avg_cadence', None),
+                'output': ('avg_power', 'max_power')}
+    for slug, (avg_key, max_key) in averages.items():
+        if slug in perf_data.metrics:
+            values[avg_key] = perf_data.averages.get(slug)
+            if max_key:
+                values[max_key] = perf_data.maxima.get(slug)
+    
+    return values
+
+
+def encode_activity(workout, perf_data=None, max_points=None):
+    """
+    Encode a Peloton workout as a FIT activity file
+    
+    Args:
+        workout: Workout record from the Peloton workouts listing
+        perf_data: PerformanceGraph (None writes a summary-only activity)
+        max_points: Optional cap on the number of records (downsampled with LTTB)
+    
+    Returns:
+        bytes: The complete FIT file
+    """
+    perf_data = perf_data or PerformanceGraph()
+    
+    # Same start as the TCX writer, so both formats land at the same time on Garmin
+    created_at = workout.created_at or 0
+    start = int(created_at) - FIT_EPOCH_OFFSET
+    
+    sport, sub_sport = SPORTS.get(workout.discipline, DEFAULT_SPORT)
+    
+    metrics = perf_data.metrics
+    num_samples = max((len(values) for values in metrics.values()), default=0)
+    offsets = sample_offsets(perf_data, num_samples)
+    keep = set(select_samples(metrics, num_samples, max_points, offsets))
+    
+    duration = workout.ride.duration or perf_data.duration or 0
+    if offsets:
+        duration = max(duration, offsets[-1])
+    end = start + int(duration)
+    
+    summary = _summary_values(perf_data)
+    
+    # Timezone offset so Garmin shows the workout at the local start time
+    local_offset = datetime.fromtimestamp(created_at, timezone.utc).astimezone().utcoffset()
+    local_end = end + int(local_offset.total_seconds()) if local_offset else end
+    
+    # Size everything up front and pack into a single buffer
+    data_size = (sum(len(message.definition) for message in MESSAGES)
+                 + FILE_ID.data.size
+                 + 2 * EVENT.data.size
+                 + len(keep) * RECORD.data.size
+                 + LAP.data.size
+                 + SESSION.data.size
+                 + ACTIVITY.data.size)
+    buffer = bytearray(HEADER.size + data_size + 2)
+    offset = HEADER.size
+    
+    for message in MESSAGES:
+        buffer[offset:offset + len(message.definition)] = message.definition
+        offset += len(message.definition)
+    
+    offset = FILE_ID.pack_into(buffer, offset, 4, MANUFACTURER_DEVELOPMENT, 0,
+                               _uint(created_at, INVALID_UINT32) or 1, start)
+    offset = EVENT.pack_into(buffer, offset, start, EVENT_TIMER, EVENT_TYPE_START)
+    
+    # One record per kept sample; distance is integrated from speed (mph) over every sample
+    heart_rates = metrics.get('heart_rate', ())
+    cadences = metrics.get('cadence', ())
+    speeds = metrics.get('speed', ())
+    powers = metrics.get('output', ())
+    
+    cumulative_distance = 0.0
+    previous_offset = 0
+    for i, sample_offset in enumerate(offsets):
+        speed = speeds[i] if i < len(speeds) else None
+        if is_missing(speed):
+            speed = None
+        speed_mps = float(speed) * MPH_TO_MPS if speed else 0.0
+        cumulative_distance += speed_mps * (sample_offset - previous_offset)
+        previous_offset = sample_offset
+        
+        if i not in keep:
+            continue
+        
+        offset = RECORD.pack_into(
+            buffer, offset,
+            start + sample_offset,
+            _uint(heart_rates[i] if i < len(heart_rates) else None, INVALID_UINT8),
+            _uint(cadences[i] if i < len(cadences) else None, INVALID_UINT8),
+            _uint(cumulative_distance if speeds else None, INVALID_UINT32, 100),
+            _uint(speed_mps if speed is not None else None, INVALID_UINT16, 1000),
+            _uint(powers[i] if i < len(powers) else None, INVALID_UINT16),
+        )
+    
+    offset = EVENT.pack_into(buffer, offset, end, EVENT_TIMER, EVENT_TYPE_STOP_ALL)
+    
+    # Prefer Peloton's own distance total, fall back to the integrated one
+    total_distance = _uint(summary.get('distance') or cumulative_distance or None, INVALID_UINT32, 100)
+    elapsed_ms = _uint(duration, INVALID_UINT32, 1000)
+    totals = (
+        elapsed_ms,
+        elapsed_ms,
+        total_distance,
+        _uint(summary.get('calories'), INVALID_UINT16),
+    )
+    avg_hr = _uint(summary.get('avg_hr'), INVALID_UINT8)
+    max_hr = _uint(summary.get('max_hr'), INVALID_UINT8)
+    avg_cadence = _uint(summary.get('avg_cadence'), INVALID_UINT8)
+    avg_power = _uint(summary.get('avg_power'), INVALID_UINT16)
+    max_power = _uint(summary.get('max_power'), INVALID_UINT16)
+    
+    offset = LAP.pack_into(buffer, offset, end, EVENT_LAP, EVENT_TYPE_STOP, start, *totals,
+                           avg_hr, max_hr, avg_cadence, avg_power, max_power,
+                           sport, sub_sport, 0)
+    offset = SESSION.pack_into(buffer, offset, end, EVENT_SESSION, EVENT_TYPE_STOP, start,
+                               sport, sub_sport, *totals,
+                               avg_hr, max_hr, avg_cadence, avg_power, max_power,
+                               0, 1, 0)
+    offset = ACTIVITY.pack_into(buffer, offset, end, elapsed_ms, 1, 0,
+                                EVENT_ACTIVITY, EVENT_TYPE_STOP, local_end)
+    
+    HEADER.pack_into(buffer, 0, HEADER.size, PROTOCOL_VERSION, PROFILE_VERSION,
+                     data_size, b'.FIT', 0)
+    struct.pack_into('<H', buffer, 12, fit_crc(memoryview(buffer)[:12]))
+    struct.pack_into('<H', buffer, offset, fit_crc(memoryview(buffer)[:offset]))
+    
+    return bytes(buffer)
+
+
+class PelotonToFitConverter:
+    """Converts Peloton workouts to FIT activity files"""
+    
+    def __init__(self, peloton_auth, max_points=None):
+        """
+        Args:
+            peloton_auth: Authenticated PelotonBearerAuth used to fetch performance data
+            max_points: Optional cap on records per file (downsampled with LTTB)
+        """
+        self.peloton_auth = peloton_auth
+        self.max_points = max_points
+    
+    def build_fit(self, workout, perf_data=None):
+        """
+        Build the FIT file for a workout
+        
+        Args:
+            workout: Workout record from the Peloton workouts listing
+            perf_data: Already-downloaded performance graph (fetched here if None)
+        
+        Returns:
+            bytes: FIT file contents
+        
+        Raises:
+            Exception: The performance data could not be downloaded
+        """
+        if perf_data is None:
+            perf_data = self.peloton_auth.fetch_workout_details(workout.id, use_cache=workout.finished)
+        
+        return encode_activity(workout, perf_data, self.max_points)
+    
+    def convert_workout_to_fit(self, workout, fit_path, perf_data=None):
+        """
+        Write a workout to a FIT file
+        
+        Args:
+            workout: Workout record from the Peloton workouts listing
+            fit_path: Destination .fit file
+            perf_data: Already-downloaded performance graph (fetched here if None)
+        
+        Returns:
+            str: fit_path
+        """
+        fit_bytes = self.build_fit(workout, perf_data)
+        with open(fit_path, 'wb') as f:
+            f.write(fit_bytes)
+        return fit_path
@@ -0,0 +1,239 @@
+"""
+Caches for Garmin data
+Daily wellness data (steps, sleep, stress, HRV, ...) is keyed by (account,
+metric, date) and kept in two tiers: a small in-memory LRU in front of an
+SQLite table next to the other app data. A day's values only settle some
+hours after it ends, so entries fetched before then expire after a short
+TTL, while entries fetched once the day has closed are kept for good.
+Parsed strength training sets never change once an activity has them, so
+they are kept permanently on disk behind an in-memory LRU of the same kind.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+DEFAULT_CACHE_PATH = Path.home() / '.peloton_garmin_sync' / 'cache' / 'garmin_wellness.db'
+DEFAULT_MAX_MEMORY_ENTRIES = 512
+DEFAULT_OPEN_DAY_TTL = 5 * 60        # seconds an entry for a still-open day stays fresh
+DEFAULT_SETTLE_SECONDS = 6 * 3600    # time after midnight for late watch syncs to arrive
+
+
+class WellnessCache:
+    """Two-tier (memory LRU + SQLite) cache of Garmin wellness responses"""
+    
+    def __init__(self, db_path=None, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES,
+                 open_day_ttl=DEFAULT_OPEN_DAY_TTL, settle_seconds=DEFAULT_SETTLE_SECONDS):
+        """
+        Args:
+            db_path: SQLite database file (default: ~/.peloton_garmin_sync/cache/garmin_wellness.db)
+            max_memory_entries: Entries kept in the in-memory LRU
+            open_day_ttl: Seconds entries fetched before their day closed stay fresh
+            settle_seconds: Seconds after a day ends before its values count as final
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_CACHE_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_memory_entries = max_memory_entries
+        self.open_day_ttl = open_day_ttl
+        self.settle_seconds = settle_seconds
+        
+        self._memory = OrderedDict()  # (account, metric, day) -> (value, fetched_at)
+        
+        # Shared by the context fan-out threads - all access goes through the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS wellness_cache (
+                    account TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    value_json TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    PRIMARY KEY (account, metric, day)
+                )
+            ''')
+    
+    def get(self, account, metric, day, now=None):
+        """
+        Look up a cached value
+        
+        Args:
+            account: Garmin account the value belongs to
+            metric: Endpoint name, e.g. 'sleep'
+            day: Date in YYYY-MM-DD format
+            now: Optional current time (epoch seconds)
+        
+        Returns:
+            The cached value (treat it as read-only), or None on a miss or if it expired
+        """
+        now = time.time() if now is None else now
+        key = (account, metric, day)
+        
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(day, entry[1], now):
+                    self._memory.move_to_end(key)
+                    return entry[0]
+                del self._memory[key]
+                return None
+            
+            row = self._conn.execute(
+                'SELECT value_json, fetched_at FROM wellness_cache '
+                'WHERE account = ? AND metric = ? AND day = ?',
+                (account, metric, day)
+            ).fetchone()
+            if row is None or not self._is_fresh(day, row[1], now):
+                return None
+            
+            try:
+                value = json.loads(row[0])
+            except ValueError:
+                return None
+            self._remember(key, value, row[1])
+            return value
+    
+    def put(self, account, metric, day, value, now=None):
+        """Store a value fetched at now (default: the current time)"""
+        now = time.time() if now is None else now
+        value_json = json.dumps(value, separators=(',', ':'), default=str)
+        
+        with self._lock:
+            self._remember((account, metric, day), value, now)
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO wellness_cache (account, metric, day, value_json, fetched_at) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (account, metric, day, value_json, now)
+                )
+    
+    def clear(self):
+        """Forget every cached value"""
+        with self._lock:
+            self._memory.clear()
+            with self._conn:
+                self._conn.execute('DELETE FROM wellness_cache')
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _remember(self, key, value, fetched_at):
+        self._memory[key] = (value, fetched_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _is_fresh(self, day, fetched_at, now):
+        """Entries fetched after their day settled never expire"""
+        try:
+            day_end = datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)
+        except ValueError:
+            return now - fetched_at < self.open_day_ttl
+        
+        if fetched_at >= day_end.timestamp() + self.settle_seconds:
+            return True
+        return now - fetched_at < self.open_day_ttl
+
+
+class StrengthTrainingCache:
+    """Permanent (memory + SQLite) store of parsed strength training details"""
+    
+    def __init__(self, db_path=None, max_memory_entries=DEFAULT_MAX_MEMORY_ENTRIES):
+        """
+        Args:
+            db_path: SQLite database file (default: next to the wellness cache)
+            max_memory_entries: Entries kept in the in-memory LRU
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_CACHE_PATH
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_memory_entries = max_memory_entries
+        
+        # A finished activity's sets never change, so nothing here expires
+        self._memory = OrderedDict()  # (account, activity_id) -> parsed details
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS strength_training (
+                    account TEXT NOT NULL,
+                    activity_id INTEGER NOT NULL,
+                    details_json TEXT NOT NULL,
+                    PRIMARY KEY (account, activity_id)
+                )
+            ''')
+    
+    def get_many(self, account, activity_ids):
+        """
+        Look up parsed details for several activities at once
+        
+        Returns:
+            dict: activity id -> details for the activities that are cached
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for activity_id in activity_ids:
+                details = self._memory.get((account, activity_id))
+                if details is not None:
+                    self._memory.move_to_end((account, activity_id))
+                    found[activity_id] = details
+                else:
+                    missing.append(activity_id)
+            
+            # SQLite caps the number of parameters per statement
+            for offset in range(0, len(missing), 500):
+                chunk = missing[offset:offset + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f'SELECT activity_id, details_json FROM strength_training '
+                    f'WHERE account = ? AND activity_id IN ({placeholders})',
+                    [account] + chunk
+                ).fetchall()
+                for activity_id, details_json in rows:
+                    try:
+                        details = json.loads(details_json)
+                    except ValueError:
+                        continue
+                    self._remember((account, activity_id), details)
+                    found[activity_id] = details
+        return found
+    
+    def get(self, account, activity_id):
+        return self.get_many(account, [activity_id]).get(activity_id)
+    
+    def put(self, account, activity_id, details):
+        details_json = json.dumps(details, separators=(',', ':'), default=str)
+        with self._lock:
+            self._remember((account, activity_id), details)
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO strength_training (account, activity_id, details_json) '
+                    'VALUES (?, ?, ?)',
+                    (account, activity_id, details_json)
+                )
+    
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            with self._conn:
+                self._conn.execute('DELETE FROM strength_training')
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _remember(self, key, details):
+        self._memory[key] = details
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
@@ -8,16 +8,116 @@ from garminconnect import Garmin
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor, wait
+import functools
 import logging
 
+from activity_mirror import ActivityMirror
+from garmin_cache import StrengthTrainingCache, WellnessCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Sections of format_data_for_context in output order, with the data types
+# that include each one. Every section's endpoint is fetched concurrently.
+CONTEXT_SECTIONS = (
+    ('summary', ('summary', 'all')),
+    ('activities', ('activities', 'all')),
+    ('sleep', ('sleep', 'all')),
+    ('body_battery', ('body_battery', 'comprehensive', 'all')),
+    ('stress', ('stress', 'comprehensive', 'all')),
+    ('respiration', ('respiration', 'comprehensive')),
+    ('hydration', ('hydration', 'nutrition', 'comprehensive')),
+    ('calories', ('calories', 'nutrition', 'comprehensive', 'all')),
+    ('nutrition', ('calories', 'nutrition', 'comprehensive', 'all')),
+    ('food_log', ('calories', 'nutrition', 'comprehensive', 'all')),
+    ('floors', ('floors', 'comprehensive', 'all')),
+    ('intensity', ('intensity', 'comprehensive', 'all')),
+    ('spo2', ('spo2', 'comprehensive')),
+    ('hrv', ('hrv', 'comprehensive')),
+    ('max_metrics', ('training', 'comprehensive')),
+    ('training_status', ('training', 'comprehensive')),
+)
+
+CONTEXT_FETCH_TIMEOUT = 30  # seconds for all endpoints of one context build together
+CONTEXT_FETCH_WORKERS = 8
+
+ACTIVITY_MIRROR_MAX_AGE = 60  # seconds before a date query syncs the activity mirror again
+
+STRENGTH_FETCH_WORKERS = 8
+
+RANGE_FETCH_WORKERS = 8
+RANGE_ENDPOINT_MAX_DAYS = 28  # Garmin's range endpoints reject longer spans
+
+
+def _date_range(start_date: str, end_date: str) -> List[str]:
+    """Every date from start_date to end_date (inclusive) in YYYY-MM-DD format."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    return [(start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range((end - start).days + 1)]
+
+
+def _columns(days: List[str], values: List[object], fields: Dict[str, Callable[[Dict], object]]) -> Dict[str, List]:
+    """Turn per-day values into columns: 'date' plus one list per field, None where a day has no data."""
+    columns = {'date': list(days)}
+    for name, extract in fields.items():
+        columns[name] = [extract(value) if isinstance(value, dict) and value else None for value in values]
+    return columns
+
+
+def _body_battery_summary(date: str, data: Dict) -> Dict:
+    """Summarize one day of Body Battery from either the older per-day or the daily range response."""
+    levels = [point[-1] for point in data.get('bodyBatteryValuesArray') or []
+              if point and isinstance(point[-1], (int, float))]
+    return {
+        'date': date,
+        'charged': data.get('bodyBatteryChargedValue', data.get('charged', 0)),
+        'drained': data.get('bodyBatteryDrainedValue', data.get('drained', 0)),
+        'highest': data.get('bodyBatteryHighestValue', max(levels) if levels else 0),
+        'lowest': data.get('bodyBatteryLowestValue', min(levels) if levels else 0),
+        'current': data.get('bodyBatteryMostRecentValue', levels[-1] if levels else 0)
+    }
+
+
+def _cached_daily(metric: str, dated: bool = True):
+    """
+    Serve a get_* method from the handler's wellness cache, if it has one.
+    
+    Dated methods take the date (YYYY-MM-DD, default today) as their only
+    argument; undated ones (current values such as max metrics) are cached
+    under today's date. Empty results - how the getters report errors - are
+    never stored.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, date: Optional[str] = None):
+            self._ensure_authenticated()
+            today = datetime.now().strftime("%Y-%m-%d")
+            day = (date or today) if dated else today
+            cache = self.wellness_cache
+            if cache is not None:
+                cached = cache.get(self.email, metric, day)
+                if cached is not None:
+                    return cached
+            
+            value = method(self, day) if dated else method(self)
+            if value and cache is not None:
+                try:
+                    cache.put(self.email, metric, day, value)
+                except Exception as e:
+                    logger.debug(f"Could not cache {metric} data: {e}")
+            return value
+        return wrapper
+    return decorator
+
 
 class GarminDataHandler:
     """Handles Garmin Connect authentication and data retrieval."""
     
-    def __init__(self, email: str, password: str, token_store_path: Optional[str] = None):
+    def __init__(self, email: str, password: str, token_store_path: Optional[str] = None,
+                 wellness_cache: Optional[WellnessCache] = None,
+                 activity_mirror: Optional[ActivityMirror] = None,
+                 strength_cache: Optional[StrengthTrainingCache] = None):
         """
         Initialize Garmin Connect handler.
         
@@ -25,11 +125,17 @@ class GarminDataHandler:
             email: Garmin Connect email
             password: Garmin Connect password
             token_store_path: Directory to store tokens (default: ~/.garmin_tokens)
+            wellness_cache: Optional WellnessCache the daily get_* methods are served from
+            activity_mirror: Optional ActivityMirror that get_activities_by_date queries locally
+            strength_cache: Optional StrengthTrainingCache keeping parsed strength training details
         """
         self.email = email
         self.password = password
         self.client: Optional[Garmin] = None
         self._authenticated = False
+        self.wellness_cache = wellness_cache
+        self.activity_mirror = activity_mirror
+        self.strength_cache = strength_cache
         
         # Token store directory - garth will create oauth1_token and oauth2_token files
         if token_store_path is None:
@@ -415,6 +521,7 @@ class GarminDataHandler:
             # If still None, log warning
             logger.debug("Could not set display_name, some API calls may fail")
     
+    @_cached_daily('user_summary', dated=False)
     def get_user_summary(self) -> Dict:
         """
         Get user profile summary.
@@ -504,10 +611,20 @@ class GarminDataHandler:
             List of activity dictionaries within the date range
             
         Note:
-            This fetches activities in batches and filters by date.
-            May require multiple API calls for large date ranges.
+            With an activity mirror the mirror is synced (one request when
+            nothing changed) and the range is read from it, however far back
+            it goes. Without one, activities are fetched in batches and
+            filtered by date, up to the 500 most recent.
         """
         self._ensure_authenticated()
+        if self.activity_mirror is not None:
+            try:
+                self.sync_activity_mirror(max_age=ACTIVITY_MIRROR_MAX_AGE)
+            except Exception as e:
+                logger.warning(f"Could not sync activity mirror, using mirrored data: {e}")
+            if self.activity_mirror.is_synced(self.email):
+                return self.activity_mirror.between(self.email, start_date, end_date)
+        
         try:
             from datetime import datetime
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
@@ -551,6 +668,25 @@ class GarminDataHandler:
             logger.error(f"Error fetching activities by date: {e}")
             return []
     
+    def sync_activity_mirror(self, max_age: Optional[float] = None, full: bool = False) -> int:
+        """
+        Pull new activities into the activity mirror.
+        
+        Args:
+            max_age: Skip the sync if the mirror was synced less than this many seconds ago
+            full: Re-read the whole activity history (picks up activities edited or deleted on Garmin)
+            
+        Returns:
+            Number of activities added
+        """
+        self._ensure_authenticated()
+        if self.activity_mirror is None:
+            raise RuntimeError("No activity mirror configured")
+        added = self.activity_mirror.sync(self.email, self.client.get_activities, max_age=max_age, full=full)
+        if added:
+            logger.info(f"Activity mirror: {added} new activities")
+        return added
+    
     def get_activity_details(self, activity_id: int) -> Dict:
         """
         Get detailed data for a specific activity.
@@ -629,13 +765,41 @@ class GarminDataHandler:
         """
         self._ensure_authenticated()
         
+        if self.strength_cache is not None:
+            cached = self.strength_cache.get(self.email, activity_id)
+            if cached is not None and self._is_final_strength_data(cached):
+                return cached
+        
+        # Get detailed activity data
+        details = self.get_activity_details(activity_id)
+        if not details:
+            return {'error': 'Could not fetch activity details'}
+        
+        strength_data = self._parse_strength_training(activity_id, details)
+        
+        if self.strength_cache is not None and self._is_final_strength_data(strength_data):
+            try:
+                self.strength_cache.put(self.email, activity_id, strength_data)
+            except Exception as e:
+                logger.debug(f"Could not cache strength training details: {e}")
+        return strength_data
+    
+    @staticmethod
+    def _is_final_strength_data(strength_data: Dict) -> bool:
+        """
+        True if a get_strength_training_details() result can be cached for good.
+        
+        Parsed sets never change once they are there, and "not a strength activity"
+        is just as final. An activity with no sets yet (still syncing from the watch)
+        has to be fetched again.
+        """
+        if 'error' in strength_data:
+            return 'activity_type' in strength_data
+        return bool(strength_data.get('exercises'))
+    
+    def _parse_strength_training(self, activity_id: int, details: Dict) -> Dict:
+        """Build the get_strength_training_details structure from raw activity details."""
         try:
-            # Get detailed activity data
-            details = self.get_activity_details(activity_id)
-            
-            if not details:
-                return {'error': 'Could not fetch activity details'}
-            
             # Check if this is a strength training activity
             activity_type = details.get('activityType', {}).get('typeKey', '')
             if 'strength' not in activity_type.lower():
@@ -742,6 +906,112 @@ class GarminDataHandler:
             logger.error(f"Error parsing strength training details: {e}")
             return {'error': f'Error parsing strength training data: {str(e)}'}
     
+    def get_strength_training_details_many(self, activity_ids: List[int],
+                                           max_workers: int = STRENGTH_FETCH_WORKERS) -> Dict[int, Dict]:
+        """
+        Get strength training details for many activities, fetching concurrently.
+        
+        Activities already in the strength cache are served from it in one
+        lookup; the rest are fetched in parallel and cached.
+        
+        Args:
+            activity_ids: Garmin activity IDs
+            max_workers: Concurrent activity detail requests
+            
+        Returns:
+            Dictionary of activity ID -> get_strength_training_details() result,
+            in the order the IDs were given
+        """
+        self._ensure_authenticated()
+        activity_ids = list(dict.fromkeys(activity_ids))
+        
+        found = {}
+        if self.strength_cache is not None:
+            try:
+                found = {
+                    activity_id: details
+                    for activity_id, details in self.strength_cache.get_many(self.email, activity_ids).items()
+                    if self._is_final_strength_data(details)
+                }
+            except Exception as e:
+                logger.debug(f"Strength training cache lookup failed: {e}")
+        
+        missing = [activity_id for activity_id in activity_ids if activity_id not in found]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing))),
+                                    thread_name_prefix="garmin-strength") as executor:
+                for activity_id, strength_data in zip(missing, executor.map(self.get_strength_training_details, missing)):
+                    found[activity_id] = strength_data
+        
+        return {activity_id: found[activity_id] for activity_id in activity_ids}
+    
+    def get_strength_training_summary(self, start_date: str, end_date: str) -> Dict:
+        """
+        Aggregate strength training volume, sets and reps over a date range.
+        
+        Args:
+            start_date: Start date in YYYY-MM-DD format
+            end_date: End date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Dictionary with:
+            {
+                'start_date': str,
+                'end_date': str,
+                'workouts': int,
+                'total_sets': int,
+                'total_reps': int,
+                'total_volume': float,
+                'exercises': {name: {'workouts': int, 'sets': int, 'reps': int, 'volume': float}},
+                'sessions': [get_strength_training_details() results, newest first]
+            }
+        """
+        self._ensure_authenticated()
+        
+        activities = self.get_activities_by_date(start_date, end_date)
+        activity_ids = [
+            activity.get('activityId') for activity in activities
+            if 'strength' in ((activity.get('activityType') or {}).get('typeKey') or '').lower()
+            and activity.get('activityId') is not None
+        ]
+        details_by_id = self.get_strength_training_details_many(activity_ids)
+        
+        sessions = []
+        exercises = {}
+        total_sets = 0
+        total_reps = 0
+        total_volume = 0
+        
+        for strength_data in details_by_id.values():
+            if 'error' in strength_data:
+                continue
+            sessions.append(strength_data)
+            metrics = strength_data.get('metrics', {})
+            total_sets += metrics.get('total_sets', 0)
+            total_reps += metrics.get('total_reps', 0)
+            total_volume += metrics.get('total_volume', 0)
+            
+            for exercise in strength_data.get('exercises', []):
+                totals = exercises.setdefault(exercise['name'], {'workouts': 0, 'sets': 0, 'reps': 0, 'volume': 0})
+                totals['workouts'] += 1
+                totals['sets'] += len(exercise['sets'])
+                totals['reps'] += exercise['total_reps']
+                totals['volume'] += exercise['total_volume']
+        
+        for totals in exercises.values():
+            totals['volume'] = round(totals['volume'], 1)
+        
+        return {
+            'start_date': start_date,
+            'end_date': end_date,
+            'workouts': len(sessions),
+            'total_sets': total_sets,
+            'total_reps': total_reps,
+            'total_volume': round(total_volume, 1),
+            'exercises': exercises,
+            'sessions': sessions
+        }
+    
     def find_strength_training_activities(self, limit: int = 20) -> List[Dict]:
         """
         Find recent strength training activities.
@@ -840,6 +1110,7 @@ class GarminDataHandler:
         
         return "\n".join(output)
     
+    @_cached_daily('steps')
     def get_steps_data(self, date: Optional[str] = None) -> Dict:
         """
         Get steps data for a specific date.
@@ -859,6 +1130,7 @@ class GarminDataHandler:
             logger.error(f"Error fetching steps data: {e}")
             return {}
     
+    @_cached_daily('heart_rate')
     def get_heart_rate_data(self, date: Optional[str] = None) -> Dict:
         """
         Get heart rate data for a specific date.
@@ -878,6 +1150,7 @@ class GarminDataHandler:
             logger.error(f"Error fetching heart rate data: {e}")
             return {}
     
+    @_cached_daily('sleep')
     def get_sleep_data(self, date: Optional[str] = None) -> Dict:
         """
         Get sleep data for a specific date.
@@ -897,6 +1170,7 @@ class GarminDataHandler:
             logger.error(f"Error fetching sleep data: {e}")
             return {}
     
+    @_cached_daily('body_composition')
     def get_body_composition(self, date: Optional[str] = None) -> Dict:
         """
         Get body composition data.
@@ -916,6 +1190,7 @@ class GarminDataHandler:
             logger.error(f"Error fetching body composition: {e}")
             return {}
     
+    @_cached_daily('body_battery')
     def get_body_battery(self, date: Optional[str] = None) -> Dict:
         """
         Get Body Battery data (energy levels throughout the day).
@@ -934,15 +1209,11 @@ class GarminDataHandler:
             # Try to get Body Battery data from available API
             # Body Battery may not be available for all devices
             data = self.client.get_body_battery(date)
+            if isinstance(data, list):
+                # Newer garminconnect versions return one row per day of a range
+                data = data[0] if data else None
             if data:
-                return {
-                    'date': date,
-                    'charged': data.get('bodyBatteryChargedValue', 0),
-                    'drained': data.get('bodyBatteryDrainedValue', 0),
-                    'highest': data.get('bodyBatteryHighestValue', 0),
-                    'lowest': data.get('bodyBatteryLowestValue', 0),
-                    'current': data.get('bodyBatteryMostRecentValue', 0)
-                }
+                return _body_battery_summary(date, data)
             return {}
         except AttributeError:
             # Method doesn't exist in this version of garminconnect
@@ -952,6 +1223,7 @@ class GarminDataHandler:
             logger.debug(f"Body Battery not available: {e}")
             return {}
     
+    @_cached_daily('stress')
     def get_stress_data(self, date: Optional[str] = None) -> Dict:
         """
         Get stress level data for the day.
@@ -988,6 +1260,7 @@ class GarminDataHandler:
             logger.debug(f"Stress data not available: {e}")
             return {}
     
+    @_cached_daily('respiration')
     def get_respiration_data(self, date: Optional[str] = None) -> Dict:
         """
         Get respiration rate data (breaths per minute).
@@ -1020,6 +1293,7 @@ class GarminDataHandler:
             logger.debug(f"Respiration data not available: {e}")
             return {}
     
+    @_cached_daily('hydration')
     def get_hydration_data(self, date: Optional[str] = None) -> Dict:
         """
         Get hydration/water intake data.
@@ -1043,6 +1317,7 @@ class GarminDataHandler:
             logger.debug(f"Hydration data not available: {e}")
             return {}
     
+    @_cached_daily('floors')
     def get_floors_data(self, date: Optional[str] = None) -> Dict:
         """
         Get floors climbed data.
@@ -1072,6 +1347,7 @@ class GarminDataHandler:
             logger.debug(f"Floors data not available: {e}")
             return {}
     
+    @_cached_daily('intensity')
     def get_intensity_minutes(self, date: Optional[str] = None) -> Dict:
         """
         Get intensity minutes (moderate and vigorous activity).
@@ -1103,6 +1379,7 @@ class GarminDataHandler:
             logger.debug(f"Intensity minutes not available: {e}")
             return {}
     
+    @_cached_daily('calories')
     def get_calories_data(self, date: Optional[str] = None) -> Dict:
         """
         Get calories data (consumed, burned, net).
@@ -1134,6 +1411,7 @@ class GarminDataHandler:
             logger.debug(f"Calorie data not available: {e}")
             return {}
     
+    @_cached_daily('nutrition')
     def get_nutrition_summary(self, date: Optional[str] = None) -> Dict:
         """
         Get detailed nutrition summary including macros and food logging.
@@ -1202,6 +1480,7 @@ class GarminDataHandler:
         
         return nutrition_data if nutrition_data else {}
     
+    @_cached_daily('food_log')
     def get_food_log(self, date: Optional[str] = None) -> List[Dict]:
         """
         Get detailed food log entries for a specific date.
@@ -1231,6 +1510,7 @@ class GarminDataHandler:
             logger.debug(f"Food log not available: {e}")
             return []
     
+    @_cached_daily('spo2')
     def get_spo2_data(self, date: Optional[str] = None) -> Dict:
         """
         Get blood oxygen (SpO2/Pulse Ox) data.
@@ -1253,6 +1533,7 @@ class GarminDataHandler:
             logger.debug(f"SpO2 data not available: {e}")
             return {}
     
+    @_cached_daily('max_metrics', dated=False)
     def get_max_metrics(self) -> Dict:
         """
         Get max performance metrics (VO2 Max, lactate threshold, etc).
@@ -1270,6 +1551,7 @@ class GarminDataHandler:
             logger.debug(f"Max metrics not available: {e}")
             return {}
     
+    @_cached_daily('training_status', dated=False)
     def get_training_status(self) -> Dict:
         """
         Get training status and recommendations.
@@ -1287,6 +1569,7 @@ class GarminDataHandler:
             logger.debug(f"Training status not available: {e}")
             return {}
     
+    @_cached_daily('training_readiness')
     def get_training_readiness(self, date: Optional[str] = None) -> Dict:
         """
         Get training readiness score (combines multiple metrics).
@@ -1309,6 +1592,7 @@ class GarminDataHandler:
             logger.debug(f"Training readiness not available: {e}")
             return {}
     
+    @_cached_daily('hrv')
     def get_hrv_data(self, date: Optional[str] = None) -> Dict:
         """
         Get Heart Rate Variability (HRV) data.
@@ -1331,6 +1615,7 @@ class GarminDataHandler:
             logger.debug(f"HRV data not available: {e}")
             return {}
     
+    @_cached_daily('all_day_stress')
     def get_all_day_stress(self, date: Optional[str] = None) -> List[Dict]:
         """
         Get all-day stress measurements (every few minutes).
@@ -1354,7 +1639,524 @@ class GarminDataHandler:
             return []
 
     
-    def format_data_for_context(self, data_type: str = "summary", activity_limit: int = 5) -> str:
+    def _fetch_days(self, getter: Callable[[str], object], days: List[str]) -> List[object]:
+        """Call a (cached) single-day getter for every day concurrently; results in day order."""
+        if not days:
+            return []
+        with ThreadPoolExecutor(max_workers=min(RANGE_FETCH_WORKERS, len(days)),
+                                thread_name_prefix="garmin-range") as executor:
+            return list(executor.map(getter, days))
+    
+    def _fetch_span(self, metric: str, days: List[str], fetch_span: Callable[[str, str], List[Dict]],
+                    row_date: Callable[[Dict], str],
+                    normalize: Optional[Callable[[str, Dict], Dict]] = None) -> List[object]:
+        """
+        Serve days from the wellness cache and fetch the rest from a range endpoint.
+        
+        Args:
+            metric: Wellness cache metric the per-day values are stored under
+            days: Consecutive dates in YYYY-MM-DD format
+            fetch_span: Callable(start, end) returning one row per day
+            row_date: Callable giving the YYYY-MM-DD date of a row
+            normalize: Optional callable(date, row) turning a row into the stored value
+            
+        Returns:
+            One value per day (None where Garmin had nothing), in day order
+        """
+        cache = self.wellness_cache
+        values = {}
+        if cache is not None:
+            for day in days:
+                cached = cache.get(self.email, metric, day)
+                if cached is not None:
+                    values[day] = cached
+        
+        # Runs of consecutive uncached days, each short enough for one request
+        chunks = []
+        previous = None
+        for index, day in enumerate(days):
+            if day in values:
+                continue
+            if chunks and previous == index - 1 and len(chunks[-1]) < RANGE_ENDPOINT_MAX_DAYS:
+                chunks[-1].append(day)
+            else:
+                chunks.append([day])
+            previous = index
+        
+        def fetch(chunk):
+            try:
+                return fetch_span(chunk[0], chunk[-1]) or []
+            except Exception as e:
+                logger.debug(f"{metric} data not available for {chunk[0]} - {chunk[-1]}: {e}")
+                return []
+        
+        if chunks:
+            wanted = {day for chunk in chunks for day in chunk}
+            with ThreadPoolExecutor(max_workers=min(RANGE_FETCH_WORKERS, len(chunks)),
+                                    thread_name_prefix="garmin-range") as executor:
+                for rows in executor.map(fetch, chunks):
+                    for row in rows:
+                        day = row_date(row)
+                        if day not in wanted:
+                            continue
+                        value = normalize(day, row) if normalize else row
+                        values[day] = value
+                        if value and cache is not None:
+                            try:
+                                cache.put(self.email, metric, day, value)
+                            except Exception as e:
+                                logger.debug(f"Could not cache {metric} data: {e}")
+        
+        return [values.get(day) for day in days]
+    
+    def get_sleep_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get nightly sleep totals for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'total_seconds', 'deep_seconds', 'light_seconds',
+            'rem_seconds', 'awake_seconds' (None where there is no data)
+        """
+        self._ensure_authenticated()
+        days = _date_range(start_date, end_date)
+        sleep = lambda value: value.get('dailySleepDTO') or {}
+        return _columns(days, self._fetch_days(self.get_sleep_data, days), {
+            'total_seconds': lambda value: sleep(value).get('sleepTimeSeconds'),
+            'deep_seconds': lambda value: sleep(value).get('deepSleepSeconds'),
+            'light_seconds': lambda value: sleep(value).get('lightSleepSeconds'),
+            'rem_seconds': lambda value: sleep(value).get('remSleepSeconds'),
+            'awake_seconds': lambda value: sleep(value).get('awakeSleepSeconds'),
+        })
+    
+    def get_hrv_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get nightly HRV for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'last_night_avg', 'weekly_avg', 'status'
+        """
+        self._ensure_authenticated()
+        self._ensure_display_name()
+        days = _date_range(start_date, end_date)
+        summary = lambda value: value.get('hrvSummary') or value
+        return _columns(days, self._fetch_days(self.get_hrv_data, days), {
+            'last_night_avg': lambda value: summary(value).get('lastNightAvg'),
+            'weekly_avg': lambda value: summary(value).get('weeklyAvg'),
+            'status': lambda value: summary(value).get('status'),
+        })
+    
+    def get_stress_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily stress levels for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date' plus the get_stress_data fields ('average', 'max',
+            'rest', 'activity', 'low_duration', 'medium_duration', 'high_duration')
+        """
+        self._ensure_authenticated()
+        self._ensure_display_name()
+        days = _date_range(start_date, end_date)
+        fields = ('average', 'max', 'rest', 'activity', 'low_duration', 'medium_duration', 'high_duration')
+        return _columns(days, self._fetch_days(self.get_stress_data, days),
+                        {field: (lambda value, field=field: value.get(field)) for field in fields})
+    
+    def get_heart_rate_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily resting/min/max heart rate for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'resting', 'min', 'max'
+        """
+        self._ensure_authenticated()
+        days = _date_range(start_date, end_date)
+        return _columns(days, self._fetch_days(self.get_heart_rate_data, days), {
+            'resting': lambda value: value.get('restingHeartRate'),
+            'min': lambda value: value.get('minHeartRate'),
+            'max': lambda value: value.get('maxHeartRate'),
+        })
+    
+    def get_respiration_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily respiration rates for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'waking_avg', 'sleeping_avg', 'highest', 'lowest'
+        """
+        self._ensure_authenticated()
+        self._ensure_display_name()
+        days = _date_range(start_date, end_date)
+        fields = ('waking_avg', 'sleeping_avg', 'highest', 'lowest')
+        return _columns(days, self._fetch_days(self.get_respiration_data, days),
+                        {field: (lambda value, field=field: value.get(field)) for field in fields})
+    
+    def get_spo2_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily blood oxygen (SpO2) for a date range.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'average', 'lowest', 'latest' (percent)
+        """
+        self._ensure_authenticated()
+        days = _date_range(start_date, end_date)
+        return _columns(days, self._fetch_days(self.get_spo2_data, days), {
+            'average': lambda value: value.get('averageSpO2', value.get('averageSpO2Value')),
+            'lowest': lambda value: value.get('lowestSpO2', value.get('lowestSpO2Value')),
+            'latest': lambda value: value.get('latestSpO2', value.get('latestSpO2Value')),
+        })
+    
+    def get_body_battery_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily Body Battery for a date range, using Garmin's range endpoint.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date' plus the get_body_battery fields ('charged', 'drained',
+            'highest', 'lowest', 'current' - the last reading of the day)
+        """
+        self._ensure_authenticated()
+        self._ensure_display_name()
+        days = _date_range(start_date, end_date)
+        values = self._fetch_span('body_battery', days, self.client.get_body_battery,
+                                  row_date=lambda row: row.get('date'), normalize=_body_battery_summary)
+        fields = ('charged', 'drained', 'highest', 'lowest', 'current')
+        return _columns(days, values, {field: (lambda value, field=field: value.get(field)) for field in fields})
+    
+    def get_steps_range(self, start_date: str, end_date: str) -> Dict[str, List]:
+        """
+        Get daily step totals for a date range, using Garmin's range endpoint.
+        
+        Args:
+            start_date: First date in YYYY-MM-DD format
+            end_date: Last date in YYYY-MM-DD format (inclusive)
+            
+        Returns:
+            Columns 'date', 'total_steps', 'total_distance' (meters), 'step_goal'
+        """
+        self._ensure_authenticated()
+        days = _date_range(start_date, end_date)
+        values = self._fetch_span('daily_steps', days, self.client.get_daily_steps,
+                                  row_date=lambda row: row.get('calendarDate'))
+        return _columns(days, values, {
+            'total_steps': lambda value: value.get('totalSteps'),
+            'total_distance': lambda value: value.get('totalDistance'),
+            'step_goal': lambda value: value.get('stepGoal'),
+        })
+    
+    def _context_fetchers(self, today: str, activity_limit: int) -> Dict[str, Callable[[], object]]:
+        """Endpoint call behind each CONTEXT_SECTIONS entry."""
+        return {
+            'summary': self.get_user_summary,
+            'activities': lambda: self.get_activities(activity_limit),
+            'sleep': self.get_sleep_data,
+            'body_battery': lambda: self.get_body_battery(today),
+            'stress': lambda: self.get_stress_data(today),
+            'respiration': lambda: self.get_respiration_data(today),
+            'hydration': lambda: self.get_hydration_data(today),
+            'calories': lambda: self.get_calories_data(today),
+            'nutrition': lambda: self.get_nutrition_summary(today),
+            'food_log': lambda: self.get_food_log(today),
+            'floors': lambda: self.get_floors_data(today),
+            'intensity': lambda: self.get_intensity_minutes(today),
+            'spo2': lambda: self.get_spo2_data(today),
+            'hrv': lambda: self.get_hrv_data(today),
+            'max_metrics': self.get_max_metrics,
+            'training_status': self.get_training_status,
+        }
+    
+    def fetch_context_data(self, data_type: str, activity_limit: int = 5,
+                           timeout: Optional[float] = CONTEXT_FETCH_TIMEOUT) -> Dict[str, object]:
+        """
+        Fetch every endpoint a context data type needs, concurrently.
+        
+        Args:
+            data_type: Same options as format_data_for_context
+            activity_limit: Number of activities to fetch
+            timeout: Seconds to wait for all endpoints together (None waits forever)
+            
+        Returns:
+            Dictionary of section name -> endpoint result. Sections whose
+            endpoint failed or missed the deadline are left out.
+        """
+        self._ensure_authenticated()
+        planned = [name for name, data_types in CONTEXT_SECTIONS if data_type in data_types]
+        if not planned:
+            return {}
+        
+        # Set the display name once up front instead of racing to set it in every worker
+        self._ensure_display_name()
+        
+        today = datetime.now().strftime("%Y-%m-%d")
+        fetchers = self._context_fetchers(today, activity_limit)
+        
+        executor = ThreadPoolExecutor(max_workers=min(CONTEXT_FETCH_WORKERS, len(planned)),
+                                      thread_name_prefix="garmin-context")
+        try:
+            futures = {name: executor.submit(fetchers[name]) for name in planned}
+            done, _ = wait(futures.values(), timeout=timeout)
+        finally:
+            # Don't hold the caller up for endpoints that missed the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        results = {}
+        for name, future in futures.items():
+            if future not in done:
+                logger.warning(f"Timed out fetching {name} data")
+            elif future.exception() is not None:
+                logger.debug(f"{name} data not available: {future.exception()}")
+            else:
+                results[name] = future.result()
+        return results
+    
+    def _context_formatters(self, today: str) -> Dict[str, Callable[[object], List[str]]]:
+        """Formatter behind each CONTEXT_SECTIONS entry; each returns the section's lines."""
+        return {
+            'summary': lambda summary: self._format_summary_context(summary, today),
+            'activities': self._format_activities_context,
+            'sleep': self._format_sleep_context,
+            'body_battery': self._format_body_battery_context,
+            'stress': self._format_stress_context,
+            'respiration': self._format_respiration_context,
+            'hydration': self._format_hydration_context,
+            'calories': self._format_calories_context,
+            'nutrition': self._format_nutrition_context,
+            'food_log': self._format_food_log_context,
+            'floors': self._format_floors_context,
+            'intensity': self._format_intensity_context,
+            'spo2': self._format_spo2_context,
+            'hrv': self._format_hrv_context,
+            'max_metrics': self._format_max_metrics_context,
+            'training_status': self._format_training_status_context,
+        }
+    
+    def _format_summary_context(self, summary: Dict, today: str) -> List[str]:
+        lines = ["=== Today's Summary ===", f"Date: {today}"]
+        if "totalSteps" in summary:
+            lines.append(f"Steps: {summary.get('totalSteps', 'N/A')}")
+        if "totalKilocalories" in summary:
+            lines.append(f"Calories: {summary.get('totalKilocalories', 'N/A')}")
+        if "activeKilocalories" in summary:
+            lines.append(f"Active Calories: {summary.get('activeKilocalories', 'N/A')}")
+        lines.append("")
+        return lines
+    
+    def _format_activities_context(self, activities: List[Dict]) -> List[str]:
+        lines = [f"=== Recent Activities (Last {len(activities)}) ==="]
+        for i, activity in enumerate(activities, 1):
+            act_name = activity.get("activityName", "Unknown")
+            act_type = activity.get("activityType", {}).get("typeKey", "Unknown")
+            distance = activity.get("distance", 0) / 1000 if activity.get("distance") else 0  # Convert to km
+            duration = activity.get("duration", 0) / 60 if activity.get("duration") else 0  # Convert to minutes
+            calories = activity.get("calories", "N/A")
+            start_time = activity.get("startTimeLocal", "N/A")
+            
+            lines.append(f"{i}. {act_name} ({act_type})")
+            lines.append(f"   Date: {start_time}")
+            if distance > 0:
+                lines.append(f"   Distance: {distance:.2f} km")
+            lines.append(f"   Duration: {duration:.1f} minutes")
+            lines.append(f"   Calories: {calories}")
+            
+            # Add note for strength training activities
+            if 'strength' in act_type.lower():
+                lines.append(f"   💪 Strength Training - detailed exercise data available")
+            
+            lines.append("")
+        return lines
+    
+    def _format_sleep_context(self, sleep: Dict) -> List[str]:
+        if "dailySleepDTO" not in sleep:
+            return []
+        sleep_data = sleep["dailySleepDTO"]
+        sleep_seconds = sleep_data.get("sleepTimeSeconds", 0)
+        sleep_hours = sleep_seconds / 3600 if sleep_seconds else 0
+        return [
+            "=== Last Night's Sleep ===",
+            f"Total Sleep: {sleep_hours:.1f} hours",
+            f"Deep Sleep: {sleep_data.get('deepSleepSeconds', 0) / 3600:.1f} hours",
+            f"Light Sleep: {sleep_data.get('lightSleepSeconds', 0) / 3600:.1f} hours",
+            f"REM Sleep: {sleep_data.get('remSleepSeconds', 0) / 3600:.1f} hours",
+            f"Awake Time: {sleep_data.get('awakeSleepSeconds', 0) / 3600:.1f} hours",
+            "",
+        ]
+    
+    def _format_body_battery_context(self, bb_data: Dict) -> List[str]:
+        if not bb_data.get('current'):
+            return []
+        return [
+            "=== Body Battery ===",
+            f"Current: {bb_data.get('current', 'N/A')}",
+            f"Highest Today: {bb_data.get('highest', 'N/A')}",
+            f"Lowest Today: {bb_data.get('lowest', 'N/A')}",
+            f"Charged: +{bb_data.get('charged', 0)}",
+            f"Drained: -{bb_data.get('drained', 0)}",
+            "",
+        ]
+    
+    def _format_stress_context(self, stress_data: Dict) -> List[str]:
+        if not stress_data.get('average'):
+            return []
+        return [
+            "=== Stress Levels ===",
+            f"Average: {stress_data.get('average', 'N/A')}/100",
+            f"Max: {stress_data.get('max', 'N/A')}/100",
+            f"Rest Stress: {stress_data.get('rest', 'N/A')}",
+            f"Activity Stress: {stress_data.get('activity', 'N/A')}",
+            f"Low Stress Duration: {stress_data.get('low_duration', 0) / 60:.0f} min",
+            f"High Stress Duration: {stress_data.get('high_duration', 0) / 60:.0f} min",
+            "",
+        ]
+    
+    def _format_respiration_context(self, resp_data: Dict) -> List[str]:
+        if not resp_data.get('waking_avg'):
+            return []
+        return [
+            "=== Respiration ===",
+            f"Waking Average: {resp_data.get('waking_avg', 'N/A')} breaths/min",
+            f"Sleeping Average: {resp_data.get('sleeping_avg', 'N/A')} breaths/min",
+            "",
+        ]
+    
+    def _format_hydration_context(self, hydration: Dict) -> List[str]:
+        total_ml = hydration.get('valueInML', 0)
+        return [
+            "=== Hydration ===",
+            f"Water Intake: {total_ml} ml ({total_ml / 236.588:.1f} cups)",
+            "",
+        ]
+    
+    def _format_calories_context(self, cal_data: Dict) -> List[str]:
+        if not cal_data.get('total_burned'):
+            return []
+        lines = [
+            "=== Calories ===",
+            f"Total Burned: {cal_data.get('total_burned', 'N/A')} kcal",
+            f"Active Burned: {cal_data.get('active_burned', 'N/A')} kcal",
+            f"BMR: {cal_data.get('bmr', 'N/A')} kcal",
+        ]
+        if cal_data.get('consumed'):
+            lines.append(f"Consumed: {cal_data.get('consumed', 'N/A')} kcal")
+            lines.append(f"Net: {cal_data.get('net', 'N/A')} kcal")
+        lines.append("")
+        return lines
+    
+    def _format_nutrition_context(self, nutrition_data: Dict) -> List[str]:
+        if not nutrition_data.get('calories_consumed'):
+            return []
+        lines = [
+            "=== Nutrition Details ===",
+            f"Calories Consumed: {nutrition_data.get('calories_consumed', 0)} kcal",
+        ]
+        if nutrition_data.get('protein_g'):
+            lines.append(f"Protein: {nutrition_data.get('protein_g', 0)}g")
+        if nutrition_data.get('carbs_g'):
+            lines.append(f"Carbs: {nutrition_data.get('carbs_g', 0)}g")
+        if nutrition_data.get('fat_g'):
+            lines.append(f"Fat: {nutrition_data.get('fat_g', 0)}g")
+        if nutrition_data.get('fiber_g'):
+            lines.append(f"Fiber: {nutrition_data.get('fiber_g', 0)}g")
+        if nutrition_data.get('sugar_g'):
+            lines.append(f"Sugar: {nutrition_data.get('sugar_g', 0)}g")
+        lines.append("")
+        return lines
+    
+    def _format_food_log_context(self, food_log: List[Dict]) -> List[str]:
+        lines = ["=== Food Log ===", f"Number of meals logged: {len(food_log)}"]
+        for i, meal in enumerate(food_log[:5], 1):  # Show up to 5 meals
+            meal_name = meal.get('name', meal.get('foodName', 'Unknown'))
+            meal_calories = meal.get('calories', 0)
+            lines.append(f"{i}. {meal_name} - {meal_calories} kcal")
+        lines.append("")
+        return lines
+    
+    def _format_floors_context(self, floors_data: Dict) -> List[str]:
+        if not floors_data.get('floors_ascended'):
+            return []
+        return [
+            "=== Floors Climbed ===",
+            f"Ascended: {floors_data.get('floors_ascended', 0)}",
+            f"Descended: {floors_data.get('floors_descended', 0)}",
+            f"Goal: {floors_data.get('floors_ascended_goal', 'N/A')}",
+            "",
+        ]
+    
+    def _format_intensity_context(self, intensity: Dict) -> List[str]:
+        return [
+            "=== Intensity Minutes ===",
+            f"Today Moderate: {intensity.get('moderate', 0)} min",
+            f"Today Vigorous: {intensity.get('vigorous', 0)} min",
+            f"Weekly Moderate: {intensity.get('weekly_moderate', 0)} min",
+            f"Weekly Vigorous: {intensity.get('weekly_vigorous', 0)} min",
+            f"Weekly Goal: {intensity.get('weekly_goal', 150)} min",
+            "",
+        ]
+    
+    def _format_spo2_context(self, spo2: Dict) -> List[str]:
+        lines = ["=== Blood Oxygen (SpO2) ==="]
+        if 'latestSpO2Value' in spo2:
+            lines.append(f"Latest: {spo2.get('latestSpO2Value', 'N/A')}%")
+        if 'lowestSpO2Value' in spo2:
+            lines.append(f"Lowest: {spo2.get('lowestSpO2Value', 'N/A')}%")
+        if 'averageSpO2Value' in spo2:
+            lines.append(f"Average: {spo2.get('averageSpO2Value', 'N/A')}%")
+        lines.append("")
+        return lines
+    
+    def _format_hrv_context(self, hrv: Dict) -> List[str]:
+        lines = ["=== Heart Rate Variability ==="]
+        if 'lastNightAvg' in hrv:
+            lines.append(f"Last Night Average: {hrv.get('lastNightAvg', 'N/A')} ms")
+        if 'weeklyAvg' in hrv:
+            lines.append(f"Weekly Average: {hrv.get('weeklyAvg', 'N/A')} ms")
+        lines.append("")
+        return lines
+    
+    def _format_max_metrics_context(self, max_metrics: Dict) -> List[str]:
+        lines = ["=== Performance Metrics ==="]
+        if 'vo2Max' in max_metrics:
+            lines.append(f"VO2 Max: {max_metrics.get('vo2Max', 'N/A')}")
+        if 'fitnessAge' in max_metrics:
+            lines.append(f"Fitness Age: {max_metrics.get('fitnessAge', 'N/A')}")
+        lines.append("")
+        return lines
+    
+    def _format_training_status_context(self, training: Dict) -> List[str]:
+        lines = ["=== Training Status ==="]
+        if 'trainingLoad' in training:
+            lines.append(f"Load: {training.get('trainingLoad', 'N/A')}")
+        if 'loadFocus' in training:
+            lines.append(f"Focus: {training.get('loadFocus', 'N/A')}")
+        lines.append("")
+        return lines
+    
+    def format_data_for_context(self, data_type: str = "summary", activity_limit: int = 5,
+                                timeout: Optional[float] = CONTEXT_FETCH_TIMEOUT) -> str:
         """
         Format Garmin data into a readable string for LLM context.
         
@@ -1365,11 +2167,14 @@ class GarminDataHandler:
                                "intensity", "spo2", "hrv", "training", "comprehensive",
                                "strength" (detailed strength training data)
             activity_limit: Number of activities to include (default: 5, max recommended: 20)
+            timeout: Seconds to wait for the Garmin endpoints (fetched concurrently);
+                     sections that are not back by then are left out
             
         Returns:
             Formatted string containing the requested data
             
         Note:
+            - Sections always appear in the same order, whichever endpoint answers first
             - Increase activity_limit for queries about longer time periods
             - Keep under 20 activities to avoid token limits in AI context
             - Use "comprehensive" for detailed health metrics (Body Battery, stress, HRV, etc.)
@@ -1379,218 +2184,17 @@ class GarminDataHandler:
         
         context_parts = []
         today = datetime.now().strftime("%Y-%m-%d")
+        data = self.fetch_context_data(data_type, activity_limit, timeout)
         
-        if data_type == "summary" or data_type == "all":
-            # Get user summary
-            summary = self.get_user_summary()
-            if summary:
-                context_parts.append("=== Today's Summary ===")
-                context_parts.append(f"Date: {today}")
-                if "totalSteps" in summary:
-                    context_parts.append(f"Steps: {summary.get('totalSteps', 'N/A')}")
-                if "totalKilocalories" in summary:
-                    context_parts.append(f"Calories: {summary.get('totalKilocalories', 'N/A')}")
-                if "activeKilocalories" in summary:
-                    context_parts.append(f"Active Calories: {summary.get('activeKilocalories', 'N/A')}")
-                context_parts.append("")
-        
-        if data_type == "activities" or data_type == "all":
-            # Get recent activities with configurable limit
-            activities = self.get_activities(activity_limit)
-            if activities:
-                context_parts.append(f"=== Recent Activities (Last {len(activities)}) ===")
-                for i, activity in enumerate(activities, 1):
-                    act_name = activity.get("activityName", "Unknown")
-                    act_type = activity.get("activityType", {}).get("typeKey", "Unknown")
-                    distance = activity.get("distance", 0) / 1000 if activity.get("distance") else 0  # Convert to km
-                    duration = activity.get("duration", 0) / 60 if activity.get("duration") else 0  # Convert to minutes
-                    calories = activity.get("calories", "N/A")
-                    start_time = activity.get("startTimeLocal", "N/A")
-                    
-                    context_parts.append(f"{i}. {act_name} ({act_type})")
-                    context_parts.append(f"   Date: {start_time}")
-                    if distance > 0:
-                        context_parts.append(f"   Distance: {distance:.2f} km")
-                    context_parts.append(f"   Duration: {duration:.1f} minutes")
-                    context_parts.append(f"   Calories: {calories}")
-                    
-                    # Add note for strength training activities
-                    if 'strength' in act_type.lower():
-                        context_parts.append(f"   💪 Strength Training - detailed exercise data available")
-                    
-                    context_parts.append("")
-        
-        if data_type == "sleep" or data_type == "all":
-            # Get sleep data
-            sleep = self.get_sleep_data()
-            if sleep and "dailySleepDTO" in sleep:
-                sleep_data = sleep["dailySleepDTO"]
-                context_parts.append("=== Last Night's Sleep ===")
-                sleep_seconds = sleep_data.get("sleepTimeSeconds", 0)
-                sleep_hours = sleep_seconds / 3600 if sleep_seconds else 0
-                context_parts.append(f"Total Sleep: {sleep_hours:.1f} hours")
-                context_parts.append(f"Deep Sleep: {sleep_data.get('deepSleepSeconds', 0) / 3600:.1f} hours")
-                context_parts.append(f"Light Sleep: {sleep_data.get('lightSleepSeconds', 0) / 3600:.1f} hours")
-                context_parts.append(f"REM Sleep: {sleep_data.get('remSleepSeconds', 0) / 3600:.1f} hours")
-                context_parts.append(f"Awake Time: {sleep_data.get('awakeSleepSeconds', 0) / 3600:.1f} hours")
-                context_parts.append("")
-        
-        # Body Battery data
-        if data_type in ["body_battery", "comprehensive", "all"]:
-            bb_data = self.get_body_battery(today)
-            if bb_data and bb_data.get('current'):
-                context_parts.append("=== Body Battery ===")
-                context_parts.append(f"Current: {bb_data.get('current', 'N/A')}")
-                context_parts.append(f"Highest Today: {bb_data.get('highest', 'N/A')}")
-                context_parts.append(f"Lowest Today: {bb_data.get('lowest', 'N/A')}")
-                context_parts.append(f"Charged: +{bb_data.get('charged', 0)}")
-                context_parts.append(f"Drained: -{bb_data.get('drained', 0)}")
-                context_parts.append("")
-        
-        # Stress data
-        if data_type in ["stress", "comprehensive", "all"]:
-            stress_data = self.get_stress_data(today)
-            if stress_data and stress_data.get('average'):
-                context_parts.append("=== Stress Levels ===")
-                context_parts.append(f"Average: {stress_data.get('average', 'N/A')}/100")
-                context_parts.append(f"Max: {stress_data.get('max', 'N/A')}/100")
-                context_parts.append(f"Rest Stress: {stress_data.get('rest', 'N/A')}")
-                context_parts.append(f"Activity Stress: {stress_data.get('activity', 'N/A')}")
-                context_parts.append(f"Low Stress Duration: {stress_data.get('low_duration', 0) / 60:.0f} min")
-                context_parts.append(f"High Stress Duration: {stress_data.get('high_duration', 0) / 60:.0f} min")
-                context_parts.append("")
-        
-        # Respiration data
-        if data_type in ["respiration", "comprehensive"]:
-            resp_data = self.get_respiration_data(today)
-            if resp_data and resp_data.get('waking_avg'):
-                context_parts.append("=== Respiration ===")
-                context_parts.append(f"Waking Average: {resp_data.get('waking_avg', 'N/A')} breaths/min")
-                context_parts.append(f"Sleeping Average: {resp_data.get('sleeping_avg', 'N/A')} breaths/min")
-                context_parts.append("")
-        
-        # Hydration data
-        if data_type in ["hydration", "nutrition", "comprehensive"]:
-            hydration = self.get_hydration_data(today)
-            if hydration:
-                context_parts.append("=== Hydration ===")
-                total_ml = hydration.get('valueInML', 0)
-                context_parts.append(f"Water Intake: {total_ml} ml ({total_ml / 236.588:.1f} cups)")
-                context_parts.append("")
-        
-        # Calories/Nutrition data
-        if data_type in ["calories", "nutrition", "comprehensive", "all"]:
-            # Get basic calorie data
-            cal_data = self.get_calories_data(today)
-            if cal_data and cal_data.get('total_burned'):
-                context_parts.append("=== Calories ===")
-                context_parts.append(f"Total Burned: {cal_data.get('total_burned', 'N/A')} kcal")
-                context_parts.append(f"Active Burned: {cal_data.get('active_burned', 'N/A')} kcal")
-                context_parts.append(f"BMR: {cal_data.get('bmr', 'N/A')} kcal")
-                if cal_data.get('consumed'):
-                    context_parts.append(f"Consumed: {cal_data.get('consumed', 'N/A')} kcal")
-                    context_parts.append(f"Net: {cal_data.get('net', 'N/A')} kcal")
-                context_parts.append("")
-            
-            # Get detailed nutrition data if available
-            nutrition_data = self.get_nutrition_summary(today)
-            if nutrition_data and nutrition_data.get('calories_consumed'):
-                context_parts.append("=== Nutrition Details ===")
-                context_parts.append(f"Calories Consumed: {nutrition_data.get('calories_consumed', 0)} kcal")
-                if nutrition_data.get('protein_g'):
-                    context_parts.append(f"Protein: {nutrition_data.get('protein_g', 0)}g")
-                if nutrition_data.get('carbs_g'):
-                    context_parts.append(f"Carbs: {nutrition_data.get('carbs_g', 0)}g")
-                if nutrition_data.get('fat_g'):
-                    context_parts.append(f"Fat: {nutrition_data.get('fat_g', 0)}g")
-                if nutrition_data.get('fiber_g'):
-                    context_parts.append(f"Fiber: {nutrition_data.get('fiber_g', 0)}g")
-                if nutrition_data.get('sugar_g'):
-                    context_parts.append(f"Sugar: {nutrition_data.get('sugar_g', 0)}g")
-                context_parts.append("")
-            
-            # Get food log if available
-            food_log = self.get_food_log(today)
-            if food_log:
-                context_parts.append("=== Food Log ===")
-                context_parts.append(f"Number of meals logged: {len(food_log)}")
-                for i, meal in enumerate(food_log[:5], 1):  # Show up to 5 meals
-                    meal_name = meal.get('name', meal.get('foodName', 'Unknown'))
-                    meal_calories = meal.get('calories', 0)
-                    context_parts.append(f"{i}. {meal_name} - {meal_calories} kcal")
-                context_parts.append("")
-        
-        # Floors data
-        if data_type in ["floors", "comprehensive", "all"]:
-            floors_data = self.get_floors_data(today)
-            if floors_data and floors_data.get('floors_ascended'):
-                context_parts.append("=== Floors Climbed ===")
-                context_parts.append(f"Ascended: {floors_data.get('floors_ascended', 0)}")
-                context_parts.append(f"Descended: {floors_data.get('floors_descended', 0)}")
-                context_parts.append(f"Goal: {floors_data.get('floors_ascended_goal', 'N/A')}")
-                context_parts.append("")
-        
-        # Intensity Minutes
-        if data_type in ["intensity", "comprehensive", "all"]:
-            intensity = self.get_intensity_minutes(today)
-            if intensity:
-                context_parts.append("=== Intensity Minutes ===")
-                context_parts.append(f"Today Moderate: {intensity.get('moderate', 0)} min")
-                context_parts.append(f"Today Vigorous: {intensity.get('vigorous', 0)} min")
-                context_parts.append(f"Weekly Moderate: {intensity.get('weekly_moderate', 0)} min")
-                context_parts.append(f"Weekly Vigorous: {intensity.get('weekly_vigorous', 0)} min")
-                context_parts.append(f"Weekly Goal: {intensity.get('weekly_goal', 150)} min")
-                context_parts.append("")
-        
-        # SpO2 data
-        if data_type in ["spo2", "comprehensive"]:
-            spo2 = self.get_spo2_data(today)
-            if spo2:
-                context_parts.append("=== Blood Oxygen (SpO2) ===")
-                if 'latestSpO2Value' in spo2:
-                    context_parts.append(f"Latest: {spo2.get('latestSpO2Value', 'N/A')}%")
-                if 'lowestSpO2Value' in spo2:
-                    context_parts.append(f"Lowest: {spo2.get('lowestSpO2Value', 'N/A')}%")
-                if 'averageSpO2Value' in spo2:
-                    context_parts.append(f"Average: {spo2.get('averageSpO2Value', 'N/A')}%")
-                context_parts.append("")
-        
-        # HRV data
-        if data_type in ["hrv", "comprehensive"]:
-            hrv = self.get_hrv_data(today)
-            if hrv:
-                context_parts.append("=== Heart Rate Variability ===")
-                if 'lastNightAvg' in hrv:
-                    context_parts.append(f"Last Night Average: {hrv.get('lastNightAvg', 'N/A')} ms")
-                if 'weeklyAvg' in hrv:
-                    context_parts.append(f"Weekly Average: {hrv.get('weeklyAvg', 'N/A')} ms")
-                context_parts.append("")
-        
-        # Training metrics
-        if data_type in ["training", "comprehensive"]:
-            try:
-                max_metrics = self.get_max_metrics()
-                if max_metrics:
-                    context_parts.append("=== Performance Metrics ===")
-                    if 'vo2Max' in max_metrics:
-                        context_parts.append(f"VO2 Max: {max_metrics.get('vo2Max', 'N/A')}")
-                    if 'fitnessAge' in max_metrics:
-                        context_parts.append(f"Fitness Age: {max_metrics.get('fitnessAge', 'N/A')}")
-                    context_parts.append("")
-            except:
-                pass
-            
-            try:
-                training = self.get_training_status()
-                if training:
-                    context_parts.append("=== Training Status ===")
-                    if 'trainingLoad' in training:
-                        context_parts.append(f"Load: {training.get('trainingLoad', 'N/A')}")
-                    if 'loadFocus' in training:
-                        context_parts.append(f"Focus: {training.get('loadFocus', 'N/A')}")
-                    context_parts.append("")
-            except:
-                pass
+        # Sections in CONTEXT_SECTIONS order; only the ones data_type asked for were fetched
+        formatters = self._context_formatters(today)
+        for name, data_types in CONTEXT_SECTIONS:
+            value = data.get(name)
+            if data_type in data_types and value:
+                try:
+                    context_parts.extend(formatters[name](value))
+                except Exception as e:
+                    logger.debug(f"Could not format {name} data: {e}")
         
         # Strength Training detailed data
         if data_type == "strength":
@@ -1600,9 +2204,13 @@ class GarminDataHandler:
                 context_parts.append(f"=== Recent Strength Training ({len(strength_activities)} workouts) ===")
                 context_parts.append("")
                 
+                # Fetch every workout's details at once (cached after the first build)
+                details_by_id = self.get_strength_training_details_many(
+                    [st_activity['activity_id'] for st_activity in strength_activities]
+                )
+                
                 for i, st_activity in enumerate(strength_activities, 1):
-                    # Get detailed data for this strength workout
-                    details = self.get_strength_training_details(st_activity['activity_id'])
+                    details = details_by_id[st_activity['activity_id']]
                     
                     if 'error' not in details:
                         # Format the detailed workout
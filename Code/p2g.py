@@ -0,0 +1,334 @@
+"""
+Peloton 2 Garmin Sync - headless command line
+Runs the same sync as the desktop app without a display, for cron jobs,
+systemd timers or servers. Uses the app's config.json, saved Garmin tokens,
+performance cache and sync ledger from ~/.peloton_garmin_sync.
+
+Examples:
+    python -m p2g sync                       # workouts since the last sync
+    python -m p2g sync --since 2024-01-01 --workers 8
+    python -m p2g sync --since all --format fit
+    python -m p2g sync --since all --transport async   # downloads on one asyncio loop
+    python -m p2g daemon --interval 30       # sync every 30 minutes
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import requests
+
+from peloton_bearer_auth import PelotonBearerAuth
+from workout_cache import PerformanceGraphCache
+from sync_ledger import SyncLedger
+from upload_scheduler import DEFAULT_UPLOAD_RATE
+from workout_store import WorkoutStore
+
+
+DEFAULT_CONFIG_DIR = Path.home() / '.peloton_garmin_sync'
+
+# Exit codes
+EXIT_OK = 0
+EXIT_SYNC_FAILED = 1
+EXIT_SETUP_FAILED = 2
+
+# Recent workouts checked by `--since last` before there is a high-water mark
+FIRST_RUN_LIMIT = 20
+
+
+def log(message):
+    """Timestamped progress line on stdout"""
+    print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} {message}", flush=True)
+
+
+class SetupError(Exception):
+    """Missing configuration or failed login - nothing can be synced"""
+
+
+class HeadlessSync:
+    """Sets up the Peloton/Garmin clients from the app's saved config and runs syncs"""
+    
+    def __init__(self, config_dir=DEFAULT_CONFIG_DIR, workers=None, upload_workers=None,
+                 file_format=None, transport=None):
+        """
+        Args:
+            config_dir: Directory holding config.json, garmin_tokens, cache and ledger
+            workers: Concurrent Peloton downloads (default: config max_workers)
+            upload_workers: Concurrent Garmin uploads (default: config upload_workers)
+            file_format: 'tcx' or 'fit' (default: config upload_format)
+            transport: Peloton download transport, 'threads' or 'async'
+                       (default: config peloton_transport or threads)
+        """
+        self.config_dir = Path(config_dir)
+        self.config_file = self.config_dir / 'config.json'
+        self.garmin_tokens_dir = self.config_dir / 'garmin_tokens'
+        
+        self.config = self.load_config()
+        self.workers = workers or self.config.get('max_workers')
+        self.upload_workers = upload_workers or self.config.get('upload_workers', 1)
+        self.file_format = file_format or self.config.get('upload_format', 'tcx')
+        self.transport = transport or self.config.get('peloton_transport', 'threads')
+        
+        self.performance_cache = PerformanceGraphCache(
+            self.config_dir / 'cache',
+            max_bytes=self.config.get('cache_max_mb', 100) * 1024 * 1024
+        )
+        self.sync_ledger = SyncLedger(self.config_dir / 'sync_ledger.db')
+    
+    def load_config(self):
+        if not self.config_file.exists():
+            raise SetupError(f"No config found at {self.config_file} - configure the app first")
+        with open(self.config_file, 'r') as f:
+            return json.load(f)
+    
+    def connect_peloton(self):
+        """Authenticate with the saved bearer token (or PELOTON_BEARER_TOKEN)"""
+        token = os.environ.get('PELOTON_BEARER_TOKEN') or self.config.get('peloton_bearer_token')
+        if not token:
+            raise SetupError("No Peloton token - set one in the app's Settings or PELOTON_BEARER_TOKEN")
+        
+        peloton_auth = PelotonBearerAuth(
+            cache=self.performance_cache,
+            every_n=self.config.get('sample_interval', 5)
+        )
+        if not peloton_auth.set_bearer_token(token):
+            raise SetupError("Peloton token invalid - update it in the app's Settings")
+        return peloton_auth
+    
+    def connect_garmin(self):
+        """Resume the Garmin session from the saved tokens"""
+        from garmin_handler_mfa import GarminDataHandler
+        
+        garmin_email = self.config.get('garmin_email')
+        tokens_saved = all((self.garmin_tokens_dir / name).exists() for name in ('oauth1_token', 'oauth2_token'))
+        if not garmin_email or not tokens_saved:
+            # Without saved tokens this would need a password and possibly MFA
+            raise SetupError("No Garmin login saved - log in once from the app")
+        
+        garmin_handler = GarminDataHandler(
+            email=garmin_email,
+            password='',  # Not needed for token resume
+            token_store_path=str(self.garmin_tokens_dir)
+        )
+        result = garmin_handler.authenticate(mfa_callback=None)
+        if not result or not result.get('success'):
+            error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
+            raise SetupError(f"Garmin authentication failed: {error_msg} - log in again from the app")
+        return garmin_handler
+    
+    def run(self, since='last', limit=None, dry_run=False):
+        """
+        Run one sync
+        
+        Args:
+            since: 'last' (since the previous sync), 'all', or a YYYY-MM-DD date
+            limit: Optional cap on the number of workouts considered
+            dry_run: List what would be uploaded without uploading
+        
+        Returns:
+            list: Per-workout results
+        """
+        from simple_fit_converter import SimpleFitConverter
+        from sync_engine import incremental_sync, sync_workouts
+        
+        peloton_auth = self.connect_peloton()
+        log("✓ Peloton token valid")
+        
+        if dry_run:
+            garmin_client = None
+        else:
+            garmin_client = self.connect_garmin().client
+            log("✓ Garmin session resumed")
+        
+        converter = SimpleFitConverter(
+            peloton_auth, garmin_client,
+            file_format=self.file_format,
+            max_points=self.config.get('max_trackpoints')
+        )
+        options = dict(
+            log=log,
+            max_workers=self.workers,
+            upload_workers=self.upload_workers,
+            upload_rate=self.config.get('upload_rate', DEFAULT_UPLOAD_RATE),
+            fetch_transport=self.transport
+        )
+        
+        if since == 'last' and not dry_run:
+            return incremental_sync(peloton_auth, converter, self.sync_ledger,
+                                    first_run_limit=limit or FIRST_RUN_LIMIT, **options)
+        
+        # Explicit range: walk the listing back to the cutoff
+        cutoff = None
+        if since not in ('all', 'last'):
+            cutoff = datetime.strptime(since, '%Y-%m-%d')
+        elif since == 'last':
+            cutoff = self.sync_ledger.get_high_water_mark()
+        
+        workouts = peloton_auth.iter_workouts(since=cutoff)
+        if since == 'last' and cutoff is None:
+            # Dry run before the first sync - the same window incremental_sync checks
+            workouts = islice(workouts, limit or FIRST_RUN_LIMIT)
+        store = WorkoutStore()
+        for workout in workouts:
+            if limit and len(store) >= limit:
+                break
+            if workout.finished and not self.sync_ledger.is_synced(workout.id):
+                store.add(workout)
+        
+        # Oldest first, and a workout seen on two listing pages only once
+        pending = store.oldest_first()
+        
+        if dry_run:
+            log(f"Would sync {len(pending)} workouts:")
+            for workout in pending:
+                date_str = datetime.fromtimestamp(workout.created_at).strftime('%Y-%m-%d %H:%M')
+                log(f"  {date_str}  {workout.display_name}")
+            return []
+        
+        if not pending:
+            log("Nothing to sync - all workouts are already on Garmin")
+            return []
+        
+        log(f"Found {len(pending)} workouts to sync")
+        return sync_workouts(peloton_auth, converter, pending, self.sync_ledger, **options)
+
+
+def summarize(results):
+    """Log a one-line summary; returns the exit code for the run"""
+    succeeded = sum(1 for result in results if result['success'])
+    failed = len(results) - succeeded
+    log(f"Sync complete: {succeeded} uploaded, {failed} failed")
+    return EXIT_SYNC_FAILED if failed else EXIT_OK
+
+
+def cmd_sync(args):
+    syncer = None
+    try:
+        syncer = HeadlessSync(args.config_dir, args.workers, args.upload_workers, args.format,
+                              args.transport)
+        results = syncer.run(args.since, args.limit, args.dry_run)
+        return EXIT_OK if args.dry_run else summarize(results)
+    except SetupError as e:
+        log(f"✗ {e}")
+        return EXIT_SETUP_FAILED
+    except (requests.RequestException, RuntimeError) as e:
+        # Network trouble or a client giving up - no traceback needed
+        log(f"✗ Sync failed: {type(e).__name__}: {str(e)}")
+        return EXIT_SYNC_FAILED
+    finally:
+        if syncer is not None:
+            syncer.sync_ledger.close()
+
+
+def cmd_daemon(args):
+    stop = threading.Event()
+    
+    def request_stop(signum, frame):
+        log("Stopping after the current sync...")
+        stop.set()
+    
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, request_stop)
+    
+    log(f"Syncing new workouts every {args.interval} minutes (Ctrl+C to stop)")
+    
+    while not stop.is_set():
+        started = time.monotonic()
+        syncer = None
+        try:
+            # Re-read config and tokens each round so changes made in the app are picked up
+            syncer = HeadlessSync(args.config_dir, args.workers, args.upload_workers, args.format,
+                                  args.transport)
+            summarize(syncer.run('last'))
+        except SetupError as e:
+            log(f"✗ {e}")
+        except Exception as e:
+            # Keep the daemon alive - the next round may well succeed
+            log(f"✗ Sync failed: {type(e).__name__}: {str(e)}")
+            for line in traceback.format_exc().split('\n'):
+                if line.strip():
+                    log(f"  {line}")
+        finally:
+            if syncer is not None:
+                syncer.sync_ledger.close()
+        
+        stop.wait(max(0, args.interval * 60 - (time.monotonic() - started)))
+    
+    return EXIT_OK
+
+
+def _add_common_options(parser, defaults=True):
+    """
+    Options accepted both before and after the command
+    
+    The copies on the subcommands use SUPPRESS defaults so they only
+    override the top-level value when actually given.
+    """
+    def default(value):
+        return value if defaults else argparse.SUPPRESS
+    
+    parser.add_argument('--config-dir', default=default(str(DEFAULT_CONFIG_DIR)),
+                        help=f"App config directory (default: {DEFAULT_CONFIG_DIR})")
+    parser.add_argument('--workers', type=int, default=default(None),
+                        help="Concurrent Peloton downloads")
+    parser.add_argument('--upload-workers', type=int, default=default(None),
+                        help="Concurrent Garmin uploads")
+    parser.add_argument('--format', choices=('tcx', 'fit'), default=default(None),
+                        help="Upload file format (default: config upload_format or tcx)")
+    parser.add_argument('--transport', choices=('threads', 'async'), default=default(None),
+                        help="Peloton download transport (async needs aiohttp)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='p2g',
+        description="Sync Peloton workouts to Garmin Connect without the desktop app"
+    )
+    _add_common_options(parser)
+    
+    common = argparse.ArgumentParser(add_help=False)
+    _add_common_options(common, defaults=False)
+    
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    sync_parser = commands.add_parser('sync', parents=[common], help="Sync once and exit")
+    sync_parser.add_argument('--since', default='last',
+                             help="'last' (default), 'all', or a date YYYY-MM-DD")
+    sync_parser.add_argument('--limit', type=int,
+                             help="Consider at most this many workouts")
+    sync_parser.add_argument('--dry-run', action='store_true',
+                             help="List the workouts that would be uploaded")
+    sync_parser.set_defaults(func=cmd_sync)
+    
+    daemon_parser = commands.add_parser('daemon', parents=[common], help="Sync new workouts on an interval")
+    daemon_parser.add_argument('--interval', type=float, default=60,
+                               help="Minutes between syncs (default: %(default)s)")
+    daemon_parser.set_defaults(func=cmd_daemon)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    
+    if getattr(args, 'since', 'last') not in ('last', 'all'):
+        try:
+            datetime.strptime(args.since, '%Y-%m-%d')
+        except ValueError:
+            log(f"✗ --since must be 'last', 'all' or YYYY-MM-DD, got {args.since!r}")
+            return EXIT_SETUP_FAILED
+    
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Asyncio Peloton client
+Alternative transport to PelotonBearerAuth for headless syncs that want to
+pipeline hundreds of workouts on a single event loop (SyncPipeline's
+fetch_transport='async', p2g --transport async). Requests are built and
+responses parsed by the same helpers as the requests-based client, so both
+return identical data.
+
+Requires aiohttp (pip install aiohttp)
+"""
+
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from peloton_bearer_auth import (
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_EVERY_N,
+    build_auth_headers,
+    me_url,
+    workouts_request,
+    performance_graph_request,
+    parse_user_id,
+    parse_workouts_page,
+    normalize_since,
+    is_before_cutoff,
+)
+from peloton_models import PerformanceGraph
+
+
+class AsyncPelotonBearerAuth:
+    """Async Peloton API client using bearer token authentication"""
+    
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, cache=None, every_n=DEFAULT_EVERY_N):
+        """
+        Args:
+            max_workers: Maximum concurrent requests (also caps the connection pool)
+            cache: Optional PerformanceGraphCache shared with the sync client
+            every_n: Default performance_graph resolution in seconds per sample
+        """
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the async Peloton client: pip install aiohttp")
+        
+        self.bearer_token = None
+        self.user_id = None
+        self.max_workers = max_workers
+        self.cache = cache
+        self.every_n = every_n
+        self.session = None
+    
+    @classmethod
+    def from_client(cls, peloton_auth):
+        """
+        Async client with the same settings (workers, cache, every_n) as a PelotonBearerAuth
+        
+        Call set_bearer_token(peloton_auth.bearer_token, peloton_auth.user_id)
+        on the event loop that will use it.
+        """
+        return cls(max_workers=peloton_auth.max_workers, cache=peloton_auth.cache,
+                   every_n=peloton_auth.every_n)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """Close the underlying HTTP session"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+    
+    async def set_bearer_token(self, token, user_id=None):
+        """
+        Set the bearer token for API authentication
+        
+        Args:
+            token: OAuth bearer token from browser
+            user_id: Peloton user id if already known (skips the /api/me lookup)
+        """
+        await self.close()
+        self.bearer_token = token
+        self.session = aiohttp.ClientSession(
+            headers=build_auth_headers(token),
+            connector=aiohttp.TCPConnector(limit=self.max_workers)
+        )
+        
+        # Get user ID
+        self.user_id = user_id or await self._get_user_id()
+        
+        return bool(self.user_id)
+    
+    async def _get_user_id(self):
+        """Get user ID using bearer token"""
+        try:
+            async with self.session.get(me_url()) as response:
+                if response.status == 200:
+                    return parse_user_id(await response.json())
+                else:
+                    print(f"Failed to get user ID: {response.status}")
+                    return None
+        except Exception as e:
+            print(f"Error getting user ID: {e}")
+            return None
+    
+    async def get_workouts(self, limit=5):
+        """
+        Fetch recent workouts
+        
+        Args:
+            limit: Number of workouts to fetch
+        
+        Returns:
+            list: Workout records
+        """
+        if not self.bearer_token or not self.user_id:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        data = await self._get_workouts_page(0, limit)
+        return parse_workouts_page(data, 0, limit)[0]
+    
+    async def iter_workouts(self, page_size=20, since=None, prefetch=True):
+        """
+        Lazily walk the full workout history, newest first
+        
+        Async counterpart of PelotonBearerAuth.iter_workouts - with prefetch
+        enabled the next page is requested as a task while the current one
+        is consumed.
+        
+        Args:
+            page_size: Number of workouts requested per page
+            since: Optional cutoff (epoch seconds or datetime)
+            prefetch: Fetch the next page while the current one is consumed
+        
+        Yields:
+            Workout: Workout record
+        
+        Raises:
+            Exception: If a page cannot be fetched - the walk does not end early
+        """
+        if not self.bearer_token or not self.user_id:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        since = normalize_since(since)
+        
+        page = 0
+        pending = self._request_page(prefetch, page, page_size)
+        try:
+            while pending is not None:
+                data = await pending
+                workouts, has_next = parse_workouts_page(data, page, page_size)
+                
+                pending = self._request_page(prefetch, page + 1, page_size) if has_next else None
+                
+                for workout in workouts:
+                    if is_before_cutoff(workout, since):
+                        return
+                    yield workout
+                
+                page += 1
+        finally:
+            if isinstance(pending, asyncio.Task):
+                pending.cancel()
+            elif pending is not None:
+                pending.close()
+    
+    def _request_page(self, prefetch, page, limit):
+        """Start a workouts page as a task, or return the un-awaited coroutine"""
+        coro = self._get_workouts_page(page, limit)
+        return asyncio.ensure_future(coro) if prefetch else coro
+    
+    async def _get_workouts_page(self, page, limit):
+        """
+        Fetch a single page of the workouts listing
+        
+        Errors are raised rather than returned as an empty page, as in
+        PelotonBearerAuth._get_workouts_page.
+        
+        Returns:
+            dict: Raw page response
+        """
+        url, params = workouts_request(self.user_id, page, limit)
+        
+        async with self.session.get(url, params=params) as response:
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status} fetching workouts page {page}")
+            return await response.json()
+    
+    async def get_workout_details(self, workout_id, use_cache=True, every_n=None):
+        """
+        Fetch detailed workout performance data
+        
+        Args:
+            workout_id: Peloton workout ID
+            use_cache: Serve/store the response from the on-disk cache (if configured)
+            every_n: Seconds per sample (defaults to self.every_n)
+        
+        Returns:
+            PerformanceGraph: Detailed workout data, or None if it could not be fetched
+        """
+        try:
+            return await self.fetch_workout_details(workout_id, use_cache, every_n)
+        except Exception as e:
+            print(f"Error fetching workout details: {e}")
+            return None
+    
+    async def get_workout_details_many(self, workout_ids, max_workers=None, use_cache=True, every_n=None):
+        """
+        Fetch performance data for several workouts concurrently
+        
+        A semaphore limits how many requests are in flight; results are
+        yielded as each one finishes and failures stay isolated.
+        
+        Args:
+            workout_ids: Iterable of Peloton workout IDs
+            max_workers: Maximum concurrent requests (defaults to self.max_workers)
+            use_cache: Serve/store responses from the on-disk cache (if configured)
+            every_n: Seconds per sample (defaults to self.every_n)
+        
+        Yields:
+            tuple: (workout_id, details or None, error message or None)
+        """
+        if not self.bearer_token:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+        
+        async def fetch(workout_id):
+            async with semaphore:
+                try:
+                    return workout_id, await self.fetch_workout_details(workout_id, use_cache, every_n), None
+                except Exception as e:
+                    return workout_id, None, str(e)
+        
+        tasks = [asyncio.ensure_future(fetch(workout_id)) for workout_id in workout_ids]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def fetch_workout_details(self, workout_id, use_cache=True, every_n=None):
+        """
+        Fetch a workout's performance graph, raising on failure
+        
+        Async counterpart of PelotonBearerAuth.fetch_workout_details.
+        
+        Args:
+            workout_id: Peloton workout ID
+            use_cache: Serve/store the response from the on-disk cache (if configured)
+            every_n: Seconds per sample (defaults to self.every_n)
+        
+        Returns:
+            PerformanceGraph: Detailed workout data
+        
+        Raises:
+            Exception: Not authenticated, or the request failed
+        """
+        if not self.bearer_token:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        url, params = performance_graph_request(workout_id, every_n or self.every_n)
+        use_cache = use_cache and self.cache is not None
+        
+        # Cache reads/writes are disk I/O - keep them off the event loop
+        if use_cache:
+            cached = await asyncio.to_thread(self.cache.get, workout_id, params['every_n'])
+            if cached is not None:
+                return PerformanceGraph.from_json(cached, params['every_n'])
+        
+        async with self.session.get(url, params=params) as response:
+            if response.status != 200:
+                raise Exception(f"HTTP {response.status} fetching performance data")
+            data = await response.json()
+        
+        if use_cache:
+            try:
+                await asyncio.to_thread(self.cache.put, workout_id, params['every_n'], data)
+            except Exception as e:
+                print(f"Could not cache workout details: {e}")
+        return PerformanceGraph.from_json(data, params['every_n'])
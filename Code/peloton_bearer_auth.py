@@ -5,13 +5,116 @@ Peloton now uses OAuth Bearer Tokens instead of session cookies
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from functools import partial
+
+from peloton_models import PerformanceGraph, Workout
+
+
+PELOTON_API_URL = 'https://api.onepeloton.com'
+
+# Default number of concurrent performance_graph downloads
+DEFAULT_MAX_WORKERS = 4
+
+# Default performance_graph resolution - seconds between samples (1 = full resolution)
+DEFAULT_EVERY_N = 5
+
+
+# Request building and response parsing shared by PelotonBearerAuth and
+# AsyncPelotonBearerAuth, so both transports return identical data
+
+def build_auth_headers(token):
+    """Headers sent with every authenticated Peloton API request"""
+    return {
+        'Authorization': f'Bearer {token}',
+        'peloton-platform': 'web',
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+    }
+
+
+def me_url():
+    return f"{PELOTON_API_URL}/api/me"
+
+
+def workouts_request(user_id, page, limit):
+    """URL and query parameters for one page of the workouts listing"""
+    url = f"{PELOTON_API_URL}/api/user/{user_id}/workouts"
+    params = {
+        'joins': 'ride,ride.instructor',
+        'limit': limit,
+        'page': page
+    }
+    return url, params
+
+
+def performance_graph_request(workout_id, every_n=DEFAULT_EVERY_N):
+    """URL and query parameters for a workout's performance graph"""
+    url = f"{PELOTON_API_URL}/api/workout/{workout_id}/performance_graph"
+    params = {'every_n': every_n}
+    return url, params
+
+
+def parse_user_id(data):
+    return data.get('id')
+
+
+def parse_workouts_page(data, page, page_size):
+    """
+    Split a workouts page response into its workouts and a has-next flag
+    
+    Returns:
+        tuple: (list of Workout records, True if another page follows)
+    """
+    if not data:
+        return [], False
+    workouts = [Workout.from_json(workout) for workout in data.get('data', [])]
+    has_next = len(workouts) >= page_size and data.get(
+        'show_next', page + 1 < data.get('page_count', 0))
+    return workouts, bool(has_next)
+
+
+def normalize_since(since):
+    """Convert a `since` cutoff to epoch seconds (accepts datetime or number)"""
+    if isinstance(since, datetime):
+        return since.timestamp()
+    return since
+
+
+def is_before_cutoff(workout, since):
+    return since is not None and workout.created_at < since
 
 
 class PelotonBearerAuth:
-    def __init__(self):
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, cache=None, every_n=DEFAULT_EVERY_N):
+        """
+        Args:
+            max_workers: Default cap on concurrent performance_graph requests
+            cache: Optional PerformanceGraphCache used by get_workout_details
+            every_n: Default performance_graph resolution in seconds per sample
+        """
         self.bearer_token = None
         self.user_id = None
+        self.max_workers = max_workers
+        self.cache = cache
+        self.every_n = every_n
         self.session = requests.Session()
+        self._pool_size = 0
+        self.ensure_connection_pool(max_workers)
+    
+    def ensure_connection_pool(self, size):
+        """
+        Grow the session's connection pool so `size` concurrent requests reuse connections
+        
+        Args:
+            size: Number of threads that will share the session
+        """
+        size = max(size, 10)  # never below the requests default
+        if size > self._pool_size:
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount('https://', adapter)
+            self._pool_size = size
     
     def set_bearer_token(self, token):
         """
@@ -21,11 +124,7 @@ class PelotonBearerAuth:
             token: OAuth bearer token from browser
         """
         self.bearer_token = token
-        self.session.headers.update({
-            'Authorization': f'Bearer {token}',
-            'peloton-platform': 'web',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self.session.headers.update(build_auth_headers(token))
         
         # Get user ID
         self.user_id = self._get_user_id()
@@ -35,11 +134,10 @@ class PelotonBearerAuth:
     def _get_user_id(self):
         """Get user ID using bearer token"""
         try:
-            response = self.session.get('https://api.onepeloton.com/api/me')
+            response = self.session.get(me_url())
             
             if response.status_code == 200:
-                data = response.json()
-                return data.get('id')
+                return parse_user_id(response.json())
             else:
                 print(f"Failed to get user ID: {response.status_code}")
                 return None
@@ -55,59 +153,182 @@ class PelotonBearerAuth:
             limit: Number of workouts to fetch
             
         Returns:
-            list: Workout data
+            list: Workout records
         """
         if not self.bearer_token or not self.user_id:
             raise Exception("Not authenticated. Please set bearer token first.")
         
-        try:
-            url = f"https://api.onepeloton.com/api/user/{self.user_id}/workouts"
-            params = {
-                'joins': 'ride,ride.instructor',
-                'limit': limit,
-                'page': 0
-            }
+        data = self._get_workouts_page(0, limit)
+        return parse_workouts_page(data, 0, limit)[0]
+    
+    def iter_workouts(self, page_size=20, since=None, prefetch=True):
+        """
+        Lazily walk the full workout history, newest first
+        
+        Pages are requested one at a time; with prefetch enabled the next
+        page is downloaded in the background while the current one is
+        being consumed.
+        
+        Args:
+            page_size: Number of workouts requested per page
+            since: Optional cutoff (epoch seconds or datetime) - iteration
+                   stops at the first workout created before it
+            prefetch: Fetch the next page while the current one is consumed
             
-            response = self.session.get(url, params=params)
+        Yields:
+            Workout: Workout record
+        
+        Raises:
+            Exception: If a page cannot be fetched - the walk does not end early
+        """
+        if not self.bearer_token or not self.user_id:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        since = normalize_since(since)
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = 0
+            pending = self._request_page(executor, page, page_size)
             
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('data', [])
-            else:
-                print(f"Error fetching workouts: {response.status_code}")
-                return []
+            while pending is not None:
+                data = pending.result() if executor else pending()
+                workouts, has_next = parse_workouts_page(data, page, page_size)
                 
-        except Exception as e:
-            print(f"Error fetching workouts: {e}")
-            return []
+                # Start downloading the next page before handing out this one
+                pending = self._request_page(executor, page + 1, page_size) if has_next else None
+                
+                for workout in workouts:
+                    if is_before_cutoff(workout, since):
+                        return
+                    yield workout
+                
+                page += 1
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
     
-    def get_workout_details(self, workout_id):
+    def _request_page(self, executor, page, limit):
+        """Schedule a workouts page on the prefetch executor, or defer it until needed"""
+        if executor:
+            return executor.submit(self._get_workouts_page, page, limit)
+        return partial(self._get_workouts_page, page, limit)
+    
+    def _get_workouts_page(self, page, limit):
+        """
+        Fetch a single page of the workouts listing
+        
+        Errors are raised rather than returned as an empty page: a listing
+        that silently stops early looks exactly like the end of the history.
+        
+        Returns:
+            dict: Raw page response (data, page, page_count, show_next...)
+        """
+        url, params = workouts_request(self.user_id, page, limit)
+        
+        response = self.session.get(url, params=params)
+        
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code} fetching workouts page {page}")
+        return response.json()
+    
+    def get_workout_details(self, workout_id, use_cache=True, every_n=None):
         """
         Fetch detailed workout performance data
         
         Args:
             workout_id: Peloton workout ID
+            use_cache: Serve/store the response from the on-disk cache (if configured).
+                       Pass False for workouts that are still in progress.
+            every_n: Seconds per sample (defaults to self.every_n)
             
         Returns:
-            dict: Detailed workout data
+            PerformanceGraph: Detailed workout data, or None if it could not be fetched
         """
-        if not self.bearer_token:
-            raise Exception("Not authenticated. Please set bearer token first.")
-        
         try:
-            url = f"https://api.onepeloton.com/api/workout/{workout_id}/performance_graph"
-            params = {'every_n': 5}
-            
-            response = self.session.get(url, params=params)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
-                
+            return self.fetch_workout_details(workout_id, use_cache, every_n)
         except Exception as e:
             print(f"Error fetching workout details: {e}")
             return None
+    
+    def get_workout_details_many(self, workout_ids, max_workers=None, use_cache=True, every_n=None):
+        """
+        Fetch performance data for several workouts concurrently
+        
+        Results are yielded as soon as each request finishes, so callers can
+        start converting the first workouts while the rest download. A
+        failing request never affects the others.
+        
+        Args:
+            workout_ids: Iterable of Peloton workout IDs
+            max_workers: Maximum concurrent requests (defaults to self.max_workers)
+            use_cache: Serve/store responses from the on-disk cache (if configured)
+            every_n: Seconds per sample (defaults to self.every_n)
+            
+        Yields:
+            tuple: (workout_id, details or None, error message or None)
+        """
+        if not self.bearer_token:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        max_workers = max_workers or self.max_workers
+        self.ensure_connection_pool(max_workers)
+        
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            futures = {
+                executor.submit(self.fetch_workout_details, workout_id, use_cache, every_n): workout_id
+                for workout_id in workout_ids
+            }
+            for future in as_completed(futures):
+                workout_id = futures[future]
+                try:
+                    yield workout_id, future.result(), None
+                except Exception as e:
+                    yield workout_id, None, str(e)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def fetch_workout_details(self, workout_id, use_cache=True, every_n=None):
+        """
+        Fetch a workout's performance graph, raising on failure
+        
+        Same as get_workout_details, for callers that report the error themselves.
+        
+        Args:
+            workout_id: Peloton workout ID
+            use_cache: Serve/store the response from the on-disk cache (if configured)
+            every_n: Seconds per sample (defaults to self.every_n)
+        
+        Returns:
+            PerformanceGraph: Detailed workout data
+        
+        Raises:
+            Exception: Not authenticated, or the request failed
+        """
+        if not self.bearer_token:
+            raise Exception("Not authenticated. Please set bearer token first.")
+        
+        url, params = performance_graph_request(workout_id, every_n or self.every_n)
+        use_cache = use_cache and self.cache is not None
+        
+        if use_cache:
+            cached = self.cache.get(workout_id, params['every_n'])
+            if cached is not None:
+                return PerformanceGraph.from_json(cached, params['every_n'])
+        
+        response = self.session.get(url, params=params)
+        
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code} fetching performance data")
+        data = response.json()
+        
+        if use_cache:
+            try:
+                self.cache.put(workout_id, params['every_n'], data)
+            except Exception as e:
+                print(f"Could not cache workout details: {e}")
+        return PerformanceGraph.from_json(data, params['every_n'])
 
 
 def get_bearer_token_from_user():
@@ -11,7 +11,17 @@ from datetime import datetime
 from pathlib import Path
 import json
 import webbrowser
-import requests
+
+from peloton_bearer_auth import PelotonBearerAuth
+from workout_cache import PerformanceGraphCache
+from garmin_cache import StrengthTrainingCache, WellnessCache
+from activity_mirror import ActivityMirror
+from sync_ledger import SyncLedger
+from upload_scheduler import DEFAULT_UPLOAD_RATE
+from background_tasks import BackgroundTasks
+from status_log import StatusLog, DEFAULT_MAX_LINES
+from workout_list import VirtualWorkoutList
+from workout_store import WorkoutStore
 
 # Fluent Design Colors
 FLUENT_DARK_BG = "#202020"
@@ -25,77 +35,8 @@ FLUENT_SUCCESS = "#107c10"
 FLUENT_ERROR = "#d13438"
 FLUENT_WARNING = "#ff8c00"
 
-
-class PelotonBearerAuth:
-    """Peloton API authentication using bearer token"""
-    
-    def __init__(self):
-        self.bearer_token = None
-        self.user_id = None
-        self.session = requests.Session()
-    
-    def set_bearer_token(self, token):
-        """Set the bearer token for API authentication"""
-        self.bearer_token = token
-        self.session.headers.update({
-            'Authorization': f'Bearer {token}',
-            'peloton-platform': 'web',
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        # Get user ID
-        self.user_id = self._get_user_id()
-        return bool(self.user_id)
-    
-    def _get_user_id(self):
-        """Get user ID using bearer token"""
-        try:
-            response = self.session.get('https://api.onepeloton.com/api/me')
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('id')
-            return None
-        except Exception as e:
-            print(f"Error getting user ID: {e}")
-            return None
-    
-    def get_workouts(self, limit=20):
-        """Fetch recent workouts"""
-        if not self.bearer_token or not self.user_id:
-            raise Exception("Not authenticated")
-        
-        try:
-            url = f"https://api.onepeloton.com/api/user/{self.user_id}/workouts"
-            params = {
-                'joins': 'ride,ride.instructor',
-                'limit': limit,
-                'page': 0
-            }
-            
-            response = self.session.get(url, params=params)
-            if response.status_code == 200:
-                data = response.json()
-                return data.get('data', [])
-            return []
-        except Exception as e:
-            print(f"Error fetching workouts: {e}")
-            return []
-    
-    def get_workout_details(self, workout_id):
-        """Fetch detailed workout performance data"""
-        if not self.bearer_token:
-            raise Exception("Not authenticated")
-        
-        try:
-            url = f"https://api.onepeloton.com/api/workout/{workout_id}/performance_graph"
-            params = {'every_n': 5}
-            response = self.session.get(url, params=params)
-            if response.status_code == 200:
-                return response.json()
-            return None
-        except Exception as e:
-            print(f"Error fetching workout details: {e}")
-            return None
+# Workouts requested per page when loading the history; each page is shown as it arrives
+WORKOUT_PAGE_SIZE = 100
 
 
 class FluentButton(tk.Canvas):
@@ -165,18 +106,39 @@ class PelotonGarminSyncApp:
         self.config_file = self.config_dir / 'config.json'
         self.garmin_tokens_dir = self.config_dir / 'garmin_tokens'
         self.garmin_tokens_dir.mkdir(exist_ok=True)
+        self.cache_dir = self.config_dir / 'cache'
+        self.ledger_file = self.config_dir / 'sync_ledger.db'
         
         # State
         self.peloton_auth = None
         self.garmin_handler = None
-        self.workout_data = []
-        self.selected_workouts = []
+        self.workout_store = WorkoutStore()
+        self.selected_workouts = set()
         
         # Load config
         self.config = self.load_config()
         
+        # Performance data of finished workouts is cached on disk
+        self.performance_cache = PerformanceGraphCache(
+            self.cache_dir,
+            max_bytes=self.config.get('cache_max_mb', 100) * 1024 * 1024
+        )
+        
+        # Garmin wellness data (steps, sleep, stress, ...) by day
+        self.wellness_cache = WellnessCache(self.cache_dir / 'garmin_wellness.db')
+        self.strength_cache = StrengthTrainingCache(self.cache_dir / 'garmin_wellness.db')
+        self.activity_mirror = ActivityMirror(self.cache_dir / 'garmin_activities.db')
+        
+        # Record of workouts already uploaded to Garmin
+        self.sync_ledger = SyncLedger(self.ledger_file)
+        
+        # Network work runs off the main thread; results come back through a queue
+        self.tasks = BackgroundTasks(self.root, on_state=self.update_task_buttons)
+        
         # Setup UI
         self.setup_ui()
+        self.tasks.poll()
+        self.status_log.start()
         
         # ALWAYS run auto_login to check credentials
         # (It will show what's missing in the status log)
@@ -272,6 +234,13 @@ class PelotonGarminSyncApp:
         )
         self.status_text.pack(fill=tk.X, padx=15, pady=(0, 15))
         
+        # Batched writes, capped history; the full log is kept in sync.log
+        self.status_log = StatusLog(
+            self.root, self.status_text,
+            max_lines=self.config.get('log_max_lines', DEFAULT_MAX_LINES),
+            log_file=self.config_dir / 'sync.log'
+        )
+        
         # Workouts card
         workouts_card = tk.Frame(main_container, bg=FLUENT_CARD_BG)
         workouts_card.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
@@ -313,10 +282,8 @@ class PelotonGarminSyncApp:
             tree_frame,
             columns=('select', 'date', 'workout', 'duration', 'calories'),
             show='headings',
-            selectmode='none',
-            yscrollcommand=scrollbar.set
+            selectmode='none'
         )
-        scrollbar.config(command=self.workout_tree.yview)
         
         # Define columns
         self.workout_tree.heading('select', text='☐')
@@ -334,6 +301,13 @@ class PelotonGarminSyncApp:
         self.workout_tree.pack(fill=tk.BOTH, expand=True)
         self.workout_tree.bind('<Button-1>', self.toggle_selection)
         
+        # Only the rows on screen exist in the tree; the list drives the scrollbar
+        self.workout_list = VirtualWorkoutList(
+            self.workout_tree, scrollbar,
+            selected=self.selected_workouts,
+            row_height=int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        )
+        
         # Action buttons
         action_frame = tk.Frame(main_container, bg=FLUENT_DARK_BG)
         action_frame.pack(fill=tk.X)
@@ -351,6 +325,19 @@ class PelotonGarminSyncApp:
         )
         sync_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        sync_new_btn = tk.Button(
+            action_frame,
+            text="⏩ Sync New",
+            font=('Segoe UI', 11),
+            bg=FLUENT_HOVER,
+            fg=FLUENT_TEXT,
+            relief='flat',
+            padx=30,
+            pady=12,
+            command=self.sync_new_workouts
+        )
+        sync_new_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
         export_btn = tk.Button(
             action_frame,
             text="📁 Export FIT Files",
@@ -362,7 +349,21 @@ class PelotonGarminSyncApp:
             pady=12,
             command=self.export_fit_files
         )
-        export_btn.pack(side=tk.LEFT)
+        export_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.cancel_btn = tk.Button(
+            action_frame,
+            text="✖ Cancel",
+            font=('Segoe UI', 11),
+            bg=FLUENT_HOVER,
+            fg=FLUENT_TEXT,
+            relief='flat',
+            padx=20,
+            pady=12,
+            state='disabled',
+            command=self.cancel_task
+        )
+        self.cancel_btn.pack(side=tk.LEFT)
         
         settings_btn = tk.Button(
             action_frame,
@@ -384,13 +385,39 @@ class PelotonGarminSyncApp:
         self.log_status("Ready. Check status below for configuration needs.")
     
     def log_status(self, message):
-        """Add message to status log"""
-        self.status_text.config(state='normal')
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        self.status_text.insert(tk.END, f"[{timestamp}] {message}\n")
-        self.status_text.see(tk.END)
-        self.status_text.config(state='disabled')
-        self.root.update()
+        """Add message to status log (safe to call from background tasks)"""
+        self.status_log.write(message)
+    
+    def run_task(self, name, job, on_done=None, on_error=None):
+        """
+        Run job(cancel_event) in the background
+        
+        Returns:
+            bool: False if another task is still running
+        """
+        if on_error is None:
+            on_error = lambda e: self.log_status(f"✗ {name} failed: {type(e).__name__}: {str(e)}")
+        return self.tasks.start(name, job, on_done, on_error)
+    
+    def task_running(self):
+        """Tell the user to wait if a background task is already running"""
+        if self.tasks.busy:
+            self.log_status(f"⚠ {self.tasks.name} is still running - wait for it to finish or click Cancel")
+            return True
+        return False
+    
+    def update_task_buttons(self, busy):
+        self.cancel_btn.config(state='normal' if busy else 'disabled')
+    
+    def cancel_task(self):
+        """Stop the running task after the workouts already in progress"""
+        if self.tasks.busy and not self.tasks.cancel_event.is_set():
+            self.log_status(f"Cancelling {self.tasks.name.lower()}...")
+            self.tasks.cancel()
+    
+    def set_indicator(self, label, text, fg):
+        """Update a connection indicator (safe to call from background tasks)"""
+        self.tasks.post(label.config, text=text, fg=fg)
     
     def toggle_selection(self, event):
         """Toggle workout selection"""
@@ -398,21 +425,19 @@ class PelotonGarminSyncApp:
         if region == 'cell':
             item = self.workout_tree.identify_row(event.y)
             if item:
-                current_values = list(self.workout_tree.item(item, 'values'))
-                # Toggle checkbox
-                if current_values[0] == '☐':
-                    current_values[0] = '☑'
-                    if item not in self.selected_workouts:
-                        self.selected_workouts.append(item)
-                else:
-                    current_values[0] = '☐'
-                    if item in self.selected_workouts:
-                        self.selected_workouts.remove(item)
-                
-                self.workout_tree.item(item, values=current_values)
+                self.workout_list.toggle(item)
     
     def auto_login(self):
         """Automatically login with saved credentials"""
+        self.run_task("Login", self._auto_login, on_done=self._auto_login_done)
+    
+    def _auto_login_done(self, result):
+        # Auto-fetch workouts if Peloton is configured
+        if self.peloton_auth:
+            self.fetch_workouts()
+    
+    def _auto_login(self, cancel):
+        """Validate the saved Peloton token and resume the Garmin session"""
         self.log_status("Checking saved credentials...")
         self.log_status(f"Config file: {self.config_file}")
         self.log_status(f"Config file exists: {self.config_file.exists()}")
@@ -430,17 +455,20 @@ class PelotonGarminSyncApp:
         
         if not peloton_token:
             self.log_status("⚠ No Peloton token found. Please configure in Settings.")
-            self.peloton_status.config(text="Peloton: ○", fg=FLUENT_TEXT_SECONDARY)
+            self.set_indicator(self.peloton_status, text="Peloton: ○", fg=FLUENT_TEXT_SECONDARY)
         else:
             # Initialize and test Peloton auth automatically
             self.log_status("Validating Peloton token...")
-            self.peloton_auth = PelotonBearerAuth()
+            self.peloton_auth = PelotonBearerAuth(
+                cache=self.performance_cache,
+                every_n=self.config.get('sample_interval', 5)
+            )
             if self.peloton_auth.set_bearer_token(peloton_token):
                 self.log_status("✓ Peloton token valid")
-                self.peloton_status.config(text="Peloton: ●", fg=FLUENT_SUCCESS)
+                self.set_indicator(self.peloton_status, text="Peloton: ●", fg=FLUENT_SUCCESS)
             else:
                 self.log_status("✗ Peloton token invalid - please update in Settings")
-                self.peloton_status.config(text="Peloton: ○", fg=FLUENT_ERROR)
+                self.set_indicator(self.peloton_status, text="Peloton: ○", fg=FLUENT_ERROR)
                 self.peloton_auth = None
         
         # Check Garmin tokens
@@ -465,7 +493,10 @@ class PelotonGarminSyncApp:
                 self.garmin_handler = GarminDataHandler(
                     email=garmin_email,
                     password='',  # Not needed for token resume
-                    token_store_path=str(self.garmin_tokens_dir)
+                    token_store_path=str(self.garmin_tokens_dir),
+                    wellness_cache=self.wellness_cache,
+                    activity_mirror=self.activity_mirror,
+                    strength_cache=self.strength_cache
                 )
                 self.log_status("Handler created successfully")
                 
@@ -477,18 +508,18 @@ class PelotonGarminSyncApp:
                 
                 if result and result.get('success'):
                     self.log_status("✓ Garmin session resumed successfully!")
-                    self.garmin_status.config(text="Garmin: ●", fg=FLUENT_SUCCESS)
+                    self.set_indicator(self.garmin_status, text="Garmin: ●", fg=FLUENT_SUCCESS)
                 else:
                     error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
                     self.log_status(f"✗ Garmin authentication failed: {error_msg}")
                     self.log_status("Tokens may have expired - please login again in Settings")
-                    self.garmin_status.config(text="Garmin: ○", fg=FLUENT_WARNING)
+                    self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_WARNING)
                     self.garmin_handler = None
                     
             except ImportError as ie:
                 self.log_status(f"✗ Failed to import garmin_handler_mfa: {str(ie)}")
                 self.log_status("Make sure garmin_handler_mfa.py is in the same directory")
-                self.garmin_status.config(text="Garmin: ○", fg=FLUENT_ERROR)
+                self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_ERROR)
                 self.garmin_handler = None
             except Exception as e:
                 import traceback
@@ -499,7 +530,7 @@ class PelotonGarminSyncApp:
                     if line.strip():
                         self.log_status(f"  {line}")
                 self.log_status("Please login manually in Settings")
-                self.garmin_status.config(text="Garmin: ○", fg=FLUENT_ERROR)
+                self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_ERROR)
                 self.garmin_handler = None
         else:
             missing = []
@@ -512,13 +543,9 @@ class PelotonGarminSyncApp:
             
             self.log_status(f"⚠ Garmin login required - missing: {', '.join(missing)}")
             self.log_status("Please login to Garmin in Settings")
-            self.garmin_status.config(text="Garmin: ○", fg=FLUENT_TEXT_SECONDARY)
+            self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_TEXT_SECONDARY)
             self.garmin_handler = None
         
-        # Auto-fetch workouts if Peloton is configured
-        if self.peloton_auth:
-            self.root.after(1000, self.fetch_workouts)
-        
         # Show configuration summary
         self.log_status("")
         self.log_status("─" * 50)
@@ -705,11 +732,24 @@ class PelotonGarminSyncApp:
         # Clean token
         token = token.strip('"').strip("'")
         
+        if self.task_running():
+            return
+        
         # Test the token
         self.log_status("Validating Peloton token...")
-        test_auth = PelotonBearerAuth()
+        test_auth = PelotonBearerAuth(
+            cache=self.performance_cache,
+            every_n=self.config.get('sample_interval', 5)
+        )
         
-        if test_auth.set_bearer_token(token):
+        self.run_task(
+            "Token check",
+            lambda cancel: test_auth.set_bearer_token(token),
+            on_done=lambda valid: self._peloton_token_checked(test_auth, token, valid)
+        )
+    
+    def _peloton_token_checked(self, test_auth, token, valid):
+        if valid:
             # Save token
             self.config['peloton_bearer_token'] = token
             self.save_config()
@@ -849,6 +889,11 @@ class PelotonGarminSyncApp:
     
     def perform_garmin_login(self, email, password):
         """Perform Garmin login with MFA support"""
+        if self.task_running():
+            return
+        self.run_task("Garmin login", lambda cancel: self._garmin_login(email, password))
+    
+    def _garmin_login(self, email, password):
         self.log_status("Connecting to Garmin Connect...")
         
         try:
@@ -859,13 +904,16 @@ class PelotonGarminSyncApp:
             self.garmin_handler = GarminDataHandler(
                 email=email,
                 password=password,
-                token_store_path=str(self.garmin_tokens_dir)
+                token_store_path=str(self.garmin_tokens_dir),
+                wellness_cache=self.wellness_cache,
+                activity_mirror=self.activity_mirror,
+                strength_cache=self.strength_cache
             )
             
-            # MFA callback
+            # MFA callback - the dialog has to run on the main thread
             def get_mfa_code():
                 self.log_status("⏳ Waiting for MFA code...")
-                code = self.show_mfa_dialog()
+                code = self.tasks.call(self.show_mfa_dialog)
                 if code:
                     self.log_status(f"✓ MFA code entered")
                 return code
@@ -891,8 +939,9 @@ class PelotonGarminSyncApp:
                     self.log_status("✗ WARNING: OAuth tokens were NOT saved!")
                     self.log_status("Auto-login will not work on next startup")
                 
-                self.garmin_status.config(text="Garmin: ●", fg=FLUENT_SUCCESS)
-                messagebox.showinfo(
+                self.set_indicator(self.garmin_status, text="Garmin: ●", fg=FLUENT_SUCCESS)
+                self.tasks.post(
+                    messagebox.showinfo,
                     "Success", 
                     "Successfully logged into Garmin Connect!\n\n"
                     "OAuth tokens saved - you won't need to login again.\n"
@@ -903,13 +952,13 @@ class PelotonGarminSyncApp:
                 # MFA callback will be triggered
             elif result.get('error'):
                 self.log_status(f"✗ Garmin login failed: {result['error']}")
-                self.garmin_status.config(text="Garmin: ○", fg=FLUENT_ERROR)
-                messagebox.showerror("Login Failed", result['error'])
+                self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_ERROR)
+                self.tasks.post(messagebox.showerror, "Login Failed", result['error'])
                 
         except Exception as e:
             self.log_status(f"✗ Garmin login error: {str(e)}")
-            self.garmin_status.config(text="Garmin: ○", fg=FLUENT_ERROR)
-            messagebox.showerror("Error", f"Failed to login:\n\n{str(e)}")
+            self.set_indicator(self.garmin_status, text="Garmin: ○", fg=FLUENT_ERROR)
+            self.tasks.post(messagebox.showerror, "Error", f"Failed to login:\n\n{str(e)}")
     
     def show_mfa_dialog(self):
         """Show MFA code input dialog"""
@@ -984,7 +1033,10 @@ class PelotonGarminSyncApp:
         return mfa_code[0]
     
     def fetch_workouts(self):
-        """Fetch recent Peloton workouts"""
+        """Load the full Peloton workout history, newest first"""
+        if self.task_running():
+            return
+        
         if not self.peloton_auth:
             self.log_status("✗ Cannot fetch workouts - Peloton not configured")
             messagebox.showinfo(
@@ -1002,57 +1054,210 @@ class PelotonGarminSyncApp:
         
         self.log_status("Fetching workouts from Peloton...")
         
+        self.run_task(
+            "Fetch",
+            self._load_workouts,
+            on_done=self._workouts_loaded,
+            on_error=self._fetch_failed
+        )
+    
+    def _load_workouts(self, cancel):
+        """Background part of fetch_workouts - hands each page to the list as it arrives"""
+        workouts = []
+        batch = []
+        for workout in self.peloton_auth.iter_workouts(page_size=WORKOUT_PAGE_SIZE):
+            if cancel.is_set():
+                break
+            batch.append(workout)
+            if len(batch) >= WORKOUT_PAGE_SIZE:
+                self.tasks.post(self._add_workouts, batch)
+                workouts.extend(batch)
+                batch = []
+        
+        if batch:
+            self.tasks.post(self._add_workouts, batch)
+            workouts.extend(batch)
+        return {'workouts': workouts, 'cancelled': cancel.is_set()}
+    
+    def _fetch_failed(self, e):
+        self.log_status(f"✗ Error: {str(e)}")
+        messagebox.showerror("Error", f"Failed to fetch workouts:\n\n{str(e)}")
+    
+    def _add_workouts(self, workouts):
+        """Show a page of fetched workouts, keeping the ones already listed"""
+        self.workout_store.update(workouts)
+        
+        # Only rows that are new or changed get re-formatted; scroll position and selection stay
+        self.workout_list.set_workouts(self.workout_store.newest_first())
+    
+    def _workouts_loaded(self, result):
+        """Finish a history load"""
+        workouts = result['workouts']
+        if result['cancelled']:
+            self.log_status(f"⏹ Stopped loading workouts after {len(workouts)}")
+            return
+        
         try:
-            # Fetch workouts
-            workouts = self.peloton_auth.get_workouts(limit=20)
-            self.workout_data = workouts
-            
-            # Clear tree
-            for item in self.workout_tree.get_children():
-                self.workout_tree.delete(item)
-            
-            # Populate tree
-            for workout in workouts:
-                workout_id = workout.get('id')
-                created_at = workout.get('created_at', 0)
-                date_str = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M')
-                
-                ride = workout.get('ride', {})
-                title = ride.get('title', 'Untitled')
-                instructor_data = ride.get('instructor', {})
-                instructor = instructor_data.get('name', '')
-                
-                workout_type = ride.get('fitness_discipline', 'Workout').replace('_', ' ').title()
-                
-                if instructor:
-                    display_name = f"{title} - {instructor}"
-                else:
-                    display_name = title
-                
-                duration_sec = ride.get('duration', 0)
-                duration_min = duration_sec // 60
-                
-                calories = workout.get('calories', 0)
-                
-                self.workout_tree.insert('', tk.END, iid=workout_id,
-                                       values=('☐', date_str, display_name,
-                                              f"{duration_min} min", f"{calories:.0f}"))
+            # The whole history was read - drop workouts deleted on Peloton since the last load
+            self.workout_store.replace(workouts)
+            self.workout_list.set_workouts(self.workout_store.newest_first())
             
             self.log_status(f"✓ Loaded {len(workouts)} workouts")
             
         except Exception as e:
-            self.log_status(f"✗ Error: {str(e)}")
-            messagebox.showerror("Error", f"Failed to fetch workouts:\n\n{str(e)}")
+            self._fetch_failed(e)
     
     def sync_to_garmin(self):
         """Sync selected workouts to Garmin"""
+        if self.task_running():
+            return
+        
         if not self.selected_workouts:
             messagebox.showwarning("No Selection", "Please select workouts to sync")
             return
         
+        if not self.check_sync_ready():
+            return
+        
+        self.log_status(f"Starting sync of {len(self.selected_workouts)} workouts...")
+        
+        try:
+            # Find workout data
+            selected = []
+            already_synced = []
+            for workout_id in self.workout_list.selected_ids():
+                workout = self.workout_store.get(workout_id)
+                if not workout:
+                    self.log_status(f"✗ Workout {workout_id} not found in data")
+                    continue
+                
+                # Anything already on Garmin is skipped before paying for fetch/convert/upload
+                if self.sync_ledger.is_synced(workout_id):
+                    already_synced.append(workout)
+                else:
+                    selected.append(workout)
+            
+            if already_synced:
+                resync = self._confirm_resync(already_synced)
+                if resync is None:
+                    self.log_status("Sync cancelled")
+                    return
+                
+                if resync:
+                    # Forget the earlier uploads so the ledger records the new activities
+                    for workout in already_synced:
+                        self.sync_ledger.forget(workout.id)
+                        self.log_status(f"↻ Uploading again: {workout.display_name}")
+                    selected.extend(already_synced)
+                else:
+                    for workout in already_synced:
+                        self.log_status(f"↷ Skipping {workout.display_name} - already synced to Garmin")
+            
+            if not selected:
+                if already_synced:
+                    self.log_status("✓ Nothing to sync - all selected workouts already uploaded")
+                return
+            
+            self.run_task(
+                "Sync",
+                lambda cancel: self._run_sync(selected, cancel),
+                on_done=self._sync_done,
+                on_error=self._sync_failed
+            )
+                
+        except Exception as e:
+            self._sync_failed(e)
+    
+    def _confirm_resync(self, workouts):
+        """
+        Ask whether workouts the ledger says are on Garmin should be uploaded again
+        
+        Returns:
+            bool: True to upload them again, False to skip them, None to cancel the sync
+        """
+        names = "\n".join(f"• {workout.display_name}" for workout in workouts[:10])
+        if len(workouts) > 10:
+            names += f"\n… and {len(workouts) - 10} more"
+        
+        return messagebox.askyesnocancel(
+            "Already Synced",
+            f"{len(workouts)} of the selected workouts were already uploaded to Garmin Connect:\n\n"
+            f"{names}\n\n"
+            "Upload them again? Only do this if you deleted them on Garmin - otherwise "
+            "Garmin rejects them as duplicates.\n\n"
+            "Yes: upload again    No: skip them    Cancel: don't sync"
+        )
+    
+    def _make_converter(self):
+        # Use simple TCX converter - bypasses FIT file issues
+        from simple_fit_converter import SimpleFitConverter
+        return SimpleFitConverter(
+            self.peloton_auth, self.garmin_handler.client,
+            file_format=self.config.get('upload_format', 'tcx'),
+            max_points=self.config.get('max_trackpoints')
+        )
+    
+    def _sync_options(self, cancel):
+        return dict(
+            log=self.log_status,
+            max_workers=self.config.get('max_workers'),
+            upload_workers=self.config.get('upload_workers', 1),
+            upload_rate=self.config.get('upload_rate', DEFAULT_UPLOAD_RATE),
+            cancel=cancel
+        )
+    
+    def _run_sync(self, selected, cancel):
+        """Background part of sync_to_garmin"""
+        from sync_engine import sync_workouts
+        results = sync_workouts(self.peloton_auth, self._make_converter(), selected,
+                                ledger=self.sync_ledger, **self._sync_options(cancel))
+        return results, cancel.is_set()
+    
+    def _run_incremental_sync(self, cancel):
+        """Background part of sync_new_workouts"""
+        from sync_engine import incremental_sync
+        results = incremental_sync(self.peloton_auth, self._make_converter(), self.sync_ledger,
+                                   **self._sync_options(cancel))
+        return results, cancel.is_set()
+    
+    def _sync_done(self, outcome):
+        results, cancelled = outcome
+        if cancelled:
+            success_count = sum(1 for r in results if r['success'])
+            self.log_status(f"⏹ Sync cancelled: {success_count} workouts uploaded before stopping")
+            messagebox.showinfo(
+                "Sync Cancelled",
+                f"Uploaded {success_count} workouts before the sync was cancelled.\n\n"
+                "The rest will be picked up by the next sync."
+            )
+        elif results:
+            self.show_sync_summary(results)
+        else:
+            messagebox.showinfo("Up to Date", "No new workouts to sync since the last run.")
+    
+    def _sync_failed(self, e):
+        self.log_status(f"✗ Sync error: {str(e)}")
+        messagebox.showerror("Error", f"Sync failed:\n\n{str(e)}")
+    
+    def sync_new_workouts(self):
+        """Sync every workout created since the last sync"""
+        if self.task_running() or not self.check_sync_ready():
+            return
+        
+        self.log_status("Checking Peloton for new workouts since last sync...")
+        
+        self.run_task(
+            "Sync",
+            self._run_incremental_sync,
+            on_done=self._sync_done,
+            on_error=self._sync_failed
+        )
+    
+    def check_sync_ready(self):
+        """Verify both accounts are configured before syncing"""
         if not self.peloton_auth:
             messagebox.showwarning("Not Configured", "Please configure Peloton in Settings first")
-            return
+            return False
         
         # Check if Garmin handler exists and is authenticated
         if not self.garmin_handler:
@@ -1063,7 +1268,7 @@ class PelotonGarminSyncApp:
                 "The app should auto-login on startup if you've logged in before.\n"
                 "If auto-login failed, check the status log for details."
             )
-            return
+            return False
         
         # Verify Garmin client exists
         if not hasattr(self.garmin_handler, 'client') or not self.garmin_handler.client:
@@ -1073,99 +1278,41 @@ class PelotonGarminSyncApp:
                 "Garmin connection not ready.\n\n"
                 "Please try logging in again in Settings."
             )
-            return
+            return False
         
-        self.log_status(f"Starting sync of {len(self.selected_workouts)} workouts...")
+        return True
+    
+    def show_sync_summary(self, results):
+        """Show the outcome of a sync run"""
+        total = len(results)
+        success_count = sum(1 for r in results if r['success'])
+        failed_workouts = [f"{r['name']}: {r['error']}" for r in results if not r['success']]
         
-        try:
-            import tempfile
-            import shutil
-            from datetime import datetime
-            
-            # Use simple TCX converter - bypasses FIT file issues
-            from simple_fit_converter import SimpleFitConverter
-            converter = SimpleFitConverter(self.peloton_auth, self.garmin_handler.client)
-            
-            success_count = 0
-            failed_workouts = []
-            
-            for workout_id in self.selected_workouts:
-                try:
-                    # Find workout data
-                    workout = next((w for w in self.workout_data if w['id'] == workout_id), None)
-                    if not workout:
-                        self.log_status(f"✗ Workout {workout_id} not found in data")
-                        continue
-                    
-                    # Get workout details
-                    ride = workout.get('ride', {})
-                    title = ride.get('title', 'Peloton Workout')
-                    instructor_data = ride.get('instructor', {})
-                    instructor = instructor_data.get('name', '')
-                    
-                    display_name = f"{title} - {instructor}" if instructor else title
-                    
-                    self.log_status(f"Syncing: {display_name}")
-                    
-                    # Upload directly using TCX
-                    result = converter.sync_workout(workout)
-                    
-                    if result.get('success'):
-                        self.log_status(f"✓ Uploaded: {display_name}")
-                        success_count += 1
-                    else:
-                        error_msg = result.get('error', 'Unknown error')
-                        self.log_status(f"✗ Upload failed: {display_name} - {error_msg}")
-                        failed_workouts.append(f"{display_name}: {error_msg}")
-                    
-                except Exception as e:
-                    import traceback
-                    error_msg = str(e)
-                    error_type = type(e).__name__
-                    
-                    # Get full traceback
-                    tb = traceback.format_exc()
-                    
-                    self.log_status(f"✗ Error processing {workout_id}: {error_type}: {error_msg}")
-                    
-                    # Log the traceback to see exactly where it failed
-                    for line in tb.split('\n'):
-                        if line.strip():
-                            self.log_status(f"  {line}")
-                    
-                    # Add to failed list with more context
-                    if display_name:
-                        failed_workouts.append(f"{display_name}: {error_msg}")
-                    else:
-                        failed_workouts.append(f"{workout_id}: {error_msg}")
-            
-            # Show summary
-            if success_count == len(self.selected_workouts):
-                messagebox.showinfo(
-                    "Sync Complete", 
-                    f"Successfully synced all {success_count} workouts to Garmin Connect!"
-                )
-                self.log_status(f"✓ Sync complete: {success_count}/{len(self.selected_workouts)} successful")
-            elif success_count > 0:
-                messagebox.showwarning(
-                    "Partial Success",
-                    f"Synced {success_count} of {len(self.selected_workouts)} workouts.\n\n"
-                    f"Failed workouts:\n" + "\n".join(failed_workouts[:5])
-                )
-                self.log_status(f"⚠ Partial sync: {success_count}/{len(self.selected_workouts)} successful")
-            else:
-                messagebox.showerror(
-                    "Sync Failed",
-                    "Failed to sync any workouts. Check the status log for details."
-                )
-                self.log_status(f"✗ Sync failed: 0/{len(self.selected_workouts)} successful")
-                
-        except Exception as e:
-            self.log_status(f"✗ Sync error: {str(e)}")
-            messagebox.showerror("Error", f"Sync failed:\n\n{str(e)}")
+        if success_count == total:
+            messagebox.showinfo(
+                "Sync Complete", 
+                f"Successfully synced all {success_count} workouts to Garmin Connect!"
+            )
+            self.log_status(f"✓ Sync complete: {success_count}/{total} successful")
+        elif success_count > 0:
+            messagebox.showwarning(
+                "Partial Success",
+                f"Synced {success_count} of {total} workouts.\n\n"
+                f"Failed workouts:\n" + "\n".join(failed_workouts[:5])
+            )
+            self.log_status(f"⚠ Partial sync: {success_count}/{total} successful")
+        else:
+            messagebox.showerror(
+                "Sync Failed",
+                "Failed to sync any workouts. Check the status log for details."
+            )
+            self.log_status(f"✗ Sync failed: 0/{total} successful")
     
     def export_fit_files(self):
         """Export selected workouts as FIT files"""
+        if self.task_running():
+            return
+        
         if not self.selected_workouts:
             messagebox.showwarning("No Selection", "Please select workouts to export")
             return
@@ -1181,75 +1328,102 @@ class PelotonGarminSyncApp:
         
         self.log_status(f"Exporting {len(self.selected_workouts)} FIT files to {folder}...")
         
-        try:
-            from datetime import datetime
-            from fit_converter import PelotonToFitConverter
-            
-            converter = PelotonToFitConverter(self.peloton_auth)
-            success_count = 0
-            failed_workouts = []
-            
-            for workout_id in self.selected_workouts:
-                try:
-                    # Find workout data
-                    workout = next((w for w in self.workout_data if w['id'] == workout_id), None)
-                    if not workout:
-                        self.log_status(f"✗ Workout {workout_id} not found")
-                        continue
-                    
-                    # Get workout details
-                    ride = workout.get('ride', {})
-                    title = ride.get('title', 'Peloton Workout')
-                    instructor_data = ride.get('instructor', {})
-                    instructor = instructor_data.get('name', '')
-                    created_at = workout.get('created_at', 0)
-                    date_str = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d_%H%M')
-                    
-                    display_name = f"{title} - {instructor}" if instructor else title
-                    
-                    # Create safe filename
-                    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
-                    filename = f"{date_str}_{safe_title}_{workout_id}.fit"
-                    fit_path = os.path.join(folder, filename)
-                    
-                    self.log_status(f"Exporting: {display_name}")
-                    
-                    # Convert to FIT
-                    converter.convert_workout_to_fit(workout, fit_path)
-                    
-                    self.log_status(f"✓ Exported: {filename}")
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    self.log_status(f"✗ Error exporting {workout_id}: {error_msg}")
-                    failed_workouts.append(f"{workout_id} - {error_msg}")
+        workout_ids = self.workout_list.selected_ids()
+        self.run_task(
+            "Export",
+            lambda cancel: self._run_export(workout_ids, folder, cancel),
+            on_done=self._export_done,
+            on_error=self._export_failed
+        )
+    
+    def _run_export(self, workout_ids, folder, cancel):
+        """Background part of export_fit_files"""
+        from fit_converter import PelotonToFitConverter
+        
+        converter = PelotonToFitConverter(self.peloton_auth, self.config.get('max_trackpoints'))
+        success_count = 0
+        failed_workouts = []
+        
+        for workout_id in workout_ids:
+            if cancel.is_set():
+                break
             
-            # Show summary
-            if success_count == len(self.selected_workouts):
-                messagebox.showinfo(
-                    "Export Complete",
-                    f"Successfully exported {success_count} FIT files to:\n{folder}\n\n"
-                    "You can now upload these files manually at connect.garmin.com"
-                )
-                self.log_status(f"✓ Export complete: {success_count}/{len(self.selected_workouts)} files")
-            elif success_count > 0:
-                messagebox.showwarning(
-                    "Partial Success",
-                    f"Exported {success_count} of {len(self.selected_workouts)} files to:\n{folder}\n\n"
-                    f"Failed: {len(failed_workouts)} workouts"
-                )
-                self.log_status(f"⚠ Partial export: {success_count}/{len(self.selected_workouts)} successful")
-            else:
-                messagebox.showerror(
-                    "Export Failed",
-                    "Failed to export any files. Check the status log for details."
-                )
-                self.log_status(f"✗ Export failed: 0/{len(self.selected_workouts)} successful")
+            try:
+                # Find workout data
+                workout = self.workout_store.get(workout_id)
+                if not workout:
+                    self.log_status(f"✗ Workout {workout_id} not found")
+                    continue
                 
-        except Exception as e:
-            self.log_status(f"✗ Export error: {str(e)}")
-            messagebox.showerror("Error", f"Export failed:\n\n{str(e)}")
+                # Get workout details
+                title = workout.ride.title or 'Peloton Workout'
+                date_str = datetime.fromtimestamp(workout.created_at).strftime('%Y-%m-%d_%H%M')
+                display_name = workout.display_name
+                
+                # Create safe filename
+                safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+                filename = f"{date_str}_{safe_title}_{workout_id}.fit"
+                fit_path = os.path.join(folder, filename)
+                
+                self.log_status(f"Exporting: {display_name}")
+                
+                # Convert to FIT
+                converter.convert_workout_to_fit(workout, fit_path)
+                
+                self.log_status(f"✓ Exported: {filename}")
+                success_count += 1
+                
+            except Exception as e:
+                error_msg = str(e)
+                self.log_status(f"✗ Error exporting {workout_id}: {error_msg}")
+                failed_workouts.append(f"{workout_id} - {error_msg}")
+        
+        return {
+            'folder': folder,
+            'total': len(workout_ids),
+            'success_count': success_count,
+            'failed_workouts': failed_workouts,
+            'cancelled': cancel.is_set()
+        }
+    
+    def _export_done(self, summary):
+        """Show the outcome of an export"""
+        folder = summary['folder']
+        total = summary['total']
+        success_count = summary['success_count']
+        failed_workouts = summary['failed_workouts']
+        
+        if summary['cancelled']:
+            messagebox.showinfo(
+                "Export Cancelled",
+                f"Exported {success_count} of {total} files to:\n{folder}\n\n"
+                "The export was cancelled before the rest were written."
+            )
+            self.log_status(f"⏹ Export cancelled: {success_count}/{total} files")
+        elif success_count == total:
+            messagebox.showinfo(
+                "Export Complete",
+                f"Successfully exported {success_count} FIT files to:\n{folder}\n\n"
+                "You can now upload these files manually at connect.garmin.com"
+            )
+            self.log_status(f"✓ Export complete: {success_count}/{total} files")
+        elif success_count > 0:
+            messagebox.showwarning(
+                "Partial Success",
+                f"Exported {success_count} of {total} files to:\n{folder}\n\n"
+                f"Failed: {len(failed_workouts)} workouts"
+            )
+            self.log_status(f"⚠ Partial export: {success_count}/{total} successful")
+        else:
+            messagebox.showerror(
+                "Export Failed",
+                "Failed to export any files. Check the status log for details."
+            )
+            self.log_status(f"✗ Export failed: 0/{total} successful")
+    
+    def _export_failed(self, e):
+        self.log_status(f"✗ Export error: {str(e)}")
+        messagebox.showerror("Error", f"Export failed:\n\n{str(e)}")
 
 
 def main():
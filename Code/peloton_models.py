@@ -0,0 +1,235 @@
+"""
+Compact records for Peloton API data
+The workouts listing (joins=ride,ride.instructor) and performance_graph
+responses are parsed once, where they come off the wire, into __slots__
+records holding only the fields the app uses. Metric samples are stored as
+array('f') columns instead of lists of Python numbers, with NaN marking a
+missing sample.
+"""
+
+from array import array
+
+
+MISSING = float('nan')
+
+
+def is_missing(value):
+    """True for None and NaN samples"""
+    return value is None or value != value
+
+
+def _float_column(values):
+    values = values or ()
+    try:
+        return array('f', [MISSING if value is None else value for value in values])
+    except TypeError:
+        pass
+    
+    # Strings or other oddities in the samples
+    column = array('f')
+    for value in values:
+        try:
+            column.append(float(value))
+        except (TypeError, ValueError):
+            column.append(MISSING)
+    return column
+
+
+class _Record:
+    """Equality and repr over __slots__"""
+    
+    __slots__ = ()
+    
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __eq__(self, other):
+        return type(other) is type(self) and other._fields() == self._fields()
+    
+    def __ne__(self, other):
+        return not self == other
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Instructor(_Record):
+    __slots__ = ('id', 'name')
+    
+    def __init__(self, id=None, name=''):
+        self.id = id
+        self.name = name
+    
+    @classmethod
+    def from_json(cls, data):
+        if not data:
+            return None
+        return cls(data.get('id'), data.get('name') or '')
+    
+    def to_json(self):
+        return {'id': self.id, 'name': self.name}
+
+
+class Ride(_Record):
+    __slots__ = ('id', 'title', 'duration', 'fitness_discipline', 'instructor')
+    
+    def __init__(self, id=None, title=None, duration=0, fitness_discipline='', instructor=None):
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.fitness_discipline = fitness_discipline
+        self.instructor = instructor
+    
+    @classmethod
+    def from_json(cls, data):
+        data = data or {}
+        return cls(
+            data.get('id'),
+            data.get('title'),
+            data.get('duration') or 0,
+            data.get('fitness_discipline') or '',
+            Instructor.from_json(data.get('instructor'))
+        )
+    
+    def to_json(self):
+        return {
+            'id': self.id,
+            'title': self.title,
+            'duration': self.duration,
+            'fitness_discipline': self.fitness_discipline,
+            'instructor': self.instructor.to_json() if self.instructor else None
+        }
+    
+    @property
+    def instructor_name(self):
+        return self.instructor.name if self.instructor else ''
+
+
+class Workout(_Record):
+    __slots__ = ('id', 'created_at', 'start_time', 'status', 'fitness_discipline',
+                 'calories', 'total_work', 'ride')
+    
+    def __init__(self, id, created_at=0, start_time=None, status='COMPLETE', fitness_discipline='',
+                 calories=0, total_work=0, ride=None):
+        self.id = id
+        self.created_at = created_at
+        self.start_time = start_time
+        self.status = status
+        self.fitness_discipline = fitness_discipline
+        self.calories = calories
+        self.total_work = total_work
+        self.ride = ride if ride is not None else Ride()
+    
+    @classmethod
+    def from_json(cls, data):
+        """Parse a workout from the listing (or from to_json())"""
+        return cls(
+            data['id'],
+            data.get('created_at') or 0,
+            data.get('start_time'),
+            data.get('status') or 'COMPLETE',
+            data.get('fitness_discipline') or '',
+            data.get('calories') or 0,
+            data.get('total_work') or 0,
+            Ride.from_json(data.get('ride'))
+        )
+    
+    def to_json(self):
+        """Listing-shaped dict with the fields kept here (for the sync ledger)"""
+        return {
+            'id': self.id,
+            'created_at': self.created_at,
+            'start_time': self.start_time,
+            'status': self.status,
+            'fitness_discipline': self.fitness_discipline,
+            'calories': self.calories,
+            'total_work': self.total_work,
+            'ride': self.ride.to_json()
+        }
+    
+    @property
+    def discipline(self):
+        return self.fitness_discipline or self.ride.fitness_discipline
+    
+    @property
+    def finished(self):
+        """Only finished workouts are safe to serve from the cache"""
+        return self.status == 'COMPLETE'
+    
+    @property
+    def display_name(self):
+        """Human readable "Title - Instructor" name"""
+        title = self.ride.title or 'Peloton Workout'
+        instructor = self.ride.instructor_name
+        return f"{title} - {instructor}" if instructor else title
+
+
+class PerformanceGraph(_Record):
+    """
+    A performance_graph response
+    
+    metrics maps each slug (output, cadence, heart_rate, speed, ...) to an
+    array('f') column; averages/maxima hold each metric's average_value and
+    max_value, and summaries map slug -> (value, display_unit).
+    """
+    
+    __slots__ = ('duration', 'every_n', 'seconds_since_pedaling_start', 'metrics',
+                 'averages', 'maxima', 'summaries')
+    
+    def __init__(self, duration=0, every_n=None, seconds_since_pedaling_start=None, metrics=None,
+                 averages=None, maxima=None, summaries=None):
+        self.duration = duration
+        self.every_n = every_n
+        self.seconds_since_pedaling_start = seconds_since_pedaling_start or array('i')
+        self.metrics = metrics or {}
+        self.averages = averages or {}
+        self.maxima = maxima or {}
+        self.summaries = summaries or {}
+    
+    @classmethod
+    def from_json(cls, data, every_n=None):
+        """
+        Args:
+            data: performance_graph response
+            every_n: Seconds per sample that was requested - the response does not echo it
+        """
+        if data is None:
+            return None
+        
+        metrics, averages, maxima = {}, {}, {}
+        for metric in data.get('metrics') or []:
+            slug = metric.get('slug', '')
+            metrics[slug] = _float_column(metric.get('values'))
+            averages[slug] = metric.get('average_value')
+            maxima[slug] = metric.get('max_value')
+        
+        summaries = {
+            summary.get('slug', ''): (summary.get('value'), summary.get('display_unit', ''))
+            for summary in data.get('summaries') or []
+        }
+        
+        return cls(
+            data.get('duration') or 0,
+            every_n or data.get('every_n'),
+            array('i', (int(offset) for offset in data.get('seconds_since_pedaling_start') or ())),
+            metrics, averages, maxima, summaries
+        )
+    
+    def summary(self, slug, default=None):
+        """A summary value (e.g. 'distance', 'calories')"""
+        return self.summaries.get(slug, (default, ''))[0]
+    
+    def distance_meters(self):
+        """The distance summary converted to meters, or None if there is none"""
+        if 'distance' not in self.summaries:
+            return None
+        value, display_unit = self.summaries['distance']
+        value = value or 0
+        if display_unit == 'mi':
+            return value * 1609.34  # miles to meters
+        elif display_unit == 'km':
+            return value * 1000  # km to meters
+        return value  # assume already meters
@@ -0,0 +1,135 @@
+"""
+Deferred activity renaming
+Uploads only queue the "Title - Date" rename for the new Garmin activity; a
+background thread applies queued renames in batches, off the upload's
+critical path. Pending renames are kept in the sync ledger, so a rename that
+fails is retried on its own later without uploading the file again.
+"""
+
+import threading
+
+
+class RenameQueue:
+    """Background, batched set_activity_name calls"""
+    
+    def __init__(self, garmin_client, ledger=None, bucket=None, batch_size=10,
+                 flush_interval=2.0, max_attempts=3, log=print):
+        """
+        Args:
+            garmin_client: Logged in garminconnect client
+            ledger: Optional SyncLedger persisting renames until they succeed
+            bucket: Optional TokenBucket shared with uploads
+            batch_size: Queued renames that trigger an early flush
+            flush_interval: Seconds between background flushes
+            max_attempts: Attempts per rename in this session (the ledger keeps
+                          it for the next session after that, up to its
+                          max_rename_attempts)
+            log: Callable receiving progress messages
+        """
+        self.garmin_client = garmin_client
+        self.ledger = ledger
+        self.bucket = bucket
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.log = log
+        
+        self._pending = {}  # activity_id -> [name, attempts]
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        
+        # Renames left over from an earlier session
+        if ledger is not None:
+            for activity_id, name in ledger.pending_renames():
+                self._pending[activity_id] = [name, 0]
+    
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+    
+    def enqueue(self, activity_id, name):
+        """Queue a rename for a freshly uploaded activity"""
+        if self.ledger is not None:
+            self.ledger.queue_rename(activity_id, name)
+        
+        with self._lock:
+            self._pending[activity_id] = [name, 0]
+            full = len(self._pending) >= self.batch_size
+        
+        if full:
+            self._wake.set()
+    
+    def start(self):
+        """Start flushing in the background"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='rename-queue', daemon=True)
+            self._thread.start()
+    
+    def close(self):
+        """Stop the background thread and apply whatever is still queued"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+    
+    def flush(self):
+        """
+        Apply every queued rename
+        
+        Returns:
+            int: Number of activities renamed
+        """
+        with self._lock:
+            batch = [(activity_id, name) for activity_id, (name, _) in self._pending.items()]
+        
+        renamed = 0
+        for activity_id, name in batch:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            
+            try:
+                self.garmin_client.set_activity_name(activity_id, name)
+            except Exception as e:
+                self._failed(activity_id, e)
+                continue
+            
+            with self._lock:
+                self._pending.pop(activity_id, None)
+            if self.ledger is not None:
+                self.ledger.complete_rename(activity_id)
+            renamed += 1
+        
+        return renamed
+    
+    def _failed(self, activity_id, error):
+        with self._lock:
+            entry = self._pending.get(activity_id)
+            if entry is None:
+                return
+            entry[1] += 1
+            gave_up = entry[1] >= self.max_attempts
+        
+        dropped = self.ledger is not None and not self.ledger.rename_failed(activity_id, str(error))
+        if dropped:
+            # Failed in every session it was allowed - stop trying for good
+            gave_up = True
+        
+        if gave_up:
+            with self._lock:
+                # Stays in the ledger for the next session unless it was dropped
+                self._pending.pop(activity_id, None)
+            if dropped:
+                self.log(f"✗ Giving up on renaming activity {activity_id} ({error})")
+            else:
+                self.log(f"⚠ Could not rename activity {activity_id}: {error}")
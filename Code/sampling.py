@@ -0,0 +1,106 @@
+"""
+Sample timing and downsampling helpers for performance_graph data
+Shared by the TCX and FIT writers so both place samples at the same times.
+"""
+
+
+def sample_offsets(perf_data, num_samples):
+    """
+    Seconds from the start of the workout for each performance_graph sample
+    
+    Uses seconds_since_pedaling_start when the response has it, otherwise
+    spaces the samples by the every_n the graph was requested with.
+    
+    Args:
+        perf_data: PerformanceGraph
+        num_samples: Number of metric samples
+    
+    Returns:
+        list: Integer offsets in seconds, one per sample
+    
+    Raises:
+        ValueError: The graph has neither sample times nor an every_n
+    """
+    offsets = perf_data.seconds_since_pedaling_start
+    if len(offsets) >= num_samples:
+        return offsets[:num_samples].tolist()
+    
+    if not perf_data.every_n:
+        raise ValueError("Performance graph has no sample times and no every_n")
+    return [i * perf_data.every_n for i in range(num_samples)]
+
+
+def lttb_indices(values, threshold, offsets=None):
+    """
+    Pick the samples to keep with largest-triangle-three-buckets
+    
+    LTTB keeps the first and last samples and, from each bucket in
+    between, the one forming the largest triangle with its neighbours -
+    so peaks and drops survive where plain decimation would skip them.
+    
+    Args:
+        values: Sample values (None and NaN are treated as 0)
+        threshold: Number of samples to keep
+        offsets: Optional x positions (e.g. sample_offsets), default 0..n-1
+    
+    Returns:
+        list: Sorted indices of the samples to keep
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    
+    y = [float(v) if v and v == v else 0.0 for v in values]
+    x = offsets if offsets is not None else range(n)
+    
+    selected = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        
+        # Average point of the next bucket (the last sample for the final bucket)
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        count = next_end - end
+        avg_x = sum(x[end:next_end]) / count
+        avg_y = sum(y[end:next_end]) / count
+        
+        ax, ay = x[a], y[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (y[j] - ay) - (ax - x[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        
+        selected.append(best)
+        a = best
+    
+    selected.append(n - 1)
+    return selected
+
+
+def select_samples(metrics_by_slug, num_samples, max_points=None, offsets=None):
+    """
+    Indices of the samples to write as trackpoints/records
+    
+    Every sample is kept unless max_points is set and exceeded, in which
+    case power (or heart rate, for workouts without power) is downsampled
+    with LTTB.
+    
+    Args:
+        metrics_by_slug: PerformanceGraph.metrics columns keyed by slug
+        num_samples: Number of samples
+        max_points: Optional cap on the number of samples kept
+        offsets: Sample offsets in seconds
+    
+    Returns:
+        list: Sorted sample indices
+    """
+    if not max_points or num_samples <= max_points:
+        return list(range(num_samples))
+    
+    values = metrics_by_slug.get('output') or metrics_by_slug.get('heart_rate') or []
+    values = list(values[:num_samples]) + [None] * (num_samples - len(values))
+    return lttb_indices(values, max_points, offsets)
@@ -4,157 +4,304 @@ Bypasses fit-tool library issues
 """
 
 from garminconnect import Garmin
+import hashlib
+import io
 import json
 from datetime import datetime
+from peloton_models import is_missing
+from sampling import sample_offsets, select_samples
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def upload_activity_data(garmin_client, filename, data):
+    """
+    Upload an activity file to Garmin Connect straight from memory
+    
+    Sends the same multipart request as garminconnect's upload_activity,
+    without writing the file to disk first.
+    
+    Args:
+        garmin_client: Logged in garminconnect client
+        filename: Name sent with the upload - its extension (.tcx/.fit) tells
+                  Garmin the file format
+        data: File contents as bytes or a binary file-like object
+    
+    Returns:
+        Upload response from Garmin
+    """
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = io.BytesIO(data)
+    
+    # garminconnect exposes its HTTP client as .garth (older) or .client (newer)
+    http = getattr(garmin_client, 'garth', None) or getattr(garmin_client, 'client', None)
+    if http is None or not hasattr(http, 'post'):
+        raise Exception("Garmin client does not support in-memory uploads")
+    
+    upload_url = getattr(garmin_client, 'garmin_connect_upload', '/upload-service/upload')
+    files = {'file': (filename, data)}
+    return http.post('connectapi', upload_url, files=files, api=True)
+
+
+def activity_id_from_upload(response_data):
+    """
+    Garmin activity id from an upload response
+    
+    Returns:
+        int: The id from detailedImportResult (successes[0].internalId, or
+             activityId on older responses), or None if Garmin has not
+             assigned one yet
+    """
+    import_result = (response_data or {}).get('detailedImportResult') or {}
+    successes = import_result.get('successes') or []
+    if successes and successes[0].get('internalId'):
+        return successes[0]['internalId']
+    return import_result.get('activityId')
+
+
+# Import result message code Garmin uses for "Duplicate Activity."
+DUPLICATE_ACTIVITY_CODE = 202
+
+
+def duplicate_activity_from_upload(response_data):
+    """
+    Check an upload response for Garmin's duplicate activity rejection
+    
+    Returns:
+        tuple: (is_duplicate, id of the activity Garmin already has or None)
+    """
+    import_result = (response_data or {}).get('detailedImportResult') or {}
+    for failure in import_result.get('failures') or []:
+        for message in failure.get('messages') or []:
+            if (message.get('code') == DUPLICATE_ACTIVITY_CODE
+                    or 'duplicate' in str(message.get('content', '')).lower()):
+                return True, failure.get('internalId')
+    return False, None
+
+
+def duplicate_activity_from_error(error):
+    """
+    Check whether an upload failed because Garmin already has the activity
+    
+    Garmin answers a re-upload with HTTP 409. Looks through the exception
+    chain for the response the same way upload_scheduler.retry_info does.
+    
+    Returns:
+        tuple: (is_duplicate, id of the activity Garmin already has or None)
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is not None:
+            try:
+                response_data = response.json()
+            except Exception:
+                response_data = None
+            duplicate, activity_id = duplicate_activity_from_upload(response_data)
+            return duplicate or status == 409, activity_id
+        
+        # garth wraps the requests HTTPError in .error
+        error = getattr(error, 'error', None) or error.__cause__ or error.__context__
+    
+    return False, None
 
 
 class SimpleFitConverter:
-    def __init__(self, peloton_auth, garmin_client):
+    def __init__(self, peloton_auth, garmin_client, use_numpy=True, file_format='tcx',
+                 max_points=None):
+        """
+        Args:
+            peloton_auth: Authenticated PelotonBearerAuth
+            garmin_client: Logged in garminconnect client
+            use_numpy: Build trackpoints with NumPy when it is installed
+            file_format: Upload format - 'tcx' or 'fit' (native FIT encoder)
+            max_points: Optional cap on trackpoints/records per workout - longer
+                        workouts are downsampled with LTTB on power
+        """
+        if file_format not in ('tcx', 'fit'):
+            raise ValueError(f"Unsupported upload format: {file_format}")
+        
         self.peloton_auth = peloton_auth
         self.garmin_client = garmin_client
+        self.use_numpy = use_numpy
+        self.file_format = file_format
+        self.max_points = max_points
     
-    def sync_workout(self, workout_data):
+    def sync_workout(self, workout, perf_data=None):
         """
-        Sync workout directly to Garmin using TCX format
-        This bypasses FIT file creation entirely
+        Sync workout directly to Garmin using TCX (or native FIT) format
+        This bypasses fit-tool entirely
+        
+        Args:
+            workout: Workout record from the Peloton workouts listing
+            perf_data: Already-downloaded performance graph (fetched here if None)
+        """
+        return self.upload(self.build_upload(workout, perf_data))
+    
+    def build_upload(self, workout, perf_data=None):
         """
-        import tempfile
-        import os
+        Build the activity file for a workout without uploading it
         
-        workout_id = workout_data.get('id')
-        created_at = workout_data.get('created_at')
+        Args:
+            workout: Workout record from the Peloton workouts listing
+            perf_data: Already-downloaded performance graph (fetched here if None)
+        
+        Returns:
+            dict: workout_id, filename, payload (bytes), payload_hash, activity_name
+        """
+        workout_id = workout.id
+        created_at = workout.created_at
         
         # Get workout details
-        ride = workout_data.get('ride', {})
-        title = ride.get('title', 'Peloton Workout')
-        duration = ride.get('duration', 0)
+        title = workout.ride.title or 'Peloton Workout'
         
         # Get performance data if available
         try:
-            perf_data = self.peloton_auth.get_workout_details(workout_id)
-            metrics = perf_data.get('metrics', [])
-            
-            # Get summaries from performance data
-            summaries = perf_data.get('summaries', [])
+            if perf_data is None:
+                # Only finished workouts are safe to serve from the cache
+                perf_data = self.peloton_auth.get_workout_details(workout_id, use_cache=workout.finished)
             
             # Extract key metrics from summaries
-            distance = 0
-            calories = 0
-            avg_hr = None
-            max_hr = None
-            avg_output = None
-            max_output = None
-            avg_cadence = None
-            avg_speed = None
-            
-            for summary in summaries:
-                slug = summary.get('slug', '')
-                value = summary.get('value', 0)
-                display_unit = summary.get('display_unit', '')
-                
-                if slug == 'distance':
-                    # Convert to meters based on unit
-                    if display_unit == 'mi':
-                        distance = value * 1609.34  # miles to meters
-                    elif display_unit == 'km':
-                        distance = value * 1000  # km to meters
-                    else:
-                        distance = value  # assume already meters
-                elif slug == 'calories':
-                    calories = value
-                elif slug == 'avg_heart_rate':
-                    avg_hr = value
-                elif slug == 'max_heart_rate':
-                    max_hr = value
-                elif slug == 'avg_output':
-                    avg_output = value
-                elif slug == 'max_output':
-                    max_output = value
-                elif slug == 'avg_cadence':
-                    avg_cadence = value
-                elif slug == 'avg_speed':
-                    avg_speed = value
+            distance = perf_data.distance_meters() or 0
+            calories = perf_data.summary('calories', 0)
+            avg_hr = perf_data.summary('avg_heart_rate')
+            max_hr = perf_data.summary('max_heart_rate')
             
             # If HR not in summaries, get from heart_rate metric
-            if not avg_hr or not max_hr:
-                for metric in perf_data.get('metrics', []):
-                    if metric.get('slug') == 'heart_rate':
-                        if not avg_hr:
-                            avg_hr = metric.get('average_value')
-                        if not max_hr:
-                            max_hr = metric.get('max_value')
-                        break
+            if 'heart_rate' in perf_data.metrics:
+                if not avg_hr:
+                    avg_hr = perf_data.averages.get('heart_rate')
+                if not max_hr:
+                    max_hr = perf_data.maxima.get('heart_rate')
             
         except Exception as e:
             perf_data = None
-            distance = workout_data.get('total_work', 0) / 1000.0 * 1000  # Fallback
+            distance = workout.total_work / 1000.0 * 1000  # Fallback
             calories = 0
             avg_hr = None
             max_hr = None
         
-        # Create TCX (Training Center XML) - much simpler than FIT
-        tcx = self._create_tcx(workout_data, perf_data, distance, calories, avg_hr, max_hr)
+        if self.file_format == 'fit':
+            # Native binary FIT - several times smaller than the TCX text
+            from fit_converter import encode_activity
+            filename = f'peloton_{workout_id}.fit'
+            payload = encode_activity(workout, perf_data, self.max_points)
+        else:
+            # Create TCX (Training Center XML) - much simpler than FIT.
+            # Built in memory and uploaded from there, no temp file involved
+            filename = f'peloton_{workout_id}.tcx'
+            buffer = io.BytesIO()
+            self._write_tcx(buffer, workout, perf_data, distance, calories, avg_hr, max_hr)
+            payload = buffer.getvalue()
         
-        # Save TCX to temp file
-        temp_dir = tempfile.gettempdir()
-        tcx_path = os.path.join(temp_dir, f'peloton_{workout_id}.tcx')
+        # Create nice activity name
+        date_str = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M')
         
-        with open(tcx_path, 'w') as f:
-            f.write(tcx)
+        return {
+            'workout_id': workout_id,
+            'filename': filename,
+            'payload': payload,
+            # Fingerprint of what was uploaded, recorded in the sync ledger
+            'payload_hash': hashlib.sha256(payload).hexdigest(),
+            'activity_name': f"{title} - {date_str}"
+        }
+    
+    def upload(self, prepared, rename=True):
+        """
+        Upload a file built by build_upload()
+        
+        Args:
+            prepared: Upload prepared by build_upload()
+            rename: Set the activity name right away. Pass False when the
+                    rename is queued separately (see RenameQueue).
         
-        # Upload to Garmin
+        Returns:
+            dict: success, result, activity_id, payload_hash - or success False and error.
+                  When Garmin already has the activity, duplicate is True and
+                  activity_id is the existing activity's id if Garmin sent it.
+        """
         try:
-            result = self.garmin_client.upload_activity(tcx_path)
+            result = upload_activity_data(self.garmin_client, prepared['filename'], prepared['payload'])
+            activity_id = None
             
             # Try to set activity name
             if result:
                 try:
                     # Extract activity ID from response
-                    activity_id = None
                     if hasattr(result, 'json'):
                         response_data = result.json()
-                        activity_id = response_data.get('detailedImportResult', {}).get('activityId')
+                    else:
+                        response_data = result
+                    activity_id = activity_id_from_upload(response_data)
                     
-                    if activity_id:
-                        # Create nice activity name
-                        from datetime import datetime
-                        date_str = datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M')
-                        activity_name = f"{title} - {date_str}"
-                        
-                        self.garmin_client.set_activity_name(activity_id, activity_name)
+                    duplicate, existing_id = duplicate_activity_from_upload(response_data)
+                    if duplicate and not activity_id:
+                        return self._duplicate_result(prepared, existing_id)
+                    
+                    if activity_id and rename:
+                        self.garmin_client.set_activity_name(activity_id, prepared['activity_name'])
                 except Exception as name_error:
                     # Activity uploaded but couldn't set name - that's okay
                     pass
             
-            # Clean up temp file
-            try:
-                os.remove(tcx_path)
-            except:
-                pass
-            return {'success': True, 'result': result}
+            return {
+                'success': True,
+                'result': result,
+                'activity_id': activity_id,
+                'payload_hash': prepared['payload_hash']
+            }
         except Exception as e:
-            # Clean up temp file
-            try:
-                os.remove(tcx_path)
-            except:
-                pass
-            return {'success': False, 'error': str(e)}
+            duplicate, existing_id = duplicate_activity_from_error(e)
+            if duplicate:
+                return self._duplicate_result(prepared, existing_id, e)
+            # Keep the exception so callers can inspect the HTTP status (e.g. 429)
+            return {'success': False, 'error': str(e), 'exception': e}
     
-    def _create_tcx(self, workout_data, perf_data, distance, calories, avg_hr, max_hr):
+    def _duplicate_result(self, prepared, activity_id, exception=None):
+        """Upload result for an activity Garmin already has"""
+        return {
+            'success': False,
+            'duplicate': True,
+            'error': 'Activity already exists on Garmin Connect',
+            'exception': exception,
+            'activity_id': activity_id,
+            'payload_hash': prepared['payload_hash']
+        }
+    
+    def _create_tcx(self, workout, perf_data, distance, calories, avg_hr, max_hr):
         """Create a TCX XML file for Garmin with all metrics"""
-        from datetime import datetime, timedelta
+        buffer = io.StringIO()
+        self._write_tcx(buffer, workout, perf_data, distance, calories, avg_hr, max_hr)
+        return buffer.getvalue()
+    
+    def _write_tcx(self, out, workout, perf_data, distance, calories, avg_hr, max_hr):
+        """
+        Stream a TCX document to a file-like object
+        
+        Trackpoints are written one at a time as they are rendered, so memory
+        use does not grow with the length of the ride. Text streams receive
+        str, binary streams (e.g. io.BufferedWriter) receive UTF-8 bytes.
+        """
+        from datetime import datetime
         
-        workout_id = workout_data.get('id')
-        created_at = workout_data.get('created_at')
-        start_time = datetime.utcfromtimestamp(created_at)
+        if isinstance(out, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(out, 'mode', ''):
+            write = lambda text: out.write(text.encode('utf-8'))
+        else:
+            write = out.write
         
-        ride = workout_data.get('ride', {})
-        duration = ride.get('duration', 0)
+        start_time = datetime.utcfromtimestamp(workout.created_at)
+        duration = workout.ride.duration
         
         # Format timestamp for TCX
         time_str = start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
         
-        tcx = f'''<?xml version="1.0" encoding="UTF-8"?>
+        write(f"""<?xml version="1.0" encoding="UTF-8"?>
 <TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2" 
                         xmlns:ns2="http://www.garmin.com/xmlschemas/ActivityExtension/v2"
                         xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
@@ -165,102 +312,174 @@ class SimpleFitConverter:
       <Lap StartTime="{time_str}">
         <TotalTimeSeconds>{duration}</TotalTimeSeconds>
         <DistanceMeters>{distance:.2f}</DistanceMeters>
-        <Calories>{int(calories)}</Calories>'''
+        <Calories>{int(calories)}</Calories>""")
         
         if avg_hr:
-            tcx += f'''
+            write(f"""
         <AverageHeartRateBpm>
           <Value>{int(avg_hr)}</Value>
-        </AverageHeartRateBpm>'''
+        </AverageHeartRateBpm>""")
         
         if max_hr:
-            tcx += f'''
+            write(f"""
         <MaximumHeartRateBpm>
           <Value>{int(max_hr)}</Value>
-        </MaximumHeartRateBpm>'''
+        </MaximumHeartRateBpm>""")
         
-        tcx += '''
+        write("""
         <Intensity>Active</Intensity>
         <TriggerMethod>Manual</TriggerMethod>
-'''
+""")
         
         # Add track points with all metrics
-        if perf_data and perf_data.get('metrics'):
-            tcx += '        <Track>\n'
+        if perf_data is not None and perf_data.metrics:
+            write('        <Track>\n')
             
-            # Get metrics by slug for easy access
-            metrics_by_slug = {}
-            for metric in perf_data['metrics']:
-                slug = metric.get('slug', '')
-                values = metric.get('values', [])
-                metrics_by_slug[slug] = values
+            metrics_by_slug = perf_data.metrics
             
             # Get the length - all arrays should be same length
-            num_samples = len(metrics_by_slug.get('output', []))
+            num_samples = len(metrics_by_slug.get('output') or [])
             
-            cumulative_distance = 0.0  # Track distance in meters
+            # Real sample times, so trackpoints match the requested resolution
+            offsets = sample_offsets(perf_data, num_samples)
+            indices = select_samples(metrics_by_slug, num_samples, self.max_points, offsets)
             
-            # Sample every 5 seconds to keep file reasonable
-            for i in range(0, num_samples, 5):
-                seconds = i  # Each value is 1 second apart
-                point_time = start_time + timedelta(seconds=seconds)
-                point_time_str = point_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-                
-                # Calculate distance from speed if available
-                if 'speed' in metrics_by_slug and i < len(metrics_by_slug['speed']):
-                    speed_mph = float(metrics_by_slug['speed'][i]) if metrics_by_slug['speed'][i] else 0
-                    # Convert mph to km for distance calculation
-                    speed_kmh = speed_mph * 1.60934
-                    distance_increment = (speed_kmh * 5) / 3600  # km for 5 seconds
-                    cumulative_distance += distance_increment * 1000  # convert to meters
-                
-                tcx += f'          <Trackpoint>\n'
-                tcx += f'            <Time>{point_time_str}</Time>\n'
+            times, distances, heart_rates, cadences, powers = self._trackpoint_columns(
+                metrics_by_slug, start_time, offsets, indices)
+            
+            for point_time_str, cumulative_distance, hr, cadence, power in zip(
+                    times, distances, heart_rates, cadences, powers):
+                # Render the whole trackpoint, then hand it to the stream in one write
+                parts = ['          <Trackpoint>\n',
+                         f'            <Time>{point_time_str}</Time>\n']
                 
                 # Add distance to trackpoint
                 if cumulative_distance > 0:
-                    tcx += f'            <DistanceMeters>{cumulative_distance:.2f}</DistanceMeters>\n'
+                    parts.append(f'            <DistanceMeters>{cumulative_distance:.2f}</DistanceMeters>\n')
                 
                 # Heart rate
-                if 'heart_rate' in metrics_by_slug and i < len(metrics_by_slug['heart_rate']):
-                    hr = metrics_by_slug['heart_rate'][i]
-                    if hr:
-                        tcx += f'''            <HeartRateBpm>
-              <Value>{int(hr)}</Value>
+                if hr is not None:
+                    parts.append(f"""            <HeartRateBpm>
+              <Value>{hr}</Value>
             </HeartRateBpm>
-'''
+""")
                 
                 # Cadence
-                if 'cadence' in metrics_by_slug and i < len(metrics_by_slug['cadence']):
-                    cadence = metrics_by_slug['cadence'][i]
-                    if cadence:
-                        tcx += f'            <Cadence>{int(cadence)}</Cadence>\n'
+                if cadence is not None:
+                    parts.append(f'            <Cadence>{cadence}</Cadence>\n')
                 
                 # Extensions for power only (remove speed - Garmin miscalculates it)
-                has_extensions = False
-                extensions_content = ''
-                
-                # Power (output)
-                if 'output' in metrics_by_slug and i < len(metrics_by_slug['output']):
-                    power = metrics_by_slug['output'][i]
-                    if power:
-                        extensions_content += f'                <ns2:Watts>{int(power)}</ns2:Watts>\n'
-                        has_extensions = True
-                
-                if has_extensions:
-                    tcx += f'''            <Extensions>
+                if power is not None:
+                    parts.append(f"""            <Extensions>
               <ns2:TPX>
-{extensions_content}              </ns2:TPX>
+                <ns2:Watts>{power}</ns2:Watts>
+              </ns2:TPX>
             </Extensions>
-'''
+""")
                 
-                tcx += f'          </Trackpoint>\n'
+                parts.append('          </Trackpoint>\n')
+                write(''.join(parts))
             
-            tcx += '        </Track>\n'
+            write('        </Track>\n')
         
-        tcx += '''      </Lap>
+        write("""      </Lap>
     </Activity>
   </Activities>
-</TrainingCenterDatabase>'''
+</TrainingCenterDatabase>""")
+    
+    def _trackpoint_columns(self, metrics_by_slug, start_time, offsets, indices):
+        """
+        Align the per-sample metrics into one column per trackpoint field
+        
+        Uses NumPy when it is installed (and use_numpy is set), otherwise a
+        plain Python loop. Both produce exactly the same values.
+        
+        Args:
+            metrics_by_slug: PerformanceGraph.metrics columns keyed by slug
+            start_time: Workout start (naive UTC datetime)
+            offsets: Seconds from the start for every sample
+            indices: Sorted indices of the samples written as trackpoints
+        
+        Returns:
+            tuple: (times, distances, heart_rates, cadences, powers) - lists with
+                   one entry per trackpoint. Times are TCX timestamp strings,
+                   distances cumulative meters, and the rest ints or None when
+                   the sample is missing.
+        """
+        if np is not None and self.use_numpy:
+            try:
+                return self._trackpoint_columns_numpy(metrics_by_slug, start_time, offsets, indices)
+            except (TypeError, ValueError):
+                # Non-numeric samples - let the pure Python path handle them
+                pass
+        return self._trackpoint_columns_python(metrics_by_slug, start_time, offsets, indices)
+    
+    def _trackpoint_columns_python(self, metrics_by_slug, start_time, offsets, indices):
+        from datetime import timedelta
+        
+        speeds = metrics_by_slug.get('speed')
+        heart_rates = metrics_by_slug.get('heart_rate')
+        cadences = metrics_by_slug.get('cadence')
+        outputs = metrics_by_slug.get('output')
+        
+        def sample(values, i):
+            if values is not None and i < len(values) and values[i] and not is_missing(values[i]):
+                return int(values[i])
+            return None
+        
+        # Distance accumulates over every sample, not just the ones written
+        cumulative = []
+        cumulative_distance = 0.0  # Track distance in meters
+        previous_offset = 0
+        for i, offset in enumerate(offsets):
+            if speeds is not None and i < len(speeds):
+                speed_mph = float(speeds[i]) if speeds[i] and not is_missing(speeds[i]) else 0
+                # Convert mph to km for distance calculation
+                speed_kmh = speed_mph * 1.60934
+                distance_increment = (speed_kmh * (offset - previous_offset)) / 3600  # km for this sample
+                cumulative_distance += distance_increment * 1000  # convert to meters
+            previous_offset = offset
+            cumulative.append(cumulative_distance)
+        
+        times = [(start_time + timedelta(seconds=offsets[i])).strftime('%Y-%m-%dT%H:%M:%SZ')
+                 for i in indices]
+        distances = [cumulative[i] for i in indices]
+        hr_column = [sample(heart_rates, i) for i in indices]
+        cadence_column = [sample(cadences, i) for i in indices]
+        power_column = [sample(outputs, i) for i in indices]
+        
+        return times, distances, hr_column, cadence_column, power_column
+    
+    def _trackpoint_columns_numpy(self, metrics_by_slug, start_time, offsets, indices):
+        offsets = np.asarray(offsets, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        num_samples = len(offsets)
+        
+        def column(values):
+            """All samples as float64, NaN where a sample is missing"""
+            full = np.full(num_samples, np.nan)
+            if values is not None:
+                # Missing samples are already NaN
+                values = np.asarray(values[:num_samples], dtype=np.float64)
+                full[:len(values)] = values
+            return full
+        
+        def int_column(values):
+            sampled = column(values)[indices]
+            present = ~np.isnan(sampled) & (sampled != 0)
+            truncated = np.trunc(np.where(present, sampled, 0)).astype(np.int64)
+            return [int(v) if p else None for v, p in zip(truncated.tolist(), present.tolist())]
+        
+        # One base time plus an offset array
+        stamps = np.datetime_as_string(
+            np.datetime64(start_time, 's') + offsets[indices].astype('timedelta64[s]'), unit='s')
+        times = [stamp + 'Z' for stamp in stamps.tolist()]
+        
+        # Same operation order as the Python path so the floats match exactly
+        speed_mph = np.nan_to_num(column(metrics_by_slug.get('speed')), nan=0.0)
+        intervals = np.diff(offsets, prepend=0)
+        increments = ((speed_mph * 1.60934) * intervals) / 3600 * 1000
+        distances = np.cumsum(increments)[indices].tolist()
         
-        return tcx
+        return (times, distances, int_column(metrics_by_slug.get('heart_rate')),
+                int_column(metrics_by_slug.get('cadence')), int_column(metrics_by_slug.get('output')))
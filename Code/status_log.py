@@ -0,0 +1,96 @@
+"""
+Status log sink for the desktop app
+Messages from any thread are buffered and written to the status Text widget
+in one insert every ~50 ms. The widget only keeps the most recent lines; the
+full log goes to a rotating file in the config directory.
+"""
+
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+DEFAULT_MAX_LINES = 1000
+DEFAULT_FLUSH_INTERVAL = 50  # milliseconds
+
+
+class StatusLog:
+    """Batched, size-capped writer for a Tk Text widget"""
+    
+    def __init__(self, root, text_widget, max_lines=DEFAULT_MAX_LINES, flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 log_file=None, max_bytes=1024 * 1024, backup_count=3):
+        """
+        Args:
+            root: Tk root used to schedule flushes
+            text_widget: Text widget showing the log (kept 'disabled' between flushes)
+            max_lines: Lines kept in the widget - older ones are dropped
+            flush_interval: Milliseconds between widget updates
+            log_file: Optional path the full log is written to
+            max_bytes: Size at which the log file is rotated
+            backup_count: Rotated log files kept
+        """
+        self.root = root
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        
+        # Only the last max_lines matter if a burst arrives between flushes
+        self._pending = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        
+        self._logger = None
+        if log_file is not None:
+            handler = RotatingFileHandler(str(log_file), maxBytes=max_bytes, backupCount=backup_count,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            self._logger = logging.getLogger(f"{__name__}.{id(self)}")
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+    
+    def write(self, message):
+        """Queue a message (safe to call from any thread)"""
+        line = f"[{datetime.now().strftime('%H:%M:%S')}] {message}"
+        with self._lock:
+            self._pending.append(line)
+        if self._logger is not None:
+            self._logger.info(message)
+    
+    def start(self):
+        """Begin flushing on the Tk main loop"""
+        self.root.after(self.flush_interval, self._tick)
+    
+    def _tick(self):
+        try:
+            self.flush()
+        finally:
+            self.root.after(self.flush_interval, self._tick)
+    
+    def flush(self):
+        """Write queued messages to the widget (main thread only)"""
+        with self._lock:
+            if not self._pending:
+                return
+            lines = list(self._pending)
+            self._pending.clear()
+        
+        widget = self.text_widget
+        widget.config(state='normal')
+        widget.insert('end', '\n'.join(lines) + '\n')
+        
+        # The widget always ends with an empty line after the last newline
+        line_count = int(widget.index('end-1c').split('.')[0]) - 1
+        if line_count > self.max_lines:
+            widget.delete('1.0', f"{line_count - self.max_lines + 1}.0")
+        
+        widget.see('end')
+        widget.config(state='disabled')
+    
+    def close(self):
+        """Flush the file handler"""
+        if self._logger is not None:
+            for handler in self._logger.handlers:
+                handler.close()
+            self._logger.handlers.clear()
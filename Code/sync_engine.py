@@ -0,0 +1,451 @@
+"""
+Sync engine shared by the desktop app and headless syncs
+Downloads performance data, converts and uploads workouts through
+SimpleFitConverter, and keeps the sync ledger up to date.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+import traceback
+from itertools import islice
+
+from peloton_bearer_auth import DEFAULT_MAX_WORKERS
+from rename_queue import RenameQueue
+from upload_scheduler import DEFAULT_UPLOAD_RATE, UploadScheduler
+from workout_store import WorkoutStore
+
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class SyncPipeline:
+    """
+    Staged fetch -> convert -> upload sync
+    
+    Each stage has its own worker threads, and the stages are connected by
+    bounded queues: fetching the next workouts' performance data, building
+    files and uploading all overlap, while a slow stage holds back the ones
+    before it instead of letting work pile up in memory.
+    
+    The fetch stage runs on threads sharing the requests session, or with
+    fetch_transport='async' on a single asyncio event loop through
+    AsyncPelotonBearerAuth - both hand the convert stage identical data.
+    """
+    
+    def __init__(self, peloton_auth, converter, ledger=None, log=print,
+                 fetch_workers=None, convert_workers=1, upload_workers=1, queue_size=8,
+                 upload_rate=DEFAULT_UPLOAD_RATE, cancel=None, fetch_transport='threads'):
+        """
+        Args:
+            peloton_auth: Authenticated PelotonBearerAuth
+            converter: SimpleFitConverter used to build and upload each workout
+            ledger: Optional SyncLedger - successful uploads are recorded in it
+            log: Callable receiving progress messages
+            fetch_workers: Concurrent performance_graph downloads (threads, or
+                           requests in flight on the event loop)
+            convert_workers: Threads building TCX/FIT files
+            upload_workers: Concurrent Garmin uploads
+            queue_size: Capacity of the queues between stages
+            upload_rate: Sustained Garmin uploads per second
+            cancel: Optional threading.Event - once set, workouts not yet started
+                    are skipped and throttled uploads stop waiting to retry
+            fetch_transport: 'threads' (requests session) or 'async' (aiohttp
+                             event loop, see peloton_async_client)
+        """
+        if fetch_transport not in ('threads', 'async'):
+            raise ValueError(f"Unsupported fetch transport: {fetch_transport}")
+        
+        self.peloton_auth = peloton_auth
+        self.converter = converter
+        self.ledger = ledger
+        self.log = log
+        self.fetch_workers = fetch_workers or getattr(peloton_auth, 'max_workers', DEFAULT_MAX_WORKERS)
+        self.convert_workers = convert_workers
+        self.upload_workers = upload_workers
+        self.queue_size = queue_size
+        self.cancel = cancel
+        self.fetch_transport = fetch_transport
+        self.cancelled = 0
+        self.stats = {}
+        self._results = []
+        self._lock = threading.Lock()
+        self._messages = queue.Queue()
+        
+        # Throttled/failed uploads are retried with backoff and, if they
+        # still fail, parked in the ledger's retry queue
+        self.scheduler = UploadScheduler(converter, ledger, rate=upload_rate, log=self._messages.put,
+                                         cancel=cancel)
+        
+        # Activity names are set in the background, sharing the upload rate limit
+        self.renames = RenameQueue(converter.garmin_client, ledger, bucket=self.scheduler.bucket,
+                                   log=self._messages.put)
+    
+    def run(self, workouts):
+        """
+        Sync workouts through the pipeline
+        
+        Args:
+            workouts: Workout records from the Peloton workouts listing
+        
+        Returns:
+            list: One dict per workout with workout_id, name, success, error, activity_id
+        """
+        self._results = []
+        self.cancelled = 0
+        self.stats = {}
+        
+        fetch_queue = queue.Queue()
+        for workout in workouts:
+            fetch_queue.put({'workout': workout})
+        convert_queue = queue.Queue(maxsize=self.queue_size)
+        upload_queue = queue.Queue(maxsize=self.queue_size)
+        
+        # Let the Peloton session keep a connection per fetch worker
+        if self.fetch_transport == 'threads' and hasattr(self.peloton_auth, 'ensure_connection_pool'):
+            self.peloton_auth.ensure_connection_pool(self.fetch_workers)
+        
+        stages = [
+            ('fetch', self._fetch, fetch_queue, convert_queue, self.fetch_workers),
+            ('convert', self._convert, convert_queue, upload_queue, self.convert_workers),
+            ('upload', self._upload, upload_queue, None, self.upload_workers),
+        ]
+        
+        self.renames.start()
+        
+        started = []
+        for name, handler, inbox, outbox, workers in stages:
+            stats = {'items': 0, 'busy_seconds': 0.0, 'started': time.monotonic()}
+            self.stats[name] = stats
+            if name == 'fetch' and self.fetch_transport == 'async':
+                # One thread running the event loop does all the fetching
+                threads = [threading.Thread(target=self._async_fetch_stage, args=(inbox, outbox, stats),
+                                            name="sync-fetch-async", daemon=True)]
+            else:
+                threads = [
+                    threading.Thread(target=self._worker, args=(handler, inbox, outbox, stats),
+                                     name=f"sync-{name}-{n}", daemon=True)
+                    for n in range(max(1, workers))
+                ]
+            for thread in threads:
+                thread.start()
+            started.append((name, inbox, threads))
+        
+        # Stop the stages in order from a helper thread - each one drains before the
+        # next is told to stop - while this thread relays progress messages, so
+        # log is only ever called from the caller's thread
+        shutdown = threading.Thread(target=self._shutdown, args=(started,), daemon=True)
+        shutdown.start()
+        while shutdown.is_alive() or not self._messages.empty():
+            try:
+                self.log(self._messages.get(timeout=0.05))
+            except queue.Empty:
+                pass
+        
+        if self.cancelled:
+            self.log(f"⏹ Cancelled - {self.cancelled} workouts were not synced")
+        
+        for name, stats in self.stats.items():
+            self.log(f"{name.title()}: {stats['items']} workouts in {stats['elapsed_seconds']:.1f}s "
+                     f"({stats['per_second']:.2f}/s, busy {stats['busy_seconds']:.1f}s)")
+        
+        return self._results
+    
+    def _shutdown(self, started):
+        for name, inbox, threads in started:
+            for _ in threads:
+                inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+            stats = self.stats[name]
+            stats['elapsed_seconds'] = time.monotonic() - stats.pop('started')
+            stats['per_second'] = stats['items'] / stats['elapsed_seconds'] if stats['elapsed_seconds'] else 0.0
+        
+        # Apply the renames still queued once every upload is done
+        self.renames.close()
+    
+    def _worker(self, handler, inbox, outbox, stats):
+        """Run one stage worker until it receives _DONE"""
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+            
+            if self.cancel is not None and self.cancel.is_set():
+                # Drop the workout; it is picked up again by the next sync
+                with self._lock:
+                    self.cancelled += 1
+                continue
+            
+            started = time.monotonic()
+            try:
+                output = handler(item)
+            except Exception as e:
+                # Never let one workout take a worker down
+                self._finish(item['workout'], {'success': False, 'error': str(e)})
+                output = None
+            
+            with self._lock:
+                stats['items'] += 1
+                stats['busy_seconds'] += time.monotonic() - started
+            
+            if output is not None and outbox is not None:
+                outbox.put(output)  # blocks while the next stage is behind
+    
+    def _fetch(self, item):
+        workout = item['workout']
+        # Only finished workouts are safe to serve from the cache
+        try:
+            perf_data = self.peloton_auth.fetch_workout_details(workout.id, use_cache=workout.finished)
+        except Exception as e:
+            return self._fetch_failed(item, e)
+        item['perf_data'] = perf_data
+        return item
+    
+    def _fetch_failed(self, item, error):
+        """
+        Fail a workout whose details could not be downloaded
+        
+        It is not passed on, so the convert stage never goes back to the
+        network for it. The next sync tries it again.
+        """
+        self._finish(item['workout'], {'success': False, 'error': f"Could not fetch details: {error}"})
+        return None
+    
+    def _async_fetch_stage(self, inbox, outbox, stats):
+        """Fetch stage for fetch_transport='async': every download on one event loop"""
+        items = []
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                break
+            items.append(item)
+        
+        try:
+            asyncio.run(self._fetch_all_async(items, outbox, stats))
+        except Exception as e:
+            # The client could not be set up (e.g. aiohttp missing) - nothing was fetched
+            for item in items:
+                self._finish(item['workout'], {'success': False, 'error': str(e)})
+    
+    async def _fetch_all_async(self, items, outbox, stats):
+        from peloton_async_client import AsyncPelotonBearerAuth
+        
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, self.fetch_workers))
+        
+        async def fetch(client, item):
+            async with semaphore:
+                if self.cancel is not None and self.cancel.is_set():
+                    with self._lock:
+                        self.cancelled += 1
+                    return
+                
+                workout = item['workout']
+                started = time.monotonic()
+                try:
+                    item['perf_data'] = await client.fetch_workout_details(workout.id, use_cache=workout.finished)
+                except Exception as e:
+                    item = self._fetch_failed(item, e)
+                
+                with self._lock:
+                    stats['items'] += 1
+                    stats['busy_seconds'] += time.monotonic() - started
+            
+            if item is not None:
+                # Wait for room off the loop, so a full queue only holds back this workout
+                await loop.run_in_executor(None, outbox.put, item)
+        
+        async with AsyncPelotonBearerAuth.from_client(self.peloton_auth) as client:
+            client.max_workers = max(1, self.fetch_workers)
+            await client.set_bearer_token(self.peloton_auth.bearer_token, self.peloton_auth.user_id)
+            await asyncio.gather(*(fetch(client, item) for item in items))
+    
+    def _convert(self, item):
+        workout = item['workout']
+        try:
+            self._messages.put(f"Syncing: {workout.display_name}")
+            item['prepared'] = self.converter.build_upload(workout, perf_data=item['perf_data'])
+        
+        except Exception as e:
+            self._messages.put(f"✗ Error processing {workout.id}: {type(e).__name__}: {str(e)}")
+            
+            # Log the traceback to see exactly where it failed
+            for line in traceback.format_exc().split('\n'):
+                if line.strip():
+                    self._messages.put(f"  {line}")
+            
+            self._finish(workout, {'success': False, 'error': str(e)})
+            return None
+        
+        return item
+    
+    def _upload(self, item):
+        prepared = item['prepared']
+        result = self.scheduler.upload(prepared, item['workout'], rename=False)
+        if result.get('success') and result.get('activity_id'):
+            self.renames.enqueue(result['activity_id'], prepared['activity_name'])
+        self._finish(item['workout'], result)
+    
+    def _finish(self, workout, result):
+        """Log, record in the ledger and collect the result for one workout"""
+        workout_id = workout.id
+        display_name = workout.display_name
+        
+        if result.get('success'):
+            self._messages.put(f"✓ Uploaded: {display_name}")
+            if self.ledger is not None:
+                self.ledger.record(
+                    workout_id,
+                    garmin_activity_id=result.get('activity_id'),
+                    payload_hash=result.get('payload_hash')
+                )
+        elif result.get('duplicate'):
+            self._messages.put(f"↷ Already on Garmin: {display_name}")
+            if self.ledger is not None:
+                self.ledger.mark_synced(workout_id, garmin_activity_id=result.get('activity_id'))
+        else:
+            self._messages.put(f"✗ Upload failed: {display_name} - {result.get('error', 'Unknown error')}")
+        
+        with self._lock:
+            self._results.append({
+                'workout_id': workout_id,
+                'name': display_name,
+                'success': bool(result.get('success') or result.get('duplicate')),
+                'error': result.get('error'),
+                'activity_id': result.get('activity_id')
+            })
+
+
+def sync_workouts(peloton_auth, converter, workouts, ledger=None, log=print, max_workers=None,
+                  convert_workers=1, upload_workers=1, upload_rate=DEFAULT_UPLOAD_RATE, cancel=None,
+                  fetch_transport='threads'):
+    """
+    Upload workouts to Garmin
+    
+    Runs a SyncPipeline, so performance data downloads, file conversion and
+    uploads for different workouts overlap.
+    
+    Args:
+        peloton_auth: Authenticated PelotonBearerAuth
+        converter: SimpleFitConverter used to build and upload each workout
+        workouts: Workout records from the Peloton workouts listing
+        ledger: Optional SyncLedger - successful uploads are recorded in it
+        log: Callable receiving progress messages
+        max_workers: Concurrent performance_graph downloads
+        convert_workers: Threads building TCX/FIT files
+        upload_workers: Concurrent Garmin uploads
+        upload_rate: Sustained Garmin uploads per second
+        cancel: Optional threading.Event that stops the sync mid-batch
+        fetch_transport: 'threads' or 'async' (see SyncPipeline)
+    
+    Returns:
+        list: One dict per workout with workout_id, name, success, error, activity_id
+    """
+    pipeline = SyncPipeline(
+        peloton_auth, converter, ledger, log,
+        fetch_workers=max_workers,
+        convert_workers=convert_workers,
+        upload_workers=upload_workers,
+        upload_rate=upload_rate,
+        cancel=cancel,
+        fetch_transport=fetch_transport
+    )
+    return pipeline.run(workouts)
+
+
+def incremental_sync(peloton_auth, converter, ledger, log=print, max_workers=None,
+                     page_size=20, first_run_limit=20, convert_workers=1, upload_workers=1,
+                     upload_rate=DEFAULT_UPLOAD_RATE, cancel=None, fetch_transport='threads'):
+    """
+    Sync every workout created since the last run
+    
+    Walks the workouts listing newest first and stops at the ledger's
+    high-water mark, so a daily run costs one or two listing requests.
+    Only completed workouts that are not already in the ledger are uploaded.
+    
+    The high-water mark only advances over an unbroken run of synced
+    workouts, so a failed or still in-progress workout is picked up again
+    on the next run. If the listing fails part way, the workouts it did
+    return are still synced but the mark stays put - the walk never
+    reached the old mark, so workouts on the missing pages would
+    otherwise be skipped for good.
+    
+    Args:
+        peloton_auth: Authenticated PelotonBearerAuth
+        converter: SimpleFitConverter used to build and upload each workout
+        ledger: SyncLedger holding the high-water mark
+        log: Callable receiving progress messages
+        max_workers: Concurrent performance_graph downloads
+        page_size: Workouts requested per listing page
+        first_run_limit: Number of recent workouts considered when no mark exists yet
+        convert_workers: Threads building TCX/FIT files
+        upload_workers: Concurrent Garmin uploads
+        upload_rate: Sustained Garmin uploads per second
+        cancel: Optional threading.Event that stops the sync mid-batch
+        fetch_transport: 'threads' or 'async' (see SyncPipeline)
+    
+    Returns:
+        list: Per-workout results, as returned by sync_workouts()
+    """
+    high_water_mark = ledger.get_high_water_mark()
+    
+    listing = peloton_auth.iter_workouts(page_size=page_size, since=high_water_mark)
+    if high_water_mark is None:
+        log(f"No previous sync found - checking the {first_run_limit} most recent workouts")
+        listing = islice(listing, first_run_limit)
+    
+    # The walk must reach the old mark (or the end of the history) before the mark may move
+    listed = []
+    walk_complete = True
+    try:
+        for workout in listing:
+            listed.append(workout)
+    except Exception as e:
+        walk_complete = False
+        log(f"⚠ Could not list all workouts ({e}) - syncing the {len(listed)} found, "
+            f"the next run will look again")
+    
+    # Oldest first - the high-water mark advances in creation order
+    candidates = WorkoutStore(listed).oldest_first()
+    
+    pending = [
+        workout for workout in candidates
+        if workout.finished and not ledger.is_synced(workout.id)
+    ]
+    
+    # Uploads that were throttled or failed on an earlier run
+    pending_ids = {workout.id for workout in pending}
+    retries = [
+        workout for workout in ledger.due_retries()
+        if workout.id not in pending_ids and not ledger.is_synced(workout.id)
+    ]
+    
+    if pending:
+        log(f"Found {len(pending)} new workouts since last sync")
+    if retries:
+        log(f"Retrying {len(retries)} uploads that failed on an earlier sync")
+    
+    if pending or retries:
+        results = sync_workouts(peloton_auth, converter, retries + pending, ledger, log, max_workers,
+                                convert_workers, upload_workers, upload_rate, cancel, fetch_transport)
+    else:
+        log("No new workouts since last sync")
+        results = []
+    
+    if not walk_complete:
+        return results
+    
+    # Advance the mark up to the first workout that is not on Garmin yet
+    new_mark = high_water_mark
+    for workout in candidates:
+        if not ledger.is_synced(workout.id):
+            break
+        new_mark = workout.created_at or new_mark
+    
+    if new_mark is not None and new_mark != high_water_mark:
+        ledger.set_high_water_mark(new_mark)
+    
+    return results
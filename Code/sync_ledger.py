@@ -0,0 +1,283 @@
+"""
+Sync ledger - records which Peloton workouts were already uploaded to Garmin
+Stored as a small SQLite database next to config.json so a sync can skip
+workouts that are already on Garmin before fetching or converting anything.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from peloton_models import Workout
+
+
+DEFAULT_LEDGER_PATH = Path.home() / '.peloton_garmin_sync' / 'sync_ledger.db'
+DEFAULT_MAX_RETRY_ATTEMPTS = 5  # syncs a failed upload is retried on before it is dropped
+DEFAULT_MAX_RENAME_ATTEMPTS = 10  # failed set_activity_name calls before a rename is dropped
+
+
+class SyncLedger:
+    """Maps Peloton workout ids to the Garmin activities they were uploaded as"""
+    
+    def __init__(self, db_path=None, max_retry_attempts=DEFAULT_MAX_RETRY_ATTEMPTS,
+                 max_rename_attempts=DEFAULT_MAX_RENAME_ATTEMPTS):
+        """
+        Args:
+            db_path: SQLite database file (default: ~/.peloton_garmin_sync/sync_ledger.db)
+            max_retry_attempts: Times a workout may enter the retry queue before it is dropped
+            max_rename_attempts: Failed attempts, across sessions, before a pending
+                                 rename is dropped
+        """
+        self.db_path = Path(db_path) if db_path else DEFAULT_LEDGER_PATH
+        self.max_retry_attempts = max_retry_attempts
+        self.max_rename_attempts = max_rename_attempts
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Shared by the UI thread and sync workers - all access goes through the lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS synced_workouts (
+                    peloton_workout_id TEXT PRIMARY KEY,
+                    garmin_activity_id INTEGER,
+                    payload_hash TEXT,
+                    synced_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_synced_garmin_activity '
+                'ON synced_workouts (garmin_activity_id)'
+            )
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS upload_retries (
+                    peloton_workout_id TEXT PRIMARY KEY,
+                    workout_json TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    last_error TEXT,
+                    next_attempt_at REAL NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS pending_renames (
+                    garmin_activity_id INTEGER PRIMARY KEY,
+                    activity_name TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    queued_at REAL NOT NULL
+                )
+            ''')
+            
+            # Keep the id set in memory so per-workout checks never touch disk
+            rows = self._conn.execute('SELECT peloton_workout_id FROM synced_workouts')
+            self._synced_ids = {row[0] for row in rows}
+    
+    def is_synced(self, workout_id):
+        """True if this Peloton workout was already uploaded"""
+        return workout_id in self._synced_ids
+    
+    def get(self, workout_id):
+        """
+        Look up the ledger entry for a workout
+        
+        Returns:
+            dict: peloton_workout_id, garmin_activity_id, payload_hash, synced_at
+                  or None if the workout was never synced
+        """
+        if workout_id not in self._synced_ids:
+            return None
+        
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM synced_workouts WHERE peloton_workout_id = ?',
+                (workout_id,)
+            ).fetchone()
+        return dict(row) if row else None
+    
+    def record(self, workout_id, garmin_activity_id=None, payload_hash=None):
+        """Record a successful upload (replaces any previous entry)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO synced_workouts '
+                '(peloton_workout_id, garmin_activity_id, payload_hash, synced_at) '
+                'VALUES (?, ?, ?, ?)',
+                (workout_id, garmin_activity_id, payload_hash, time.time())
+            )
+            self._conn.execute(
+                'DELETE FROM upload_retries WHERE peloton_workout_id = ?',
+                (workout_id,)
+            )
+            self._synced_ids.add(workout_id)
+    
+    def mark_synced(self, workout_id, garmin_activity_id=None):
+        """
+        Record a workout Garmin already has without an upload of ours
+        
+        Used when Garmin rejects an upload as a duplicate, e.g. for workouts
+        uploaded before the ledger existed, so they stop holding back the
+        high-water mark.
+        """
+        self.record(workout_id, garmin_activity_id=garmin_activity_id)
+    
+    def forget(self, workout_id):
+        """Remove a workout from the ledger so it will be uploaded again"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM synced_workouts WHERE peloton_workout_id = ?',
+                (workout_id,)
+            )
+            self._synced_ids.discard(workout_id)
+    
+    def queue_retry(self, workout_id, workout, error=None, next_attempt_at=None):
+        """
+        Add a workout whose upload failed to the retry queue
+        
+        Args:
+            workout_id: Peloton workout ID
+            workout: Workout record, kept so it can be re-synced later
+            error: Last error message
+            next_attempt_at: Epoch seconds before which it is not retried
+        
+        Returns:
+            bool: True if the workout is queued, False if it has used up its
+                  max_retry_attempts and was dropped from the queue instead
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT attempts FROM upload_retries WHERE peloton_workout_id = ?',
+                (workout_id,)
+            ).fetchone()
+            if row is not None and row[0] >= self.max_retry_attempts:
+                self._conn.execute(
+                    'DELETE FROM upload_retries WHERE peloton_workout_id = ?',
+                    (workout_id,)
+                )
+                return False
+            
+            self._conn.execute(
+                'INSERT INTO upload_retries '
+                '(peloton_workout_id, workout_json, attempts, last_error, next_attempt_at) '
+                'VALUES (?, ?, 1, ?, ?) '
+                'ON CONFLICT (peloton_workout_id) DO UPDATE SET '
+                'workout_json = excluded.workout_json, attempts = attempts + 1, '
+                'last_error = excluded.last_error, next_attempt_at = excluded.next_attempt_at',
+                (workout_id, json.dumps(workout.to_json()), error, next_attempt_at or time.time())
+            )
+            return True
+    
+    def clear_retry(self, workout_id):
+        """Remove a workout from the retry queue"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM upload_retries WHERE peloton_workout_id = ?',
+                (workout_id,)
+            )
+    
+    def due_retries(self, now=None):
+        """
+        Workouts in the retry queue whose next attempt is due
+        
+        Returns:
+            list: Workout records, oldest queued first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT workout_json FROM upload_retries WHERE next_attempt_at <= ? '
+                'ORDER BY next_attempt_at',
+                (now or time.time(),)
+            ).fetchall()
+        return [Workout.from_json(json.loads(row[0])) for row in rows]
+    
+    def pending_retry_count(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM upload_retries').fetchone()[0]
+    
+    def queue_rename(self, garmin_activity_id, activity_name):
+        """Remember that an uploaded activity still needs its name set"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO pending_renames '
+                '(garmin_activity_id, activity_name, attempts, queued_at) VALUES (?, ?, 0, ?)',
+                (garmin_activity_id, activity_name, time.time())
+            )
+    
+    def complete_rename(self, garmin_activity_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'DELETE FROM pending_renames WHERE garmin_activity_id = ?',
+                (garmin_activity_id,)
+            )
+    
+    def rename_failed(self, garmin_activity_id, error=None):
+        """
+        Count a failed rename
+        
+        Returns:
+            bool: True if the rename stays pending, False if it has used up its
+                  max_rename_attempts and was dropped instead
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE pending_renames SET attempts = attempts + 1, last_error = ? '
+                'WHERE garmin_activity_id = ?',
+                (error, garmin_activity_id)
+            )
+            dropped = self._conn.execute(
+                'DELETE FROM pending_renames WHERE garmin_activity_id = ? AND attempts >= ?',
+                (garmin_activity_id, self.max_rename_attempts)
+            ).rowcount
+            return not dropped
+    
+    def pending_renames(self):
+        """
+        Renames that have not been applied yet
+        
+        Returns:
+            list: (garmin_activity_id, activity_name) tuples, oldest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT garmin_activity_id, activity_name FROM pending_renames ORDER BY queued_at'
+            ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+    
+    def get_high_water_mark(self):
+        """
+        created_at (epoch seconds) of the newest workout covered by incremental sync
+        
+        Returns:
+            float: The mark, or None if incremental sync has never run
+        """
+        value = self._get_state('high_water_mark')
+        return float(value) if value is not None else None
+    
+    def set_high_water_mark(self, created_at):
+        self._set_state('high_water_mark', str(created_at))
+    
+    def _get_state(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value FROM sync_state WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def _set_state(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)',
+                (key, value)
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
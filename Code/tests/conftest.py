@@ -0,0 +1,9 @@
+"""
+The app's modules live side by side in Code/ and import each other as
+top-level modules, so the tests put that directory on sys.path.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from activity_mirror import ActivityMirror
+
+
+ACCOUNT = 'rider@example.com'
+
+
+def activity(activity_id, days_ago):
+    start = datetime.now().replace(hour=7, minute=0, second=0, microsecond=0) - timedelta(days=days_ago)
+    return {'activityId': activity_id, 'startTimeLocal': start.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+class FakeGarmin:
+    """get_activities over an in-memory list, newest first by start time"""
+    
+    def __init__(self, activities):
+        self.activities = list(activities)
+        self.requests = []
+    
+    def get_activities(self, start, limit):
+        self.requests.append(start)
+        ordered = sorted(self.activities, key=lambda a: a['startTimeLocal'], reverse=True)
+        return ordered[start:start + limit]
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    mirror = ActivityMirror(tmp_path / 'mirror.db', page_size=5, recheck_days=10)
+    yield mirror
+    mirror.close()
+
+
+def mirrored_ids(mirror):
+    return {a['activityId'] for a in mirror.between(ACCOUNT, '2000-01-01', '2100-01-01')}
+
+
+def test_first_sync_backfills_everything(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(23))
+    
+    assert mirror.sync(ACCOUNT, garmin.get_activities) == 23
+    assert mirror.is_synced(ACCOUNT)
+    assert mirrored_ids(mirror) == set(range(23))
+
+
+def test_incremental_sync_stops_after_recheck_window(mirror):
+    garmin = FakeGarmin(activity(i, i * 3) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    garmin.activities.append(activity(100, 0))
+    garmin.requests.clear()
+    
+    assert mirror.sync(ACCOUNT, garmin.get_activities) == 1
+    # Page 0 ends at day 9, page 5 reaches past the 10 day window; older pages are skipped
+    assert garmin.requests == [0, 5]
+
+
+def test_late_upload_with_older_start_time_is_picked_up(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    # Uploaded today, but it started a week ago - below a page of known activities
+    garmin.activities.append(activity(200, 7))
+    
+    assert mirror.sync(ACCOUNT, garmin.get_activities) == 1
+    assert 200 in mirrored_ids(mirror)
+
+
+def test_deleted_activity_in_recheck_window_is_pruned(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    garmin.activities = [a for a in garmin.activities if a['activityId'] != 3]
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    assert 3 not in mirrored_ids(mirror)
+    assert 29 in mirrored_ids(mirror)
+
+
+def test_full_resync_prunes_old_deletions(tmp_path):
+    mirror = ActivityMirror(tmp_path / 'mirror.db', page_size=5, recheck_days=10, full_sync_interval=0)
+    garmin = FakeGarmin(activity(i, i) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    garmin.activities = [a for a in garmin.activities if a['activityId'] != 25]
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    assert mirrored_ids(mirror) == set(range(30)) - {25}
+    mirror.close()
+
+
+def test_incremental_sync_keeps_activities_it_did_not_reach(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    # Deleted outside the recheck window: only a full resync may remove it
+    garmin.activities = [a for a in garmin.activities if a['activityId'] != 25]
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    assert 25 in mirrored_ids(mirror)
+
+
+def test_failed_page_leaves_mirror_untouched(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(30))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    
+    def failing(start, limit):
+        raise Exception("HTTP 503")
+    
+    with pytest.raises(Exception):
+        mirror.sync(ACCOUNT, failing, full=True)
+    assert mirrored_ids(mirror) == set(range(30))
+
+
+def test_max_age_skips_recent_sync(mirror):
+    garmin = FakeGarmin(activity(i, i) for i in range(3))
+    mirror.sync(ACCOUNT, garmin.get_activities)
+    garmin.requests.clear()
+    
+    assert mirror.sync(ACCOUNT, garmin.get_activities, max_age=60) == 0
+    assert garmin.requests == []
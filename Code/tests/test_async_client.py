@@ -0,0 +1,181 @@
+import asyncio
+import threading
+
+import pytest
+
+aiohttp = pytest.importorskip('aiohttp')
+from aiohttp import web
+
+import peloton_bearer_auth
+from peloton_async_client import AsyncPelotonBearerAuth
+from peloton_bearer_auth import PelotonBearerAuth
+from peloton_models import Ride, Workout
+from simple_fit_converter import SimpleFitConverter
+from sync_engine import SyncPipeline
+
+
+WORKOUTS = [
+    {'id': f'w{i}', 'created_at': 1_700_000_000 - i * 3600, 'status': 'COMPLETE',
+     'fitness_discipline': 'cycling', 'ride': {'title': f'Ride {i}', 'duration': 600}}
+    for i in range(45)
+]
+
+
+def graph(workout_id):
+    seed = int(workout_id[1:])
+    return {
+        'duration': 600,
+        'seconds_since_pedaling_start': list(range(0, 600, 5)),
+        'metrics': [{'slug': 'output', 'values': [seed + i for i in range(120)], 'average_value': seed}],
+        'summaries': [{'slug': 'distance', 'value': seed / 10, 'display_unit': 'mi'}],
+    }
+
+
+@pytest.fixture
+def peloton_api(monkeypatch):
+    """A local stand-in for the Peloton API both clients are pointed at"""
+    requests_seen = []
+    
+    async def me(request):
+        requests_seen.append('me')
+        return web.json_response({'id': 'user-1'})
+    
+    async def workouts(request):
+        page, limit = int(request.query['page']), int(request.query['limit'])
+        chunk = WORKOUTS[page * limit:(page + 1) * limit]
+        return web.json_response({'data': chunk, 'page_count': -(-len(WORKOUTS) // limit),
+                                  'show_next': (page + 1) * limit < len(WORKOUTS)})
+    
+    async def performance_graph(request):
+        workout_id = request.match_info['workout_id']
+        requests_seen.append(workout_id)
+        if workout_id == 'w13':
+            return web.json_response({}, status=500)
+        return web.json_response(graph(workout_id))
+    
+    app = web.Application()
+    app.router.add_get('/api/me', me)
+    app.router.add_get('/api/user/{user_id}/workouts', workouts)
+    app.router.add_get('/api/workout/{workout_id}/performance_graph', performance_graph)
+    
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    
+    monkeypatch.setattr(peloton_bearer_auth, 'PELOTON_API_URL', f'http://127.0.0.1:{port}')
+    yield requests_seen
+    
+    asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture
+def auth(peloton_api):
+    auth = PelotonBearerAuth(max_workers=4, every_n=5)
+    assert auth.set_bearer_token('token')
+    return auth
+
+
+def test_listing_matches_threaded_client(auth):
+    async def walk():
+        async with AsyncPelotonBearerAuth.from_client(auth) as client:
+            await client.set_bearer_token('token')
+            return [workout async for workout in client.iter_workouts(page_size=20)]
+    
+    assert [w.id for w in asyncio.run(walk())] == [w.id for w in auth.iter_workouts(page_size=20)]
+
+
+def test_details_match_threaded_client(auth):
+    async def fetch():
+        async with AsyncPelotonBearerAuth.from_client(auth) as client:
+            await client.set_bearer_token('token', auth.user_id)
+            return await client.fetch_workout_details('w7')
+    
+    threaded = auth.fetch_workout_details('w7')
+    fetched = asyncio.run(fetch())
+    
+    assert fetched.every_n == threaded.every_n == 5
+    assert fetched.metrics['output'] == threaded.metrics['output']
+    assert fetched.distance_meters() == threaded.distance_meters()
+
+
+class RecordingConverter:
+    """Stands in for SimpleFitConverter, keeping what the convert stage was given"""
+    
+    def __init__(self):
+        self.garmin_client = self
+        self.converted = {}
+        self.lock = threading.Lock()
+    
+    def build_upload(self, workout, perf_data=None):
+        with self.lock:
+            self.converted[workout.id] = perf_data
+        return {'workout_id': workout.id, 'filename': f'peloton_{workout.id}.tcx',
+                'activity_name': workout.display_name, 'payload_hash': workout.id}
+    
+    def upload(self, prepared, rename=True):
+        return {'success': True, 'activity_id': None}
+    
+    def set_activity_name(self, activity_id, name):
+        pass
+
+
+class OfflineConverter(SimpleFitConverter):
+    """The real convert stage, with uploads that always succeed"""
+    
+    def upload(self, prepared, rename=True):
+        return {'success': True, 'activity_id': None, 'payload_hash': prepared['payload_hash']}
+
+
+def run_pipeline(auth, transport, converter=None):
+    converter = converter or RecordingConverter()
+    workouts = [Workout.from_json(data) for data in WORKOUTS]
+    pipeline = SyncPipeline(auth, converter, log=lambda message: None, fetch_workers=4,
+                            upload_rate=1000, fetch_transport=transport)
+    results = pipeline.run(workouts)
+    return results, getattr(converter, 'converted', None)
+
+
+def test_async_pipeline_matches_threaded_pipeline(auth, peloton_api):
+    threaded_results, threaded = run_pipeline(auth, 'threads')
+    async_results, fetched = run_pipeline(auth, 'async')
+    
+    # w13's details fail to download, so it never reaches the convert stage
+    assert fetched.keys() == threaded.keys() == {w['id'] for w in WORKOUTS} - {'w13'}
+    for workout_id, perf_data in threaded.items():
+        assert fetched[workout_id].metrics['output'] == perf_data.metrics['output']
+        assert fetched[workout_id].every_n == perf_data.every_n
+    
+    def outcome(results):
+        return sorted((result['workout_id'], result['success']) for result in results)
+    assert outcome(async_results) == outcome(threaded_results)
+    # The async stage reuses the threaded client's user id instead of asking again
+    assert peloton_api.count('me') == 1
+
+
+@pytest.mark.parametrize('transport', ['threads', 'async'])
+def test_failed_fetch_fails_workout_without_refetching(auth, peloton_api, monkeypatch, transport):
+    refetched = []
+    monkeypatch.setattr(auth, 'get_workout_details',
+                        lambda workout_id, **kwargs: refetched.append(workout_id))
+    
+    results, _ = run_pipeline(auth, transport, OfflineConverter(auth, RecordingConverter()))
+    
+    failed = [result for result in results if not result['success']]
+    assert [result['workout_id'] for result in failed] == ['w13']
+    assert 'Could not fetch details' in failed[0]['error']
+    # The convert stage made no Peloton requests of its own
+    assert refetched == []
+    assert peloton_api.count('w13') == 1
+
+
+def test_unknown_transport_rejected(auth):
+    with pytest.raises(ValueError):
+        SyncPipeline(auth, RecordingConverter(), fetch_transport='carrier-pigeon')
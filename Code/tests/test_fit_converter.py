@@ -0,0 +1,117 @@
+import io
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+from fit_converter import PelotonToFitConverter, encode_activity, fit_crc
+from peloton_models import PerformanceGraph, Ride, Workout
+
+fit_sdk = pytest.importorskip('garmin_fit_sdk')
+
+
+CREATED_AT = 1_700_000_000
+
+
+def workout(**kwargs):
+    return Workout('w1', CREATED_AT, start_time=CREATED_AT + 90, status='COMPLETE', fitness_discipline='cycling',
+                   ride=Ride(title='20 min Ride', duration=1200), **kwargs)
+
+
+def graph(samples=240, every_n=5):
+    return PerformanceGraph.from_json({
+        'duration': samples * every_n,
+        'metrics': [
+            {'slug': 'output', 'values': [100 + i % 50 for i in range(samples)]},
+            {'slug': 'heart_rate', 'values': [120 + i % 30 for i in range(samples)]},
+            {'slug': 'cadence', 'values': [80] * samples},
+            {'slug': 'speed', 'values': [20.0] * samples},
+        ],
+        'summaries': [
+            {'slug': 'distance', 'value': 10.0, 'display_unit': 'km'},
+            {'slug': 'calories', 'value': 300},
+        ],
+    }, every_n=every_n)
+
+
+def decoder(data):
+    return fit_sdk.Decoder(fit_sdk.Stream.from_byte_array(bytearray(data)))
+
+
+def decode(data):
+    assert decoder(data).is_fit()
+    assert decoder(data).check_integrity()
+    messages, errors = decoder(data).read()
+    assert errors == []
+    return messages
+
+
+def test_header_and_file_crc():
+    data = encode_activity(workout(), graph())
+    
+    header_size = data[0]
+    assert data[8:12] == b'.FIT'
+    assert struct.unpack_from('<H', data, 12)[0] == fit_crc(data[:12])
+    assert struct.unpack_from('<I', data, 4)[0] == len(data) - header_size - 2
+    assert struct.unpack_from('<H', data, len(data) - 2)[0] == fit_crc(data[:-2])
+
+
+def test_corruption_fails_integrity_check():
+    data = bytearray(encode_activity(workout(), graph()))
+    data[100] ^= 0xFF
+    
+    assert not decoder(data).check_integrity()
+
+
+def test_decodes_with_records_and_session():
+    messages = decode(encode_activity(workout(), graph()))
+    
+    records = messages['record_mesgs']
+    assert len(records) == 240
+    assert records[0]['power'] == 100
+    assert records[0]['heart_rate'] == 120
+    
+    session = messages['session_mesgs'][0]
+    assert session['total_calories'] == 300
+    assert session['total_distance'] == pytest.approx(10000, abs=1)
+
+
+def test_records_follow_every_n():
+    messages = decode(encode_activity(workout(), graph(every_n=1)))
+    
+    first, second = messages['record_mesgs'][:2]
+    assert (second['timestamp'] - first['timestamp']).total_seconds() == 1
+
+
+def test_start_time_matches_tcx():
+    messages = decode(encode_activity(workout(), graph()))
+    
+    start = messages['session_mesgs'][0]['start_time']
+    assert start == datetime.fromtimestamp(CREATED_AT, timezone.utc)
+
+
+def test_max_points_downsamples():
+    messages = decode(encode_activity(workout(), graph(samples=1000), max_points=100))
+    
+    assert len(messages['record_mesgs']) == 100
+
+
+def test_fitdecode_reads_the_file():
+    fitdecode = pytest.importorskip('fitdecode')
+    
+    with fitdecode.FitReader(io.BytesIO(encode_activity(workout(), graph())),
+                             check_crc=fitdecode.CrcCheck.ENABLED) as reader:
+        names = [frame.name for frame in reader if frame.frame_type == fitdecode.FIT_FRAME_DATA]
+    
+    assert names.count('record') == 240
+    assert 'session' in names and 'activity' in names
+
+
+class MissingDetails:
+    def fetch_workout_details(self, workout_id, use_cache=True, every_n=None):
+        raise Exception("HTTP 404 fetching performance data")
+
+
+def test_build_fit_fails_without_performance_data():
+    with pytest.raises(Exception, match='404'):
+        PelotonToFitConverter(MissingDetails()).build_fit(workout())
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+
+from garmin_cache import StrengthTrainingCache, WellnessCache
+
+
+ACCOUNT = 'rider@example.com'
+
+
+@pytest.fixture
+def strength(tmp_path):
+    cache = StrengthTrainingCache(tmp_path / 'cache.db', max_memory_entries=2)
+    yield cache
+    cache.close()
+
+
+def test_strength_memory_is_bounded(strength):
+    for activity_id in range(5):
+        strength.put(ACCOUNT, activity_id, {'exercises': [activity_id]})
+    
+    assert len(strength._memory) == 2
+    # Evicted entries are still on disk
+    assert strength.get_many(ACCOUNT, range(5)) == {i: {'exercises': [i]} for i in range(5)}
+    assert len(strength._memory) == 2
+
+
+def test_strength_survives_reopen(tmp_path):
+    cache = StrengthTrainingCache(tmp_path / 'cache.db')
+    cache.put(ACCOUNT, 1, {'exercises': ['squat']})
+    cache.close()
+    
+    cache = StrengthTrainingCache(tmp_path / 'cache.db')
+    assert cache.get(ACCOUNT, 1) == {'exercises': ['squat']}
+    assert cache.get('someone@example.com', 1) is None
+    cache.close()
+
+
+def test_wellness_open_day_expires(tmp_path):
+    cache = WellnessCache(tmp_path / 'cache.db', open_day_ttl=60)
+    day = '2026-01-01'
+    fetched = datetime(2026, 1, 1, 12).timestamp()
+    cache.put(ACCOUNT, 'sleep', day, {'score': 80}, now=fetched)
+    
+    assert cache.get(ACCOUNT, 'sleep', day, now=fetched + 30) == {'score': 80}
+    assert cache.get(ACCOUNT, 'sleep', day, now=fetched + 120) is None
+    cache.close()
+
+
+def test_wellness_settled_day_never_expires(tmp_path):
+    cache = WellnessCache(tmp_path / 'cache.db', open_day_ttl=60, settle_seconds=3600)
+    day = '2026-01-01'
+    fetched = datetime(2026, 1, 3).timestamp()
+    cache.put(ACCOUNT, 'sleep', day, {'score': 80}, now=fetched)
+    
+    assert cache.get(ACCOUNT, 'sleep', day, now=fetched + 365 * 86400) == {'score': 80}
+    cache.close()
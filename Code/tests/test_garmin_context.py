@@ -0,0 +1,81 @@
+import pytest
+
+pytest.importorskip('garminconnect')
+
+from garmin_handler_mfa import CONTEXT_SECTIONS, GarminDataHandler
+
+
+SECTION_NAMES = [name for name, _ in CONTEXT_SECTIONS]
+
+
+@pytest.fixture
+def handler():
+    handler = object.__new__(GarminDataHandler)
+    handler._ensure_authenticated = lambda: None
+    return handler
+
+
+def test_every_section_has_a_fetcher_and_formatter(handler):
+    assert sorted(handler._context_fetchers('2026-01-01', 5)) == sorted(SECTION_NAMES)
+    assert sorted(handler._context_formatters('2026-01-01')) == sorted(SECTION_NAMES)
+
+
+def test_sections_follow_context_sections(handler):
+    data = {
+        'hrv': {'lastNightAvg': 50},
+        'summary': {'totalSteps': 1234},
+        'spo2': {'latestSpO2Value': 97},
+    }
+    handler.fetch_context_data = lambda *args: data
+    
+    text = handler.format_data_for_context('comprehensive')
+    
+    # summary is not part of 'comprehensive', even if it was returned
+    assert 'Steps' not in text
+    assert text.index('Blood Oxygen') < text.index('Heart Rate Variability')
+
+
+def test_no_data(handler):
+    handler.fetch_context_data = lambda *args: {}
+    
+    assert handler.format_data_for_context('all') == "No data available"
+
+
+class Details:
+    """get_activity_details stand-in counting calls"""
+    
+    def __init__(self, details):
+        self.details = details
+        self.calls = 0
+    
+    def __call__(self, activity_id):
+        self.calls += 1
+        return self.details
+
+
+def strength_handler(handler, tmp_path, details):
+    from garmin_cache import StrengthTrainingCache
+    handler.email = 'rider@example.com'
+    handler.strength_cache = StrengthTrainingCache(tmp_path / 'cache.db')
+    handler.get_activity_details = Details(details)
+    return handler
+
+
+def test_strength_without_sets_is_fetched_again(handler, tmp_path):
+    handler = strength_handler(handler, tmp_path, {'activityType': {'typeKey': 'strength_training'}})
+    
+    handler.get_strength_training_details(1)
+    handler.get_strength_training_details_many([1])
+    
+    assert handler.get_activity_details.calls == 2
+    handler.strength_cache.close()
+
+
+def test_non_strength_activity_is_cached(handler, tmp_path):
+    handler = strength_handler(handler, tmp_path, {'activityType': {'typeKey': 'cycling'}})
+    
+    handler.get_strength_training_details(1)
+    handler.get_strength_training_details(1)
+    
+    assert handler.get_activity_details.calls == 1
+    handler.strength_cache.close()
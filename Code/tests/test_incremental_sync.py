@@ -0,0 +1,163 @@
+import pytest
+
+import sync_engine
+from peloton_models import PerformanceGraph, Ride, Workout
+from simple_fit_converter import SimpleFitConverter
+from sync_ledger import SyncLedger
+
+
+BASE = 1_700_000_000
+
+
+def workout(index, status='COMPLETE'):
+    return Workout(f'w{index}', BASE + index * 3600, status=status, ride=Ride(title=f'Ride {index}'))
+
+
+class FakePeloton:
+    """iter_workouts over an in-memory history, optionally failing after some workouts"""
+    
+    def __init__(self, workouts, fail_after=None):
+        self.workouts = sorted(workouts, key=lambda w: w.created_at, reverse=True)
+        self.fail_after = fail_after
+    
+    def iter_workouts(self, page_size=20, since=None, prefetch=True):
+        for count, item in enumerate(self.workouts):
+            if self.fail_after is not None and count >= self.fail_after:
+                raise Exception("HTTP 503 fetching workouts page 1")
+            if since is not None and item.created_at < since:
+                return
+            yield item
+    
+    def fetch_workout_details(self, workout_id, use_cache=True, every_n=None):
+        return PerformanceGraph.from_json({})
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SyncLedger(tmp_path / 'ledger.db')
+    yield ledger
+    ledger.close()
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """Replace the upload pipeline: every workout succeeds unless its id is in failing"""
+    class Uploads(list):
+        failing = set()
+    
+    uploaded = Uploads()
+    failing = uploaded.failing
+    
+    def fake_sync_workouts(peloton_auth, converter, workouts, ledger=None, *args, **kwargs):
+        results = []
+        for item in workouts:
+            success = item.id not in failing
+            if success:
+                ledger.record(item.id)
+                uploaded.append(item.id)
+            results.append({'workout_id': item.id, 'success': success})
+        return results
+    
+    monkeypatch.setattr(sync_engine, 'sync_workouts', fake_sync_workouts)
+    return uploaded
+
+
+def run(peloton, ledger, **kwargs):
+    return sync_engine.incremental_sync(peloton, None, ledger, log=lambda message: None, **kwargs)
+
+
+def test_first_run_only_considers_recent_workouts(ledger, uploads):
+    run(FakePeloton([workout(i) for i in range(50)]), ledger, first_run_limit=10)
+    assert sorted(uploads) == sorted(f'w{i}' for i in range(40, 50))
+    assert ledger.get_high_water_mark() == BASE + 49 * 3600
+
+
+def test_mark_advances_and_next_run_only_sees_new_workouts(ledger, uploads):
+    history = [workout(i) for i in range(5)]
+    run(FakePeloton(history), ledger)
+    uploads.clear()
+    
+    history += [workout(i) for i in range(5, 8)]
+    run(FakePeloton(history), ledger)
+    assert sorted(uploads) == ['w5', 'w6', 'w7']
+    assert ledger.get_high_water_mark() == BASE + 7 * 3600
+
+
+def test_mark_stops_before_failed_upload(ledger, uploads):
+    run(FakePeloton([workout(i) for i in range(3)]), ledger)
+    uploads.failing.add('w4')
+    run(FakePeloton([workout(i) for i in range(6)]), ledger)
+    assert ledger.get_high_water_mark() == BASE + 3 * 3600
+    
+    uploads.failing.clear()
+    uploads.clear()
+    run(FakePeloton([workout(i) for i in range(6)]), ledger)
+    assert uploads == ['w4']
+    assert ledger.get_high_water_mark() == BASE + 5 * 3600
+
+
+def test_mark_stops_before_in_progress_workout(ledger, uploads):
+    run(FakePeloton([workout(0)]), ledger)
+    run(FakePeloton([workout(0), workout(1, status='IN_PROGRESS'), workout(2)]), ledger)
+    assert 'w1' not in uploads and 'w2' in uploads
+    assert ledger.get_high_water_mark() == BASE
+
+
+def test_failed_listing_page_keeps_mark(ledger, uploads):
+    run(FakePeloton([workout(0)]), ledger)
+    mark = ledger.get_high_water_mark()
+    
+    # 45 new workouts; the listing dies after the first page of 20
+    history = [workout(i) for i in range(46)]
+    run(FakePeloton(history, fail_after=20), ledger)
+    assert len(uploads) == 1 + 20
+    assert ledger.get_high_water_mark() == mark
+    
+    # Next run sees the rest
+    uploads.clear()
+    run(FakePeloton(history), ledger)
+    assert sorted(uploads, key=lambda wid: int(wid[1:])) == [f'w{i}' for i in range(1, 26)]
+    assert ledger.get_high_water_mark() == BASE + 45 * 3600
+
+
+class GarminConflict(Exception):
+    """What garth raises for an upload Garmin already has"""
+    
+    def __init__(self, internal_id):
+        super().__init__("HTTP 409 Conflict")
+        body = {'detailedImportResult': {'failures': [
+            {'internalId': internal_id, 'messages': [{'code': 202, 'content': 'Duplicate Activity.'}]}
+        ]}}
+        self.response = type('Response', (), {'status_code': 409, 'headers': {}, 'json': lambda self: body})()
+
+
+class FakeGarmin:
+    """Garmin client that already has some of the activities"""
+    
+    def __init__(self, existing):
+        self.garth = self
+        self.existing = existing
+        self.uploaded = []
+    
+    def post(self, service, url, files=None, api=True):
+        workout_id = files['file'][0][len('peloton_'):-len('.tcx')]
+        if workout_id in self.existing:
+            raise GarminConflict(self.existing[workout_id])
+        self.uploaded.append(workout_id)
+        return {'detailedImportResult': {'successes': [{'internalId': len(self.uploaded)}]}}
+    
+    def set_activity_name(self, activity_id, name):
+        pass
+
+
+def test_mark_moves_past_duplicate_upload(ledger):
+    # w1 was uploaded to Garmin before the ledger existed
+    peloton = FakePeloton([workout(i) for i in range(3)])
+    garmin = FakeGarmin({'w1': 9001})
+    converter = SimpleFitConverter(peloton, garmin)
+    
+    sync_engine.incremental_sync(peloton, converter, ledger, log=lambda message: None, upload_rate=1000)
+    
+    assert sorted(garmin.uploaded) == ['w0', 'w2']
+    assert ledger.get('w1')['garmin_activity_id'] == 9001
+    assert ledger.get_high_water_mark() == BASE + 2 * 3600
@@ -0,0 +1,141 @@
+import re
+from pathlib import Path
+
+import pytest
+import requests
+
+import p2g
+from peloton_models import Ride, Workout
+
+
+README = Path(__file__).resolve().parents[2] / 'README.md'
+
+
+def parse(argv):
+    return p2g.build_parser().parse_args(argv.split())
+
+
+def documented_examples():
+    """Every `python -m p2g ...` line in the module docstring and the README"""
+    text = p2g.__doc__ + README.read_text(encoding='utf-8')
+    commands = re.findall(r'python -m p2g ([^\n#`]+)', text)
+    return sorted({command.strip() for command in commands})
+
+
+@pytest.mark.parametrize('argv', documented_examples())
+def test_documented_examples_parse(argv):
+    args = parse(argv)
+    assert args.command in ('sync', 'daemon')
+
+
+def test_documented_examples_found():
+    assert len(documented_examples()) >= 4
+
+
+def test_options_after_command():
+    args = parse('sync --since 2024-01-01 --workers 8 --upload-workers 2 --format fit')
+    assert (args.since, args.workers, args.upload_workers, args.format) == ('2024-01-01', 8, 2, 'fit')
+
+
+def test_options_before_command():
+    args = parse('--workers 3 --config-dir /tmp/p2g daemon --interval 30')
+    assert (args.workers, args.config_dir, args.interval) == (3, '/tmp/p2g', 30.0)
+
+
+def test_subcommand_option_overrides_top_level():
+    args = parse('--config-dir /a sync --config-dir /b')
+    assert args.config_dir == '/b'
+
+
+def test_defaults():
+    args = parse('sync')
+    assert args.since == 'last'
+    assert args.workers is None and args.upload_workers is None and args.format is None
+    assert args.transport is None
+    assert args.config_dir == str(p2g.DEFAULT_CONFIG_DIR)
+
+
+def test_bad_format_rejected():
+    with pytest.raises(SystemExit):
+        parse('sync --format gpx')
+
+
+def test_bad_since_rejected():
+    assert p2g.main(['sync', '--since', 'yesterday']) == p2g.EXIT_SETUP_FAILED
+
+
+class FakePeloton:
+    def __init__(self, count):
+        self.workouts = [Workout(f'w{i}', 1_700_000_000 - i * 3600, status='COMPLETE',
+                                 ride=Ride(title=f'Ride {i}'))
+                         for i in range(count)]
+    
+    def iter_workouts(self, page_size=20, since=None, prefetch=True):
+        return iter(self.workouts)
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    (tmp_path / 'config.json').write_text('{}')
+    return tmp_path
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    logged = []
+    monkeypatch.setattr(p2g, 'log', logged.append)
+    return logged
+
+
+def test_first_dry_run_checks_the_same_workouts_as_a_real_run(config_dir, messages):
+    syncer = p2g.HeadlessSync(config_dir)
+    syncer.connect_peloton = lambda: FakePeloton(50)
+    
+    syncer.run('last', dry_run=True)
+    syncer.sync_ledger.close()
+    
+    assert f"Would sync {p2g.FIRST_RUN_LIMIT} workouts:" in messages
+
+
+class FailingSync:
+    """Stands in for HeadlessSync; every run fails the same way"""
+    
+    instances = []
+    
+    def __init__(self, *args):
+        self.closed = False
+        self.sync_ledger = self
+        FailingSync.instances.append(self)
+    
+    def run(self, *args):
+        raise requests.ConnectionError("Connection refused")
+    
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def failing_sync(monkeypatch):
+    FailingSync.instances = []
+    monkeypatch.setattr(p2g, 'HeadlessSync', FailingSync)
+    return FailingSync.instances
+
+
+def test_sync_network_failure_exits_cleanly(failing_sync, messages):
+    assert p2g.main(['sync']) == p2g.EXIT_SYNC_FAILED
+    assert messages == ["✗ Sync failed: ConnectionError: Connection refused"]
+    assert failing_sync[0].closed
+
+
+def test_daemon_closes_ledger_when_a_round_fails(failing_sync, messages, monkeypatch):
+    handlers = {}
+    monkeypatch.setattr(p2g.signal, 'signal', lambda signum, handler: handlers.setdefault(signum, handler))
+    
+    def run(self, *args):
+        # Ctrl+C during the round, then the round fails
+        handlers[p2g.signal.SIGINT](p2g.signal.SIGINT, None)
+        raise requests.ConnectionError("Connection refused")
+    monkeypatch.setattr(FailingSync, 'run', run)
+    
+    assert p2g.main(['daemon', '--interval', '60']) == p2g.EXIT_OK
+    assert len(failing_sync) == 1 and failing_sync[0].closed
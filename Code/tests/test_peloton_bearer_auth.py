@@ -0,0 +1,65 @@
+import pytest
+
+from peloton_bearer_auth import PelotonBearerAuth
+
+
+class Response:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+    
+    def json(self):
+        return self._data
+
+
+class FakeSession:
+    """performance_graph responses keyed by workout id; anything else is a 500"""
+    
+    def __init__(self, graphs):
+        self.graphs = graphs
+        self.headers = {}
+    
+    def get(self, url, params=None):
+        workout_id = url.split('/')[-2]
+        if workout_id in self.graphs:
+            return Response(200, self.graphs[workout_id])
+        return Response(500)
+    
+    def mount(self, prefix, adapter):
+        pass
+
+
+@pytest.fixture
+def auth():
+    auth = PelotonBearerAuth(every_n=2)
+    auth.bearer_token = 'token'
+    auth.session = FakeSession({'ok': {'duration': 60, 'metrics': []}})
+    return auth
+
+
+def test_fetch_workout_details_sets_requested_every_n(auth):
+    assert auth.fetch_workout_details('ok').every_n == 2
+    assert auth.fetch_workout_details('ok', every_n=1).every_n == 1
+
+
+def test_fetch_workout_details_raises(auth):
+    with pytest.raises(Exception, match='HTTP 500'):
+        auth.fetch_workout_details('broken')
+
+
+def test_get_workout_details_returns_none_on_error(auth):
+    assert auth.get_workout_details('broken') is None
+
+
+def test_fetch_requires_token(auth):
+    auth.bearer_token = None
+    with pytest.raises(Exception, match='Not authenticated'):
+        auth.fetch_workout_details('ok')
+
+
+def test_get_workout_details_many_reports_each_result(auth):
+    results = {workout_id: (details, error)
+               for workout_id, details, error in auth.get_workout_details_many(['ok', 'broken'])}
+    
+    assert results['ok'][0].duration == 60 and results['ok'][1] is None
+    assert results['broken'][0] is None and 'HTTP 500' in results['broken'][1]
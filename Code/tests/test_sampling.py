@@ -0,0 +1,65 @@
+import math
+from array import array
+
+import pytest
+
+from peloton_models import PerformanceGraph
+from sampling import lttb_indices, sample_offsets, select_samples
+
+
+def test_offsets_come_from_seconds_since_pedaling_start():
+    graph = PerformanceGraph(every_n=5, seconds_since_pedaling_start=array('i', [0, 1, 3, 7]))
+    
+    assert sample_offsets(graph, 3) == [0, 1, 3]
+
+
+def test_offsets_fall_back_to_requested_every_n():
+    graph = PerformanceGraph.from_json({'metrics': [{'slug': 'output', 'values': [1, 2, 3]}]}, every_n=2)
+    
+    assert graph.every_n == 2
+    assert sample_offsets(graph, 3) == [0, 2, 4]
+
+
+def test_requested_every_n_wins_over_response():
+    graph = PerformanceGraph.from_json({'every_n': 5}, every_n=1)
+    
+    assert graph.every_n == 1
+
+
+def test_offsets_without_every_n_raise():
+    with pytest.raises(ValueError):
+        sample_offsets(PerformanceGraph(), 4)
+
+
+def test_no_samples_needs_no_interval():
+    assert sample_offsets(PerformanceGraph(), 0) == []
+
+
+def test_lttb_keeps_everything_under_threshold():
+    assert lttb_indices([1, 2, 3], 5) == [0, 1, 2]
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    values = [100.0] * 1000
+    values[437] = 900.0
+    values[800] = 0.0
+    
+    keep = lttb_indices(values, 50)
+    
+    assert len(keep) == 50
+    assert keep == sorted(keep)
+    assert keep[0] == 0 and keep[-1] == 999
+    assert 437 in keep and 800 in keep
+
+
+def test_lttb_treats_missing_as_zero():
+    values = [None, math.nan, 5, 1, 2, 3, 4, 5, 6, 7]
+    
+    assert len(lttb_indices(values, 4)) == 4
+
+
+def test_select_samples_caps_points():
+    metrics = {'output': array('f', range(600))}
+    
+    assert select_samples(metrics, 600) == list(range(600))
+    assert len(select_samples(metrics, 600, max_points=100)) == 100
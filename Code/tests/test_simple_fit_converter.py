@@ -0,0 +1,74 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import simple_fit_converter
+from peloton_models import PerformanceGraph, Ride, Workout
+from simple_fit_converter import SimpleFitConverter
+
+
+NS = {'tcx': 'http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2',
+      'ns2': 'http://www.garmin.com/xmlschemas/ActivityExtension/v2'}
+
+needs_numpy = pytest.mark.skipif(simple_fit_converter.np is None, reason='numpy is not installed')
+
+
+def workout():
+    return Workout('w1', 1_700_000_000, status='COMPLETE', ride=Ride(title='Ride', duration=30))
+
+
+def graph():
+    # Gaps in every column, so both paths have to agree on missing samples
+    return PerformanceGraph.from_json({
+        'duration': 30,
+        'metrics': [
+            {'slug': 'output', 'values': [100, 110, None, 130, 140, 150]},
+            {'slug': 'heart_rate', 'values': [120, None, 122, 123, 124, 125]},
+            {'slug': 'cadence', 'values': [80, 80, 80, 0, 80, 80]},
+            {'slug': 'speed', 'values': [18.0, 18.5, None, 20.0, 20.0, 20.0]},
+        ],
+    }, every_n=5)
+
+
+def tcx(converter):
+    buffer = io.StringIO()
+    converter._write_tcx(buffer, workout(), graph(), 175.46, 10, None, None)
+    return buffer.getvalue()
+
+
+def forced(monkeypatch, use_numpy):
+    """Converter that can only take the requested trackpoint path"""
+    converter = SimpleFitConverter(None, None, use_numpy=use_numpy)
+    other = '_trackpoint_columns_python' if use_numpy else '_trackpoint_columns_numpy'
+    
+    def unexpected(*args, **kwargs):
+        raise AssertionError(f"{other} should not be used")
+    
+    monkeypatch.setattr(converter, other, unexpected)
+    return converter
+
+
+def text(point, path):
+    element = point.find(path, NS)
+    return None if element is None else element.text
+
+
+@pytest.mark.parametrize('use_numpy', [pytest.param(True, marks=needs_numpy), False])
+def test_trackpoints(monkeypatch, use_numpy):
+    points = ET.fromstring(tcx(forced(monkeypatch, use_numpy))).findall('.//tcx:Trackpoint', NS)
+    
+    assert [text(p, 'tcx:Time') for p in points] == [
+        f'2023-11-14T22:13:{second}Z' for second in (20, 25, 30, 35, 40, 45)]
+    assert [text(p, 'tcx:DistanceMeters') for p in points] == [
+        None, '41.35', '41.35', '86.05', '130.76', '175.46']
+    assert [text(p, 'tcx:HeartRateBpm/tcx:Value') for p in points] == [
+        '120', None, '122', '123', '124', '125']
+    assert [text(p, 'tcx:Cadence') for p in points] == ['80', '80', '80', None, '80', '80']
+    assert [text(p, 'tcx:Extensions/ns2:TPX/ns2:Watts') for p in points] == [
+        '100', '110', None, '130', '140', '150']
+
+
+@needs_numpy
+def test_numpy_and_python_paths_write_the_same_tcx(monkeypatch):
+    assert tcx(forced(monkeypatch, True)) == tcx(forced(monkeypatch, False))
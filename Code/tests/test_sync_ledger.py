@@ -0,0 +1,154 @@
+import pytest
+
+from peloton_models import Ride, Workout
+from rename_queue import RenameQueue
+from sync_ledger import SyncLedger
+from upload_scheduler import UploadScheduler
+
+
+def workout(workout_id, created_at=1_700_000_000):
+    return Workout(workout_id, created_at, status='COMPLETE', ride=Ride(title='Ride'))
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = SyncLedger(tmp_path / 'ledger.db', max_retry_attempts=3)
+    yield ledger
+    ledger.close()
+
+
+def test_record_survives_reopen(tmp_path):
+    ledger = SyncLedger(tmp_path / 'ledger.db')
+    ledger.record('w1', garmin_activity_id=42, payload_hash='abc')
+    ledger.close()
+    
+    ledger = SyncLedger(tmp_path / 'ledger.db')
+    assert ledger.is_synced('w1')
+    assert ledger.get('w1')['garmin_activity_id'] == 42
+    assert ledger.get('w2') is None
+    ledger.close()
+
+
+def test_forget(ledger):
+    ledger.record('w1')
+    ledger.forget('w1')
+    
+    assert not ledger.is_synced('w1')
+    assert ledger.get('w1') is None
+
+
+def test_due_retries_respect_next_attempt(ledger):
+    ledger.queue_retry('w1', workout('w1'), 'HTTP 503', next_attempt_at=200)
+    ledger.queue_retry('w2', workout('w2'), 'HTTP 503', next_attempt_at=100)
+    
+    assert [w.id for w in ledger.due_retries(now=150)] == ['w2']
+    assert [w.id for w in ledger.due_retries(now=300)] == ['w2', 'w1']
+    assert ledger.due_retries(now=300)[0].ride.title == 'Ride'
+
+
+def test_record_clears_retry(ledger):
+    ledger.queue_retry('w1', workout('w1'), next_attempt_at=0)
+    ledger.record('w1')
+    
+    assert ledger.pending_retry_count() == 0
+
+
+def test_retry_dropped_after_max_attempts(ledger):
+    for _ in range(3):
+        assert ledger.queue_retry('w1', workout('w1'), 'HTTP 503', next_attempt_at=0)
+    
+    assert not ledger.queue_retry('w1', workout('w1'), 'HTTP 503', next_attempt_at=0)
+    assert ledger.pending_retry_count() == 0
+    assert ledger.due_retries(now=1) == []
+
+
+def test_renames(ledger):
+    ledger.queue_rename(1, 'First')
+    ledger.queue_rename(2, 'Second')
+    ledger.rename_failed(1, 'HTTP 500')
+    ledger.complete_rename(2)
+    
+    assert ledger.pending_renames() == [(1, 'First')]
+
+
+class FailingGarmin:
+    def __init__(self):
+        self.calls = 0
+    
+    def set_activity_name(self, activity_id, name):
+        self.calls += 1
+        raise Exception("HTTP 500")
+
+
+def test_failing_rename_dropped_after_max_attempts_across_restarts(tmp_path):
+    garmin = FailingGarmin()
+    messages = []
+    ledger = SyncLedger(tmp_path / 'ledger.db')
+    ledger.queue_rename(1, 'Ride')
+    ledger.close()
+    
+    def session():
+        ledger = SyncLedger(tmp_path / 'ledger.db', max_rename_attempts=4)
+        renames = RenameQueue(garmin, ledger, max_attempts=2, log=messages.append)
+        renames.flush()
+        renames.flush()
+        pending = ledger.pending_renames()
+        ledger.close()
+        return pending
+    
+    assert session() == [(1, 'Ride')]
+    assert session() == []
+    assert sum('Giving up' in message for message in messages) == 1
+    
+    # Later sessions no longer try it
+    session()
+    assert garmin.calls == 4
+
+
+def test_high_water_mark(ledger):
+    assert ledger.get_high_water_mark() is None
+    ledger.set_high_water_mark(1_700_000_000)
+    assert ledger.get_high_water_mark() == 1_700_000_000
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.response = type('Response', (), {'status_code': status, 'headers': {}})()
+
+
+class FailingConverter:
+    def __init__(self, status):
+        self.status = status
+        self.calls = 0
+    
+    def upload(self, prepared, rename=True):
+        self.calls += 1
+        return {'success': False, 'error': f"HTTP {self.status}", 'exception': HTTPError(self.status)}
+
+
+def scheduler(converter, ledger, messages):
+    return UploadScheduler(converter, ledger, rate=1000, burst=1000, max_attempts=2,
+                           base_delay=0, max_delay=0, log=messages.append)
+
+
+def test_throttled_upload_is_queued_then_dropped(ledger):
+    messages = []
+    prepared = {'workout_id': 'w1', 'filename': 'peloton_w1.tcx'}
+    uploads = scheduler(FailingConverter(503), ledger, messages)
+    
+    for _ in range(4):
+        uploads.upload(prepared, workout('w1'))
+    
+    assert ledger.pending_retry_count() == 0
+    assert sum('Giving up' in message for message in messages) == 1
+
+
+def test_non_retryable_failure_clears_retry(ledger):
+    ledger.queue_retry('w1', workout('w1'), 'HTTP 503', next_attempt_at=0)
+    converter = FailingConverter(400)
+    
+    scheduler(converter, ledger, []).upload({'workout_id': 'w1', 'filename': 'peloton_w1.tcx'}, workout('w1'))
+    
+    assert converter.calls == 1
+    assert ledger.pending_retry_count() == 0
@@ -0,0 +1,114 @@
+from peloton_models import Ride, Workout
+from workout_list import CHECKED, VirtualWorkoutList
+from workout_store import WorkoutStore
+
+
+class FakeTree:
+    """The parts of ttk.Treeview the list uses, keeping rows in order"""
+    
+    def __init__(self):
+        self.rows = []
+        self.values = {}
+        self.inserts = 0
+    
+    def configure(self, **kwargs):
+        pass
+    
+    def bind(self, event, callback):
+        pass
+    
+    def get_children(self):
+        return list(self.rows)
+    
+    def delete(self, *items):
+        for item in items:
+            self.rows.remove(item)
+            del self.values[item]
+    
+    def item(self, item, values):
+        self.values[item] = values
+    
+    def move(self, item, parent, index):
+        self.rows.remove(item)
+        self.rows.insert(index, item)
+    
+    def insert(self, parent, index, iid, values):
+        self.inserts += 1
+        self.rows.insert(index, iid)
+        self.values[iid] = values
+
+
+class FakeScrollbar:
+    def config(self, **kwargs):
+        pass
+    
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+def workouts(start, count):
+    return [Workout(f'w{i}', 1_600_000_000 + i * 3600, ride=Ride(title=f'Ride {i}', duration=1200))
+            for i in range(start, start + count)]
+
+
+def make_list():
+    tree = FakeTree()
+    return VirtualWorkoutList(tree, FakeScrollbar()), tree
+
+
+def test_large_list_only_materializes_visible_rows():
+    view, tree = make_list()
+    store = WorkoutStore(workouts(0, 5000))
+    
+    view.set_workouts(store.newest_first())
+    
+    assert len(view) == 5000
+    assert tree.rows == [f'w{i}' for i in range(4999, 4979, -1)]
+    assert len(view._rows) == 20
+
+
+def test_scrolling_to_the_end():
+    view, tree = make_list()
+    view.set_workouts(WorkoutStore(workouts(0, 5000)).newest_first())
+    
+    view.yview('moveto', 1.0)
+    
+    assert tree.rows[-1] == 'w0'
+    assert len(tree.rows) == 20
+    assert view.scrollbar.position[1] == 1.0
+
+
+def test_pages_appended_keep_scroll_and_selection():
+    view, tree = make_list()
+    store = WorkoutStore()
+    
+    store.update(workouts(900, 100))
+    view.set_workouts(store.newest_first())
+    view.scroll(50)
+    view.toggle('w950')
+    
+    # Older pages arrive while the user is looking at the list
+    for start in range(800, -100, -100):
+        store.update(workouts(start, 100))
+        view.set_workouts(store.newest_first())
+    
+    assert view.top == 50
+    assert tree.rows[0] == 'w949'
+    assert view.selected_ids() == ['w950']
+    
+    view.toggle('w3')
+    assert view.selected_ids() == ['w950', 'w3']
+    
+    view.scroll(-1)
+    assert tree.values['w950'][0] == CHECKED
+
+
+def test_reload_drops_deleted_workouts_and_their_selection():
+    view, tree = make_list()
+    view.set_workouts(workouts(0, 100))
+    view.toggle('w5')
+    
+    view.set_workouts([w for w in workouts(0, 100) if w.id != 'w5'])
+    
+    assert len(view) == 99
+    assert view.selected_ids() == []
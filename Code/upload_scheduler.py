@@ -0,0 +1,202 @@
+"""
+Rate-limited Garmin upload scheduler
+Spaces uploads with a token bucket, retries throttled (HTTP 429) and
+transient failures with jittered exponential backoff that honours
+Retry-After, and parks workouts that still fail in the sync ledger's retry
+queue so a later sync picks them up again.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+# Sustained uploads per second and how many may go out back to back
+DEFAULT_UPLOAD_RATE = 0.5
+DEFAULT_UPLOAD_BURST = 3
+
+# HTTP statuses worth retrying
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket - acquire() blocks until a token is available"""
+    
+    def __init__(self, rate, capacity):
+        """
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        """Hold every caller back for at least `seconds` (e.g. after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header
+    
+    Returns:
+        float: Seconds to wait, or None if missing/unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_info(error):
+    """
+    Decide whether an upload error is worth retrying
+    
+    Looks through the exception chain for an HTTP response (requests and
+    garth both attach one) to read the status code and Retry-After header.
+    
+    Returns:
+        tuple: (retryable, retry_after seconds or None)
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        
+        if 'TooManyRequests' in type(error).__name__:
+            return True, None
+        if type(error).__name__ in ('ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout'):
+            return True, None
+        
+        response = getattr(error, 'response', None)
+        status = getattr(response, 'status_code', None)
+        if status is not None:
+            headers = getattr(response, 'headers', None) or {}
+            return status in RETRYABLE_STATUSES, parse_retry_after(headers.get('Retry-After'))
+        
+        # garth wraps the requests HTTPError in .error
+        error = getattr(error, 'error', None) or error.__cause__ or error.__context__
+    
+    return False, None
+
+
+class UploadScheduler:
+    """Runs converter uploads under a shared rate limit with retries"""
+    
+    def __init__(self, converter, ledger=None, rate=DEFAULT_UPLOAD_RATE, burst=DEFAULT_UPLOAD_BURST,
+                 max_attempts=4, base_delay=2.0, max_delay=120.0, log=print, cancel=None):
+        """
+        Args:
+            converter: SimpleFitConverter doing the actual upload
+            ledger: Optional SyncLedger - workouts that exhaust their attempts
+                    are added to its retry queue
+            rate: Sustained uploads per second
+            burst: Uploads allowed back to back
+            max_attempts: Attempts per workout before giving up for this run
+            base_delay: First backoff delay in seconds (doubles per attempt)
+            max_delay: Cap on a single backoff delay
+            log: Callable receiving progress messages
+            cancel: Optional threading.Event - once set, failed uploads go
+                    straight to the retry queue instead of waiting to retry
+        """
+        self.converter = converter
+        self.ledger = ledger
+        self.bucket = TokenBucket(rate, burst)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.log = log
+        self.cancel = cancel
+    
+    def backoff_delay(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+    
+    def upload(self, prepared, workout=None, rename=True):
+        """
+        Upload a file built by converter.build_upload(), retrying when throttled
+        
+        Args:
+            prepared: Upload prepared by build_upload()
+            workout: Workout record - stored in the retry queue if every attempt fails,
+                     and removed from it if the upload fails for good
+            rename: Passed on to converter.upload()
+        
+        Returns:
+            dict: The converter's upload result
+        """
+        for attempt in range(self.max_attempts):
+            self.bucket.acquire()
+            result = self.converter.upload(prepared, rename=rename)
+            if result.get('success'):
+                return result
+            if result.get('duplicate'):
+                # Garmin already has it - nothing left to retry
+                if self.ledger is not None:
+                    self.ledger.clear_retry(prepared['workout_id'])
+                return result
+            
+            retryable, retry_after = retry_info(result.get('exception'))
+            if not retryable:
+                # Retrying on a later sync would fail the same way
+                if self.ledger is not None:
+                    self.ledger.clear_retry(prepared['workout_id'])
+                return result
+            
+            delay = self.backoff_delay(attempt, retry_after)
+            if retry_after is not None:
+                # Throttled - hold back every upload, not just this one
+                self.bucket.pause(retry_after)
+            
+            if attempt + 1 < self.max_attempts:
+                self.log(f"⏳ Garmin is busy, retrying {prepared['filename']} in {delay:.0f}s "
+                         f"({result.get('error')})")
+                if self.cancel is None:
+                    time.sleep(delay)
+                elif self.cancel.wait(delay):
+                    break
+        
+        if self.ledger is not None and workout is not None:
+            queued = self.ledger.queue_retry(
+                prepared['workout_id'], workout, result.get('error'),
+                next_attempt_at=time.time() + self.backoff_delay(self.max_attempts, retry_after)
+            )
+            if queued:
+                self.log(f"⏳ Queued {prepared['filename']} for retry on the next sync")
+            else:
+                self.log(f"✗ Giving up on {prepared['filename']} after "
+                         f"{self.ledger.max_retry_attempts} retries ({result.get('error')})")
+        return result
@@ -0,0 +1,158 @@
+"""
+On-disk cache for Peloton performance_graph responses
+Finished workouts never change, so their performance data only has to be
+downloaded once. Entries are content-addressed by (workout id, every_n),
+stored compressed and evicted least-recently-used once the cache grows past
+its size limit.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+DEFAULT_CACHE_DIR = Path.home() / '.peloton_garmin_sync' / 'cache'
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024  # 100 MB
+
+
+class PerformanceGraphCache:
+    """Compressed, size-bounded LRU cache of performance_graph JSON"""
+    
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            cache_dir: Directory holding cache entries (default: ~/.peloton_garmin_sync/cache)
+            max_bytes: Total size above which least-recently-used entries are evicted
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else DEFAULT_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # computed on first write
+        
+        # Prefer zstd when available; gzip entries stay readable either way
+        self._ext = '.json.zst' if zstandard else '.json.gz'
+    
+    def _key(self, workout_id, every_n):
+        return hashlib.sha256(f"{workout_id}:{every_n}".encode('utf-8')).hexdigest()
+    
+    def _entries(self):
+        """All cache entry files"""
+        return [p for p in self.cache_dir.iterdir() if p.name.endswith(('.json.gz', '.json.zst'))]
+    
+    def get(self, workout_id, every_n):
+        """
+        Look up a cached performance graph
+        
+        Returns:
+            dict: Cached response, or None on a miss
+        """
+        key = self._key(workout_id, every_n)
+        
+        for ext in ('.json.zst', '.json.gz'):
+            path = self.cache_dir / (key + ext)
+            try:
+                raw = path.read_bytes()
+            except FileNotFoundError:
+                continue
+            
+            try:
+                data = json.loads(self._decompress(raw, ext))
+            except Exception:
+                # Corrupt or unreadable entry - drop it and treat as a miss
+                self._remove(path)
+                return None
+            
+            # Bump the modification time so eviction sees this entry as recently used
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+            return data
+        
+        return None
+    
+    def put(self, workout_id, every_n, data):
+        """Store a performance graph response"""
+        key = self._key(workout_id, every_n)
+        path = self.cache_dir / (key + self._ext)
+        payload = self._compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+        
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            with self._lock:
+                previous = path.stat().st_size if path.exists() else 0
+                os.replace(tmp_path, path)
+                if self._total_bytes is not None:
+                    self._total_bytes += len(payload) - previous
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        self._evict()
+    
+    def clear(self):
+        """Remove every cache entry"""
+        with self._lock:
+            for path in self._entries():
+                self._remove(path)
+            self._total_bytes = 0
+    
+    def _evict(self):
+        """Delete least-recently-used entries until the cache fits in max_bytes"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(p.stat().st_size for p in self._entries())
+            
+            if self._total_bytes <= self.max_bytes:
+                return
+            
+            entries = []
+            for path in self._entries():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+            
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+            self._total_bytes = total
+    
+    def _compress(self, raw):
+        if self._ext == '.json.zst':
+            return zstandard.ZstdCompressor().compress(raw)
+        return gzip.compress(raw)
+    
+    def _decompress(self, raw, ext):
+        if ext == '.json.zst':
+            if zstandard is None:
+                raise ValueError("zstandard not installed")
+            return zstandard.ZstdDecompressor().decompress(raw)
+        return gzip.decompress(raw)
+    
+    def _remove(self, path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
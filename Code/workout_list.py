@@ -0,0 +1,177 @@
+"""
+Virtualized workout list for the desktop app
+The Treeview only ever holds the rows that fit on screen. The full list lives
+in memory as an ordered list of workout ids; scrolling re-points the window
+and updates just the rows that changed, so a history of thousands of
+workouts costs the same to display as twenty.
+"""
+
+from datetime import datetime
+
+
+CHECKED = '☑'
+UNCHECKED = '☐'
+
+
+def format_row(workout):
+    """Treeview values (without the checkbox) for a workout"""
+    date_str = datetime.fromtimestamp(workout.created_at).strftime('%Y-%m-%d %H:%M')
+    
+    ride = workout.ride
+    title = ride.title or 'Untitled'
+    instructor = ride.instructor_name
+    
+    if instructor:
+        display_name = f"{title} - {instructor}"
+    else:
+        display_name = title
+    
+    duration_min = ride.duration // 60
+    calories = workout.calories
+    
+    return (date_str, display_name, f"{duration_min} min", f"{calories:.0f}")
+
+
+class VirtualWorkoutList:
+    """Drives a Treeview and scrollbar, materializing only the visible rows"""
+    
+    def __init__(self, tree, scrollbar, selected=None, row_height=20, header_height=25):
+        """
+        Args:
+            tree: ttk.Treeview whose first column is the checkbox
+            scrollbar: Scrollbar for the tree - driven by this list, not the tree
+            selected: Optional set of selected workout ids to share with the caller
+            row_height: Treeview row height in pixels
+            header_height: Treeview heading height in pixels
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.selected = selected if selected is not None else set()
+        self.row_height = row_height
+        self.header_height = header_height
+        
+        self.order = []       # workout ids in display order
+        self.workouts = {}    # workout id -> Workout
+        self._rows = {}       # workout id -> formatted values, filled as rows come into view
+        self._shown = {}      # workout id -> values currently in the tree
+        self.top = 0
+        self.visible_count = 20
+        
+        tree.configure(yscrollcommand='')
+        scrollbar.config(command=self.yview)
+        tree.bind('<Configure>', self._on_resize)
+        tree.bind('<MouseWheel>', self._on_mousewheel)
+        tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        tree.bind('<Button-5>', lambda e: self.scroll(3))
+    
+    def __len__(self):
+        return len(self.order)
+    
+    def set_workouts(self, workouts):
+        """
+        Replace the list contents, keeping everything that did not change
+        
+        Rows are only re-formatted for workouts that are new or whose data
+        changed, and selections survive for workouts still in the list.
+        """
+        workouts_by_id = {}
+        order = []
+        for workout in workouts:
+            workout_id = workout.id
+            if workout_id not in workouts_by_id:
+                order.append(workout_id)
+            workouts_by_id[workout_id] = workout
+        
+        for workout_id, workout in workouts_by_id.items():
+            previous = self.workouts.get(workout_id)
+            if previous is not None and previous is not workout and previous != workout:
+                self._rows.pop(workout_id, None)
+        
+        for workout_id in self.workouts.keys() - workouts_by_id.keys():
+            self._rows.pop(workout_id, None)
+            self.selected.discard(workout_id)
+        
+        self.workouts = workouts_by_id
+        self.order = order
+        self.top = min(self.top, self._max_top())
+        self._render()
+    
+    def selected_ids(self):
+        """Selected workout ids in display order"""
+        return [workout_id for workout_id in self.order if workout_id in self.selected]
+    
+    def toggle(self, workout_id):
+        """Flip the checkbox of a workout"""
+        if workout_id not in self.workouts:
+            return
+        if workout_id in self.selected:
+            self.selected.discard(workout_id)
+        else:
+            self.selected.add(workout_id)
+        self._render()
+    
+    def yview(self, *args):
+        """Scrollbar command: ('moveto', fraction) or ('scroll', n, 'units'|'pages')"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.order))
+        elif args[0] == 'scroll':
+            step = self.visible_count if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.top = max(0, min(self.top, self._max_top()))
+        self._render()
+    
+    def scroll(self, units):
+        self.yview('scroll', units, 'units')
+    
+    def _on_mousewheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        if abs(event.delta) >= 120:
+            self.scroll(-3 * (event.delta // 120))
+        else:
+            self.scroll(-event.delta)
+    
+    def _on_resize(self, event):
+        visible_count = max(1, (event.height - self.header_height) // self.row_height)
+        if visible_count != self.visible_count:
+            self.visible_count = visible_count
+            self.top = min(self.top, self._max_top())
+            self._render()
+    
+    def _max_top(self):
+        return max(0, len(self.order) - self.visible_count)
+    
+    def _values(self, workout_id):
+        row = self._rows.get(workout_id)
+        if row is None:
+            row = format_row(self.workouts[workout_id])
+            self._rows[workout_id] = row
+        return (CHECKED if workout_id in self.selected else UNCHECKED,) + row
+    
+    def _render(self):
+        """Bring the tree's rows in line with the visible window"""
+        visible = self.order[self.top:self.top + self.visible_count]
+        wanted = set(visible)
+        
+        stale = [item for item in self.tree.get_children() if item not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for item in stale:
+                self._shown.pop(item, None)
+        
+        for index, workout_id in enumerate(visible):
+            values = self._values(workout_id)
+            if workout_id in self._shown:
+                if self._shown[workout_id] != values:
+                    self.tree.item(workout_id, values=values)
+                self.tree.move(workout_id, '', index)
+            else:
+                self.tree.insert('', index, iid=workout_id, values=values)
+            self._shown[workout_id] = values
+        
+        total = len(self.order)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(visible)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
@@ -0,0 +1,123 @@
+"""
+In-memory index over loaded Peloton workouts
+Shared by the workout list, sync, export and headless syncs: lookups by id
+are dict lookups, date ranges are bisected out of a creation-ordered index,
+and each fitness discipline keeps its own ordered bucket.
+"""
+
+from bisect import bisect_left, insort
+
+from peloton_bearer_auth import normalize_since
+
+
+class WorkoutStore:
+    """Workouts keyed by id with date and discipline indexes"""
+    
+    def __init__(self, workouts=()):
+        """
+        Args:
+            workouts: Optional Workout records to load
+        """
+        self._by_id = {}
+        self._keys = {}            # workout id -> (created_at, discipline) it is indexed under
+        self._dates = []           # sorted (created_at, workout id)
+        self._by_discipline = {}   # discipline -> sorted (created_at, workout id)
+        self.update(workouts)
+    
+    def __len__(self):
+        return len(self._by_id)
+    
+    def __contains__(self, workout_id):
+        return workout_id in self._by_id
+    
+    def __iter__(self):
+        """Workouts newest first"""
+        return iter(self.newest_first())
+    
+    def get(self, workout_id, default=None):
+        return self._by_id.get(workout_id, default)
+    
+    def add(self, workout):
+        """Add a workout, replacing any earlier copy with the same id"""
+        workout_id = workout.id
+        if workout_id in self._by_id:
+            self._unindex(workout_id)
+        
+        created_at = workout.created_at
+        discipline = workout.discipline
+        self._by_id[workout_id] = workout
+        self._keys[workout_id] = (created_at, discipline)
+        insort(self._dates, (created_at, workout_id))
+        insort(self._by_discipline.setdefault(discipline, []), (created_at, workout_id))
+    
+    def update(self, workouts):
+        """Add many workouts, re-sorting the indexes once"""
+        for workout in workouts:
+            self._by_id[workout.id] = workout
+            self._keys[workout.id] = (workout.created_at, workout.discipline)
+        self._reindex()
+    
+    def replace(self, workouts):
+        """Drop everything and load workouts"""
+        self.clear()
+        self.update(workouts)
+    
+    def remove(self, workout_id):
+        """Forget a workout; returns it, or None if it was not loaded"""
+        if workout_id not in self._by_id:
+            return None
+        self._unindex(workout_id)
+        del self._keys[workout_id]
+        return self._by_id.pop(workout_id)
+    
+    def clear(self):
+        self._by_id.clear()
+        self._keys.clear()
+        self._dates = []
+        self._by_discipline = {}
+    
+    def newest_first(self):
+        return [self._by_id[workout_id] for _, workout_id in reversed(self._dates)]
+    
+    def oldest_first(self):
+        return [self._by_id[workout_id] for _, workout_id in self._dates]
+    
+    def between(self, start=None, end=None, discipline=None):
+        """
+        Workouts created in [start, end), oldest first
+        
+        Args:
+            start: Optional lower bound (epoch seconds or datetime)
+            end: Optional upper bound, exclusive (epoch seconds or datetime)
+            discipline: Optional fitness_discipline to restrict to (e.g. 'cycling')
+        
+        Returns:
+            list: Workout records
+        """
+        index = self._dates if discipline is None else self._by_discipline.get(discipline, [])
+        start = normalize_since(start)
+        end = normalize_since(end)
+        
+        lo = 0 if start is None else bisect_left(index, (start,))
+        hi = len(index) if end is None else bisect_left(index, (end,))
+        return [self._by_id[workout_id] for _, workout_id in index[lo:hi]]
+    
+    def by_discipline(self, discipline):
+        """Workouts of one fitness discipline, newest first"""
+        return [self._by_id[workout_id] for _, workout_id in reversed(self._by_discipline.get(discipline, []))]
+    
+    def disciplines(self):
+        """Loaded disciplines with their workout counts"""
+        return {discipline: len(index) for discipline, index in self._by_discipline.items() if index}
+    
+    def _unindex(self, workout_id):
+        created_at, discipline = self._keys[workout_id]
+        for index in (self._dates, self._by_discipline[discipline]):
+            position = bisect_left(index, (created_at, workout_id))
+            del index[position]
+    
+    def _reindex(self):
+        self._dates = sorted((created_at, workout_id) for workout_id, (created_at, _) in self._keys.items())
+        self._by_discipline = {}
+        for created_at, workout_id in self._dates:
+            self._by_discipline.setdefault(self._keys[workout_id][1], []).append((created_at, workout_id))